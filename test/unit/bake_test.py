@@ -0,0 +1,47 @@
+# 
+#   Plasma
+#   Copyright (c) 2021 Yusuf Olokoba.
+#
+
+from torch import manual_seed, rand, tensor
+
+from torchplasma.conversion import linear_to_srgb, srgb_to_linear
+from torchplasma.curves import apply_lut, bake_lut, tonal_exposure
+from torchplasma.linear import contrast, exposure, saturation
+
+manual_seed(0)
+IMAGE = rand(2, 3, 64, 64) * 2. - 1.
+WEIGHT = tensor([[0.3], [-0.2]])
+TONE_OPS = [
+    srgb_to_linear,
+    lambda x: exposure(x, WEIGHT),
+    linear_to_srgb,
+    lambda x: contrast(x, WEIGHT),
+    lambda x: tonal_exposure(x, WEIGHT),
+]
+
+def _evaluate (ops, input):
+    for op in ops:
+        input = op(input)
+    return input
+
+def test_bake_identity ():
+    lut = bake_lut([], samples=2)
+    result = apply_lut(IMAGE, lut)
+    assert lut.shape == (2, 3, 1024)
+    assert (result - IMAGE).abs().max() < 1e-5
+
+def test_bake_separable ():
+    lut = bake_lut(TONE_OPS, samples=2)
+    expected = _evaluate(TONE_OPS, IMAGE)
+    result = apply_lut(IMAGE, lut)
+    assert lut.shape == (2, 3, 1024)
+    assert (result - expected).abs().max() < 2e-3
+
+def test_bake_cube ():
+    ops = TONE_OPS + [lambda x: saturation(x, WEIGHT)]
+    lut = bake_lut(ops, samples=2)
+    expected = _evaluate(ops, IMAGE)
+    result = apply_lut(IMAGE, lut, interpolation="tetrahedral")
+    assert lut.shape == (2, 33, 33, 33, 3)
+    assert (result - expected).abs().mean() < 1e-3
\ No newline at end of file
@@ -4,11 +4,12 @@
 #
 
 from pytest import fixture, mark
-from torch import cat, isnan, linspace, zeros, zeros_like
+from torch import cat, einsum, isnan, linspace, manual_seed, rand, tensor, zeros, zeros_like
+from torch.nn.functional import interpolate
 from .common import tensorread, tensorwrite
 
 from torchplasma.conversion import rgb_to_luminance, rgb_to_yuv, yuv_to_rgb
-from torchplasma.filters import bilateral_filter, slice_bilateral_grid
+from torchplasma.filters import bilateral_filter, fit_bilateral_affine_grid, slice_bilateral_affine_grid, slice_bilateral_grid, splat_bilateral_grid, BilateralGrid
 
 IMAGE_PATHS = [
     "test/media/filter/1.jpg",
@@ -29,6 +30,54 @@ def test_bilateral_slice ():
     sliced = slice_bilateral_grid(grid, guide, weight)
     assert not isnan(sliced).any()
 
+def test_bilateral_channels ():
+    manual_seed(0)
+    image = rand(2, 3, 64, 64) * 2. - 1.
+    guide = rgb_to_luminance(image)
+    result = bilateral_filter(image, guide, kernel_size=(5, 5), grid_size=(16, 32, 32))
+    channels = [bilateral_filter(channel, guide, kernel_size=(5, 5), grid_size=(16, 32, 32)) for channel in image.split(1, dim=1)]
+    assert (result - cat(channels, dim=1)).abs().max() < 1e-5
+
+def test_bilateral_splat_mass ():
+    manual_seed(0)
+    image = rand(2, 3, 60, 80) * 2. - 1.
+    grid = splat_bilateral_grid(image, rgb_to_luminance(image), (8, 16, 16))
+    mass = grid.sum(dim=(2, 3, 4)) * 60 * 80 / (16 * 16)
+    assert (mass[:,:3] - image.sum(dim=(2, 3))).abs().max() < 1e-2
+    assert (mass[:,3] - 60 * 80).abs().max() < 1e-2
+
+def test_bilateral_grid_reuse ():
+    manual_seed(0)
+    image = rand(3, 3, 48, 64) * 2. - 1.
+    guide = rgb_to_luminance(image[:1])
+    bilateral_grid = BilateralGrid(guide, (8, 16, 16))
+    first = bilateral_grid.slice(bilateral_grid.blur(bilateral_grid.splat(image), (3, 3)), homogenous=True)
+    second = bilateral_grid.slice(bilateral_grid.splat(image[:1]), homogenous=True)
+    for n in range(3):
+        expected = bilateral_filter(image[n:n+1], guide, kernel_size=(3, 3), grid_size=(8, 16, 16))
+        assert (first[n:n+1] - expected).abs().max() < 1e-6
+    expected = slice_bilateral_grid(splat_bilateral_grid(image[:1], guide, (8, 16, 16)), guide, homogenous=True)
+    assert (second - expected).abs().max() < 1e-6
+
+def test_bilateral_affine_transfer ():
+    manual_seed(0)
+    image = interpolate(rand(1, 3, 16, 16) * 2. - 1., size=(256, 256), mode="bicubic", align_corners=False).clamp(-1., 1.)
+    proxy = interpolate(image, size=(64, 64), mode="area")
+    matrix = tensor([[0.6, 0.2, 0.1], [0., 0.9, 0.1], [0.3, 0., 0.5]])
+    edit = lambda x: einsum("ck,nkhw->nchw", matrix, x) + 0.1
+    grid = fit_bilateral_affine_grid(proxy, edit(proxy), rgb_to_luminance(proxy), (8, 8, 8), eps=1e-5)
+    result = slice_bilateral_affine_grid(image, grid, rgb_to_luminance(image))
+    assert grid.shape == (1, 12, 8, 8, 8)
+    assert (result - edit(image)).abs().mean() < 1e-3
+
+def test_bilateral_affine_identity ():
+    manual_seed(0)
+    image = rand(2, 3, 32, 32) * 2. - 1.
+    guide = rgb_to_luminance(image)
+    grid = fit_bilateral_affine_grid(image, image, guide, (4, 8, 8))
+    result = slice_bilateral_affine_grid(image, grid, guide)
+    assert (result - image).abs().max() < 1e-4
+
 @mark.parametrize("image_path", IMAGE_PATHS)
 def test_bilateral_coarse_local_contrast (image_path):
     image = tensorread(image_path, size=1024)
@@ -4,10 +4,12 @@
 #
 
 from pytest import fixture, mark
-from torch import zeros, zeros_like
+from torch import manual_seed, ones, rand, zeros, zeros_like
+from torch.nn.functional import conv2d, pad
 from .common import tensorread, tensorwrite
 
 from torchplasma.filters import box_filter
+import torchplasma.filters.box as box
 
 IMAGE_PATHS = [
     "test/media/filter/1.jpg",
@@ -25,4 +27,29 @@ IMAGE_PATHS = [
 def test_box_filter (image_path):
     image = tensorread(image_path, size=1024)
     result = box_filter(image, 5)
-    tensorwrite("box.jpg", result)
\ No newline at end of file
+    tensorwrite("box.jpg", result)
+
+@mark.parametrize("radius", [6, 11, 32])
+def test_box_filter_running_sum (radius):
+    manual_seed(0)
+    image = rand(2, 3, 96, 128) * 2. - 1.
+    kernel_size = 2 * radius + 1
+    kernel = ones(3, 1, kernel_size, kernel_size) / kernel_size ** 2
+    expected = conv2d(pad(image, (radius, radius, radius, radius), mode="replicate"), kernel, groups=3)
+    result = box_filter(image, radius)
+    assert result.dtype == image.dtype
+    assert (result - expected).abs().max() < 1e-5
+
+def test_box_filter_compensated_sum (monkeypatch):
+    manual_seed(0)
+    image = rand(1, 3, 64, 8192) + 0.5
+    expected = box_filter(image.double(), 8)
+    monkeypatch.setattr(box, "_accumulates_in_double", lambda input: False)
+    result = box_filter(image, 8)
+    assert result.dtype == image.dtype
+    assert (result.double() - expected).abs().max() < 1e-6
+
+def test_box_filter_gradient ():
+    input = (rand(1, 3, 64, 64) * 2. - 1.).requires_grad_()
+    box_filter(input, 11).sum().backward()
+    assert input.grad.isfinite().all()
\ No newline at end of file
@@ -0,0 +1,46 @@
+# 
+#   Plasma
+#   Copyright (c) 2021 Yusuf Olokoba.
+#
+
+from torch import device, float32, float64, inference_mode, linspace, meshgrid, ones, rand
+
+import torchplasma.cache as cache
+from torchplasma.filters import box_filter
+
+def test_constant_reuse ():
+    cache.clear()
+    a = cache.constant("ones", lambda: ones(3), device("cpu"), float32)
+    b = cache.constant("ones", lambda: ones(3), device("cpu"), float32)
+    c = cache.constant("ones", lambda: ones(3), device("cpu"), float64)
+    assert a is b
+    assert c is not a and c.dtype == float64
+
+def test_constant_clear ():
+    a = cache.constant("ones", lambda: ones(3), device("cpu"), float32)
+    cache.clear()
+    b = cache.constant("ones", lambda: ones(3), device("cpu"), float32)
+    assert a is not b
+
+def test_constant_eviction ():
+    cache.clear()
+    cache.set_capacity(2)
+    a = cache.constant("a", lambda: ones(1), device("cpu"), float32)
+    cache.constant("b", lambda: ones(1), device("cpu"), float32)
+    cache.constant("c", lambda: ones(1), device("cpu"), float32)
+    assert cache.constant("a", lambda: ones(1), device("cpu"), float32) is not a
+    cache.set_capacity(256)
+
+def test_coordinate_grid ():
+    hg, wg = cache.coordinate_grid((4, 5), device("cpu"), float32)
+    expected_hg, expected_wg = meshgrid(linspace(-1., 1., 4), linspace(-1., 1., 5), indexing="ij")
+    assert (hg == expected_hg).all() and (wg == expected_wg).all()
+
+def test_constant_inference_mode ():
+    cache.clear()
+    input = rand(1, 3, 16, 16)
+    with inference_mode():
+        box_filter(input, 2)
+    input = input.clone().requires_grad_()
+    box_filter(input, 2).sum().backward()
+    assert input.grad.isfinite().all()
\ No newline at end of file
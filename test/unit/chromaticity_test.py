@@ -4,11 +4,12 @@
 #
 
 from pytest import fixture, mark
-from torch import cat, linspace, tensor, zeros, zeros_like
+from torch import cat, linspace, manual_seed, rand, tensor, zeros, zeros_like
 from .common import tensorread, tensorwrite
 
-from torchplasma.conversion import rgb_to_xyz, xyz_to_lab, lab_to_xyz, xyz_to_rgb, srgb_to_linear, linear_to_srgb
-from torchplasma.linear import color_balance
+from torchplasma.conversion import color_matrix, rgb_to_xyz, xyz_to_lab, lab_to_xyz, xyz_to_rgb, srgb_to_linear, linear_to_srgb
+from torchplasma.linear import chromatic_adaptation, chromatic_adaptation_matrix, color_balance
+from torchplasma.linear.chromaticity import BRADFORD, BRADFORD_INV, D65_WHITE, temperature_tint_to_xyz
 
 IMAGE_PATHS = [
     "test/media/conversion/input.jpg",
@@ -79,4 +80,31 @@ def test_manual_chroma_temperature ():
     image = tensorread("test/media/conversion/linear.jpg", size=None)
     weight = tensor([[-0.38, 0.]])
     result = color_balance(image, weight)
-    tensorwrite("temperature.jpg", result)
\ No newline at end of file
+    tensorwrite("temperature.jpg", result)
+
+def test_chromatic_adaptation_matrix ():
+    manual_seed(0)
+    image = rand(1, 3, 32, 48) * 2. - 1.
+    weight = tensor([[-0.6, 0.3], [0.4, -0.2]], requires_grad=True)
+    # Adapt in XYZ
+    dst_cone = BRADFORD @ temperature_tint_to_xyz(weight).unsqueeze(dim=2)
+    d65_cone = BRADFORD @ D65_WHITE.view(1, 3, 1)
+    adaptation = BRADFORD_INV @ (d65_cone / dst_cone * BRADFORD)
+    xyz = color_matrix(rgb_to_xyz(srgb_to_linear(image)), adaptation)
+    expected = linear_to_srgb(xyz_to_rgb(xyz))
+    # Compare
+    matrix = chromatic_adaptation_matrix(weight)
+    result = chromatic_adaptation(image, weight)
+    assert matrix.shape == (2, 3, 3)
+    assert (result - expected).abs().max() < 1e-4
+    result.sum().backward()
+    assert weight.grad.isfinite().all()
+
+def test_color_balance_broadcast ():
+    manual_seed(0)
+    image = rand(1, 3, 16, 16) * 2. - 1.
+    weights = rand(5, 2) * 2. - 1.
+    result = color_balance(image, weights)
+    expected = color_balance(image.expand(5, -1, -1, -1).contiguous(), weights)
+    assert result.shape == (5, 3, 16, 16)
+    assert (result - expected).abs().max() < 1e-6
\ No newline at end of file
@@ -0,0 +1,38 @@
+# 
+#   Plasma
+#   Copyright (c) 2021 Yusuf Olokoba.
+#
+
+from pytest import mark
+from torch import allclose, manual_seed, rand
+
+from torchplasma.conversion import convert, lab_to_xyz, linear_to_srgb, rgb_to_xyz, rgb_to_yuv, srgb_to_linear, xyz_to_lab, xyz_to_rgb
+
+def test_convert_srgb_to_lab ():
+    manual_seed(0)
+    image = 2. * rand(2, 3, 64, 64) - 1.
+    lab = convert(image, "srgb", "lab")
+    expected = xyz_to_lab(rgb_to_xyz(srgb_to_linear(image)))
+    assert allclose(lab, expected, atol=1e-3)
+
+def test_convert_lab_to_srgb ():
+    manual_seed(0)
+    image = 2. * rand(2, 3, 64, 64) - 1.
+    lab = xyz_to_lab(rgb_to_xyz(srgb_to_linear(image)))
+    srgb = convert(lab, "lab", "srgb")
+    expected = linear_to_srgb(xyz_to_rgb(lab_to_xyz(lab)))
+    assert allclose(srgb, expected, atol=1e-5)
+
+def test_convert_xyz_to_yuv ():
+    manual_seed(0)
+    xyz = rgb_to_xyz(2. * rand(2, 3, 64, 64) - 1.)
+    yuv = convert(xyz, "xyz", "yuv")
+    expected = rgb_to_yuv(xyz_to_rgb(xyz))
+    assert allclose(yuv, expected, atol=1e-5)
+
+@mark.parametrize("space", ["srgb", "rgb", "xyz", "xyy", "lab", "yuv"])
+def test_convert_round_trip (space):
+    manual_seed(0)
+    image = 1.6 * rand(1, 3, 32, 32) - 0.8
+    result = convert(convert(image, "srgb", space), space, "srgb")
+    assert allclose(result, image, atol=1e-3)
\ No newline at end of file
@@ -6,9 +6,11 @@
 from imageio import imwrite
 from numpy import linspace, tile, uint16
 from pytest import fixture, mark
+from torch import channels_last, linspace as torch_linspace, manual_seed, meshgrid, rand, stack
 from .common import tensorread, tensorwrite
 
 from torchplasma.curves import discrete_curve_1d, discrete_curve_3d, cuberead, lutread
+import torchplasma.curves.discrete as discrete
 
 IMAGE_PATHS = [
     "test/media/filter/1.jpg",
@@ -37,3 +39,124 @@ def test_load_cube (image_path):
     cube = cuberead("test/media/lut/identity.cube")
     result = discrete_curve_3d(image, cube)
     tensorwrite("cube.jpg", result)
+
+
+def test_curve_identity ():
+    manual_seed(0)
+    image = rand(2, 3, 32, 24) * 2. - 1.
+    result = discrete_curve_1d(image, torch_linspace(-1., 1., 4096))
+    assert (result - image).abs().max() < 1e-5
+
+@mark.parametrize("shape", [(3, 16), (2, 16), (2, 1, 16), (2, 3, 16)])
+def test_curve_per_channel (shape):
+    manual_seed(0)
+    image = rand(2, 3, 16, 16) * 2. - 1.
+    lut = rand(*shape) * 2. - 1.
+    luts = lut.unsqueeze(dim=0) if shape[0] == 3 else lut.view(2, -1, 16)
+    luts = luts.expand(2, 3, 16)
+    result = discrete_curve_1d(image, lut)
+    for n in range(2):
+        for c in range(3):
+            expected = discrete_curve_1d(image[n:n+1], luts[n,c])
+            assert (result[n,c] - expected[0,c]).abs().max() < 1e-6
+
+def test_curve_gradient ():
+    manual_seed(0)
+    image = (rand(1, 3, 8, 8) * 2. - 1.).requires_grad_()
+    lut = (rand(3, 16) * 2. - 1.).requires_grad_()
+    discrete_curve_1d(image, lut).sum().backward()
+    assert image.grad.abs().sum() > 0.
+    assert lut.grad.abs().sum() > 0.
+
+def _identity_cube (size):
+    nodes = torch_linspace(-1., 1., size)
+    b, g, r = meshgrid(nodes, nodes, nodes, indexing="ij")
+    return stack([r, g, b], dim=-1)
+
+@mark.parametrize("interpolation", ["trilinear", "tetrahedral"])
+def test_cube_identity (interpolation):
+    manual_seed(0)
+    image = rand(2, 3, 32, 24) * 2. - 1.
+    result = discrete_curve_3d(image, _identity_cube(17), interpolation=interpolation)
+    assert (result - image).abs().max() < 1e-5
+
+@mark.parametrize("interpolation", ["trilinear", "tetrahedral"])
+def test_cube_per_sample (interpolation):
+    manual_seed(0)
+    image = rand(3, 3, 16, 16) * 2. - 1.
+    cubes = rand(3, 9, 9, 9, 3) * 2. - 1.
+    result = discrete_curve_3d(image, cubes, interpolation=interpolation)
+    for i in range(3):
+        expected = discrete_curve_3d(image[i:i+1], cubes[i], interpolation=interpolation)
+        assert (result[i:i+1] - expected).abs().max() < 1e-6
+
+def test_cube_tetrahedral_separable ():
+    manual_seed(0)
+    image = rand(2, 3, 16, 16) * 2. - 1.
+    cube = _identity_cube(9) ** 3
+    trilinear = discrete_curve_3d(image, cube, interpolation="trilinear")
+    tetrahedral = discrete_curve_3d(image, cube, interpolation="tetrahedral")
+    assert (trilinear - tetrahedral).abs().max() < 1e-5
+
+def test_cube_tetrahedral_bands (monkeypatch):
+    manual_seed(0)
+    image = rand(2, 3, 15, 16) * 2. - 1.
+    cubes = rand(2, 9, 9, 9, 3) * 2. - 1.
+    expected = discrete_curve_3d(image, cubes, interpolation="tetrahedral")
+    monkeypatch.setattr(discrete, "LUT_BAND_SIZE", 64)
+    result = discrete_curve_3d(image, cubes, interpolation="tetrahedral")
+    assert (result - expected).abs().max() == 0.
+
+@mark.parametrize("interpolation", ["trilinear", "tetrahedral"])
+def test_cube_channels_last (interpolation):
+    manual_seed(0)
+    image = rand(2, 3, 16, 16) * 2. - 1.
+    cube = rand(9, 9, 9, 3) * 2. - 1.
+    expected = discrete_curve_3d(image, cube, interpolation=interpolation)
+    result = discrete_curve_3d(image.contiguous(memory_format=channels_last), cube, interpolation=interpolation)
+    assert result.is_contiguous(memory_format=channels_last)
+    assert (result - expected).abs().max() < 1e-6
+
+def test_cube_read (tmp_path):
+    path = tmp_path / "test.cube"
+    cube = _identity_cube(5)
+    rows = "\n".join(" ".join(f"{value:.6f}" for value in row) for row in ((cube.view(-1, 3) + 1.) / 2.).tolist())
+    path.write_text(f"# Identity\nTITLE \"Identity\"\nLUT_3D_SIZE 5\nDOMAIN_MIN 0 0 0\nDOMAIN_MAX 1 1 1\n\n{rows}\n")
+    result = cuberead(str(path))
+    assert result.shape == (5, 5, 5, 3)
+    assert (result - cube).abs().max() < 1e-5
+    cached = cuberead(str(path), cache=True)
+    assert len(list(tmp_path.glob("test.cube.*.npy"))) == 1
+    cached = cuberead(str(path), cache=True)
+    assert (cached - result).abs().max() == 0.
+
+def test_cube_read_cache_dir (tmp_path):
+    path = tmp_path / "assets" / "test.cube"
+    path.parent.mkdir()
+    path.write_text("LUT_1D_SIZE 2\n0.0 0.0 0.0\n1.0 1.0 1.0\n")
+    cache_dir = tmp_path / "cache"
+    result = cuberead(str(path), cache_dir=str(cache_dir))
+    assert result.tolist() == [[-1., 1.]] * 3
+    assert len(list(cache_dir.glob("test.cube.*.npy"))) == 1
+    assert not list(path.parent.glob("*.npy"))
+    path.write_text("LUT_1D_SIZE 2\n0.0 0.0 0.0\n0.50 0.50 0.50\n")
+    result = cuberead(str(path), cache_dir=str(cache_dir))
+    assert result.tolist() == [[-1., 0.]] * 3
+    assert len(list(cache_dir.glob("test.cube.*.npy"))) == 1
+
+def test_cube_read_readonly (tmp_path, monkeypatch):
+    path = tmp_path / "test.cube"
+    path.write_text("LUT_1D_SIZE 2\n0.0 0.0 0.0\n1.0 1.0 1.0\n")
+    def read_only (*args, **kwargs):
+        raise PermissionError("Read-only file system")
+    monkeypatch.setattr("torchplasma.curves.lut.NamedTemporaryFile", read_only)
+    result = cuberead(str(path), cache=True)
+    assert result.tolist() == [[-1., 1.]] * 3
+    assert not list(tmp_path.glob("*.npy"))
+
+def test_cube_read_1d (tmp_path):
+    path = tmp_path / "test.cube"
+    path.write_text("LUT_1D_SIZE 3\nLUT_1D_INPUT_RANGE 0.0 2.0\n0.0 0.0 0.0\n1.0 0.5 1.5\n2.0 2.0 2.0\n")
+    result = cuberead(str(path))
+    assert result.shape == (3, 3)
+    assert result[:,1].tolist() == [0., -0.5, 0.5]
\ No newline at end of file
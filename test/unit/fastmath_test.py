@@ -0,0 +1,64 @@
+# 
+#   Plasma
+#   Copyright (c) 2021 Yusuf Olokoba.
+#
+
+from pytest import mark
+from threading import Barrier, Thread
+from torch import float64, linspace, set_grad_enabled
+
+from torchplasma.conversion import linear_to_srgb, srgb_to_linear
+from torchplasma.fastmath import fast_linear_to_srgb, fast_math, fast_srgb_to_linear, is_fast_math_enabled
+
+INPUT = linspace(-1., 1., 100001).view(1, 1, -1).expand(1, 3, -1).contiguous()
+
+@mark.parametrize("conversion", [srgb_to_linear, linear_to_srgb])
+@mark.parametrize("grad", [False, True])
+def test_error_bound (conversion, grad):
+    expected = conversion(INPUT)
+    with set_grad_enabled(grad), fast_math():
+        result = conversion(INPUT)
+    assert (result - expected).abs().max() < 1. / 4096.
+
+@mark.parametrize("conversion", [srgb_to_linear, linear_to_srgb])
+def test_gradient (conversion):
+    input = INPUT.clone().requires_grad_()
+    with fast_math():
+        conversion(input).sum().backward()
+    assert input.grad.isfinite().all()
+
+def test_double_precision ():
+    input = INPUT.to(float64)
+    with fast_math():
+        result = srgb_to_linear(input)
+    assert (result == srgb_to_linear(input)).all()
+
+def test_context ():
+    with fast_math():
+        assert is_fast_math_enabled()
+        with fast_math(False):
+            assert not is_fast_math_enabled()
+        assert is_fast_math_enabled()
+    assert not is_fast_math_enabled()
+
+@mark.parametrize("conversion", [fast_srgb_to_linear, fast_linear_to_srgb])
+def test_out_of_range (conversion):
+    input = linspace(-3., 3., 601)
+    result = conversion(input)
+    expected = conversion(input.clamp(min=-1., max=1.))
+    assert (result == expected).all()
+
+def test_thread_isolation ():
+    barrier = Barrier(2)
+    observed = []
+    def observe ():
+        barrier.wait()
+        observed.append(is_fast_math_enabled())
+        barrier.wait()
+    thread = Thread(target=observe)
+    thread.start()
+    with fast_math():
+        barrier.wait()
+        barrier.wait()
+    thread.join()
+    assert observed == [False]
\ No newline at end of file
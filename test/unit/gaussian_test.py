@@ -0,0 +1,82 @@
+# 
+#   Plasma
+#   Copyright (c) 2021 Yusuf Olokoba.
+#
+
+from collections import OrderedDict
+from pytest import mark, raises
+from torch import full, manual_seed, rand
+
+from torchplasma.filters import gaussian_filter, gaussian_filter_3d
+from torchplasma.filters.fft import _decisions, is_fft_faster
+import torchplasma.filters.fft as fft
+
+manual_seed(0)
+IMAGE = rand(2, 3, 128, 160) * 2. - 1.
+
+@mark.parametrize("kernel_size", [31, 61, 91])
+@mark.parametrize("padding_mode", ["zeros", "replicate", "reflect"])
+def test_recursive_filter (kernel_size, padding_mode):
+    margin = kernel_size // 2
+    expected = gaussian_filter(IMAGE, (kernel_size, kernel_size), method="direct", padding_mode=padding_mode)
+    result = gaussian_filter(IMAGE, (kernel_size, kernel_size), method="recursive", padding_mode=padding_mode)
+    assert result.shape == IMAGE.shape
+    assert (result - expected)[...,margin:-margin,margin:-margin].abs().max() < 0.02
+
+@mark.parametrize("padding_mode", ["replicate", "reflect"])
+def test_recursive_border (padding_mode):
+    image = full((1, 3, 64, 64), 0.5)
+    result = gaussian_filter(image, (101, 101), method="recursive", padding_mode=padding_mode)
+    assert (result - 0.5).abs().max() < 1e-3
+
+@mark.parametrize("kernel_size", [31, 61])
+@mark.parametrize("padding_mode", ["zeros", "replicate", "reflect"])
+def test_recursive_constant (kernel_size, padding_mode):
+    image = full((1, 3, 96, 128), 1.)
+    expected = gaussian_filter(image, (kernel_size, kernel_size), method="direct", padding_mode=padding_mode)
+    result = gaussian_filter(image, (kernel_size, kernel_size), padding_mode=padding_mode)
+    assert (result - expected).abs().max() < 0.03
+
+def test_recursive_filter_3d ():
+    volume = IMAGE.view(1, 6, 8, 16, 160)
+    expected = gaussian_filter_3d(volume, (5, 7, 33), method="direct", padding_mode="replicate")
+    result = gaussian_filter_3d(volume, (5, 7, 33), method="recursive", padding_mode="replicate")
+    assert (result - expected).abs().mean() < 0.02
+
+@mark.parametrize("padding_mode", ["zeros", "replicate", "reflect"])
+def test_fft_filter (padding_mode):
+    expected = gaussian_filter(IMAGE, (9, 14), method="direct", padding_mode=padding_mode)
+    result = gaussian_filter(IMAGE, (9, 14), method="fft", padding_mode=padding_mode)
+    assert result.shape == expected.shape
+    assert (result - expected).abs().max() < 1e-5
+
+def test_fft_filter_3d ():
+    volume = IMAGE.view(1, 6, 8, 16, 160)
+    expected = gaussian_filter_3d(volume, (3, 5, 9), method="direct", padding_mode="reflect")
+    result = gaussian_filter_3d(volume, (3, 5, 9), method="fft", padding_mode="reflect")
+    assert (result - expected).abs().max() < 1e-5
+
+def test_fft_crossover ():
+    expected = gaussian_filter(IMAGE, (11, 11), method="direct")
+    result = gaussian_filter(IMAGE, (11, 11))
+    assert any(key[0] == "gaussian_filter" and key[1] == (2, 4, 128, 256) for key in _decisions)
+    assert (result - expected).abs().max() < 1e-5
+    decisions = len(_decisions)
+    gaussian_filter(IMAGE[...,:-8,:-16], (11, 11))
+    assert len(_decisions) == decisions
+
+def test_fft_decision_capacity (monkeypatch):
+    monkeypatch.setattr(fft, "_capacity", 2)
+    monkeypatch.setattr(fft, "_decisions", OrderedDict())
+    for key in range(3):
+        is_fft_faster(key, lambda: IMAGE + 1., lambda: IMAGE * 2.)
+    assert list(fft._decisions) == [1, 2]
+
+def test_recursive_gradient ():
+    input = IMAGE.clone().requires_grad_()
+    gaussian_filter(input, (41, 41), padding_mode="replicate").sum().backward()
+    assert input.grad.isfinite().all()
+
+def test_method ():
+    with raises(ValueError):
+        gaussian_filter(IMAGE, (5, 5), method="box")
\ No newline at end of file
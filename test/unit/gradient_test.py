@@ -4,10 +4,11 @@
 #
 
 from pytest import fixture, mark
-from torch import linspace, zeros
+from torch import linspace, tensor, zeros
 from .common import tensorwrite
 
 from torchplasma.gradients import radial_gradient, top_bottom_gradient, bottom_top_gradient, left_right_gradient, right_left_gradient
+from torchplasma.spatial import exposure
 
 def test_radial_gradient ():
     input = zeros(1, 1, 720, 1280)
@@ -43,4 +44,34 @@ def test_vignette_gradient ():
     input = zeros(1, 1, 720, 1280)
     mask = 1. - radial_gradient(input, 2.5)
     mask = 2. * mask - 1.
-    tensorwrite("vignette.jpg", mask)
\ No newline at end of file
+    tensorwrite("vignette.jpg", mask)
+
+def test_elliptical_gradient ():
+    input = zeros(1, 1, 720, 1280)
+    radius = tensor([[0.6, 0.3]])
+    center = tensor([[0.4, -0.2]])
+    mask = radial_gradient(input, radius, center=center)
+    assert mask.shape == (1, 1, 720, 1280)
+    assert mask[0,0,288,895] > 0.99
+    tensorwrite("elliptical.jpg", 2. * mask - 1.)
+
+def test_scalar_radius_gradient ():
+    input = zeros(2, 1, 72, 128)
+    expected = radial_gradient(input, 0.5)
+    assert (radial_gradient(input, tensor(0.5)) - expected).abs().max() == 0.
+    assert (radial_gradient(input, tensor([[0.5], [0.5]])) - expected).abs().max() == 0.
+
+@mark.parametrize("gradient,shape", [
+    (left_right_gradient, (4, 1, 1, 1280)),
+    (right_left_gradient, (4, 1, 1, 1280)),
+    (top_bottom_gradient, (4, 1, 720, 1)),
+    (bottom_top_gradient, (4, 1, 720, 1)),
+])
+def test_broadcast_gradient (gradient, shape):
+    input = zeros(1, 3, 720, 1280)
+    weights = linspace(0.1, 1., 4).unsqueeze(dim=1)
+    mask = gradient(input, weights, broadcast=True)
+    expected = gradient(input, weights)
+    assert mask.shape == shape
+    assert (mask.expand_as(expected) - expected).abs().max() < 1e-6
+    assert (exposure(input, mask) - exposure(input, expected)).abs().max() < 1e-6
\ No newline at end of file
@@ -3,9 +3,9 @@
 #   Copyright (c) 2021 Yusuf Olokoba.
 #
 
-from pytest import fixture, mark
-from torch import cat, linspace, zeros, zeros_like
-from torch.nn.functional import interpolate
+from pytest import fixture, mark, raises
+from torch import cat, linspace, manual_seed, rand, zeros, zeros_like
+from torch.nn.functional import avg_pool2d, interpolate
 from .common import tensorread, tensorwrite
 
 from torchplasma.conversion import rgb_to_luminance, rgb_to_yuv, yuv_to_rgb
@@ -31,6 +31,26 @@ def test_guided_filter (image_path):
     result = result.clamp(min=-1., max=1.)
     tensorwrite("guided.jpg", result)
 
+@mark.parametrize("image_path", IMAGE_PATHS)
+def test_fast_guided_filter (image_path):
+    image = tensorread(image_path, size=1024)
+    luminance = rgb_to_luminance(image)
+    result = guided_filter(image, luminance, 7, 0.02, scale=4)
+    result = result.clamp(min=-1., max=1.)
+    tensorwrite("fast_guided.jpg", result)
+
+@mark.parametrize("scale", [2, 4])
+def test_fast_guided_error (scale):
+    manual_seed(0)
+    image = avg_pool2d(rand(2, 3, 256, 384) * 2. - 1., 9, stride=1, padding=4)
+    luminance = rgb_to_luminance(image)
+    expected = guided_filter(image, luminance, 11, 0.02)
+    result = guided_filter(image, luminance, 11, 0.02, scale=scale)
+    assert result.shape == expected.shape
+    assert (result - expected).abs().mean() < 0.01
+    with raises(ValueError):
+        guided_filter(image, luminance, 11, 0.02, scale=0)
+
 @mark.parametrize("image_path", IMAGE_PATHS)
 def test_guided_upsample (image_path):
     # Load image
@@ -0,0 +1,32 @@
+# 
+#   Plasma
+#   Copyright (c) 2021 Yusuf Olokoba.
+#
+
+from pytest import mark
+from torch import allclose, arange, channels_last, int32, randint, uint8, uint16
+
+from torchplasma.conversion import float_to_integer, integer_to_float, srgb_to_linear
+
+@mark.parametrize("linear", [False, True])
+def test_integer_round_trip (linear):
+    image = arange(256, dtype=uint8).view(1, 1, 16, 16).repeat(1, 3, 1, 1)
+    decoded = integer_to_float(image, linear=linear)
+    encoded = float_to_integer(decoded, linear=linear)
+    assert (encoded == image).all()
+
+def test_integer_round_trip_16 ():
+    image = randint(0, 65536, (1, 3, 64, 64), dtype=int32).to(uint16)
+    decoded = integer_to_float(image, linear=True)
+    encoded = float_to_integer(decoded, linear=True, dtype=uint16)
+    assert (encoded.to(int32) - image.to(int32)).abs().max() <= 1
+
+def test_integer_channels_last ():
+    image = randint(0, 256, (2, 32, 48, 3), dtype=uint8)
+    decoded = integer_to_float(image, linear=True, channels_last=True)
+    expected = srgb_to_linear(image.permute(0, 3, 1, 2).float() / 127.5 - 1.)
+    assert decoded.shape == (2, 3, 32, 48)
+    assert decoded.is_contiguous(memory_format=channels_last)
+    assert allclose(decoded, expected, atol=1e-3)
+    encoded = float_to_integer(decoded, linear=True, channels_last=True)
+    assert (encoded == image).all()
\ No newline at end of file
@@ -0,0 +1,43 @@
+# 
+#   Plasma
+#   Copyright (c) 2021 Yusuf Olokoba.
+#
+
+from pytest import mark
+from torch import channels_last, contiguous_format, linspace, manual_seed, rand, tensor
+
+import torchplasma.conversion as conversion
+import torchplasma.curves as curves
+import torchplasma.filters as filters
+import torchplasma.linear as linear
+from torchplasma.layout import memory_format
+
+manual_seed(0)
+IMAGE = rand(2, 3, 24, 32) * 2. - 1.
+WEIGHT = tensor([[0.4], [-0.6]])
+OPERATIONS = {
+    "linear_to_srgb": lambda x: conversion.linear_to_srgb(x),
+    "rgb_to_xyz": lambda x: conversion.rgb_to_xyz(x),
+    "convert": lambda x: conversion.convert(x, "srgb", "lab"),
+    "contrast": lambda x: linear.contrast(x, WEIGHT),
+    "exposure": lambda x: linear.exposure(x, WEIGHT),
+    "saturation": lambda x: linear.saturation(x, WEIGHT),
+    "color_balance": lambda x: linear.color_balance(x, tensor([[0.4, 0.2], [-0.6, 0.3]])),
+    "selective_color": lambda x: linear.selective_color(x, tensor([[1., 0., 0.]]), tensor([[[0.2, 0.1, 0.]]]).repeat(2, 1, 1)),
+    "tonal_exposure": lambda x: curves.tonal_exposure(x, WEIGHT),
+    "discrete_curve_1d": lambda x: curves.discrete_curve_1d(x, linspace(-1., 1., 16) ** 3),
+    "bilateral_filter": lambda x: filters.bilateral_filter(x, x[:,:1], (3, 5), (8, 16, 16)),
+}
+
+def test_memory_format ():
+    assert memory_format(IMAGE) == contiguous_format
+    assert memory_format(IMAGE.contiguous(memory_format=channels_last)) == channels_last
+    assert memory_format(IMAGE[:,:1]) == contiguous_format
+
+@mark.parametrize("name", OPERATIONS.keys())
+def test_channels_last (name):
+    operation = OPERATIONS[name]
+    expected = operation(IMAGE)
+    result = operation(IMAGE.contiguous(memory_format=channels_last))
+    assert memory_format(result) == channels_last
+    assert (result - expected).abs().max() < 1e-5
\ No newline at end of file
@@ -0,0 +1,52 @@
+# 
+#   Plasma
+#   Copyright (c) 2021 Yusuf Olokoba.
+#
+
+from pytest import mark, raises
+from torch import linspace, manual_seed, rand, tensor
+from torch.nn.functional import avg_pool2d
+from .common import tensorread, tensorwrite
+
+from torchplasma.conversion import rgb_to_yuv
+from torchplasma.filters import collapse_laplacian_pyramid, laplacian_pyramid, local_laplacian_filter, pyramid_levels
+
+IMAGE_PATHS = [
+    "test/media/filter/1.jpg",
+    "test/media/filter/2.jpg",
+    "test/media/filter/3.jpg",
+]
+
+manual_seed(0)
+IMAGE = avg_pool2d(rand(2, 1, 97, 131) * 2. - 1., 5, stride=1, padding=2)
+
+def test_laplacian_pyramid ():
+    pyramid = laplacian_pyramid(IMAGE, 4)
+    assert [level.shape[2:] for level in pyramid] == [(97, 131), (49, 66), (25, 33), (13, 17)]
+    assert (collapse_laplacian_pyramid(pyramid) - IMAGE).abs().max() < 1e-6
+
+def test_pyramid_levels ():
+    assert pyramid_levels(IMAGE) == 4
+    assert pyramid_levels(IMAGE[...,:4,:4]) == 1
+
+@mark.parametrize("min_level", [0, 2])
+def test_local_laplacian_identity (min_level):
+    result = local_laplacian_filter(IMAGE, 0., 0.2, min_level=min_level)
+    assert (result - IMAGE).abs().max() < 1e-6
+
+def test_local_laplacian_detail ():
+    detail = tensor([[1.], [-1.]])
+    result = local_laplacian_filter(IMAGE[:1], detail, 0.2)
+    assert result.shape == (2, 1, 97, 131)
+    assert result[0].std() > IMAGE[0].std() > result[1].std()
+    with raises(ValueError):
+        local_laplacian_filter(IMAGE, 0.5, 0.2, levels=3, min_level=3)
+
+@mark.parametrize("image_path", IMAGE_PATHS)
+def test_local_laplacian_filter (image_path):
+    image = tensorread(image_path, size=1024)
+    weight = linspace(-1., 1., 20).view(-1, 1)
+    y = rgb_to_yuv(image)[:,:1]
+    result = local_laplacian_filter(y, weight, 0.3)
+    result = result.clamp(min=-1., max=1.)
+    tensorwrite("local_laplacian.gif", *result.split(1, dim=0))
\ No newline at end of file
@@ -0,0 +1,74 @@
+# 
+#   Plasma
+#   Copyright (c) 2021 Yusuf Olokoba.
+#
+
+from multiprocessing import get_context
+from os.path import exists
+from pytest import fixture, mark
+from torch import float16, float32, linspace, manual_seed, meshgrid, rand, stack, uint16
+
+from torchplasma.curves import clear_luts, decode_lut, discrete_curve_3d, load_lut, set_lut_budget
+import torchplasma.curves.registry as registry
+
+@fixture
+def cube_path (tmp_path):
+    nodes = linspace(0., 1., 9)
+    b, g, r = meshgrid(nodes, nodes, nodes, indexing="ij")
+    rows = stack([r, g, b], dim=-1).view(-1, 3) ** 2
+    rows = "\n".join(" ".join(f"{value:.6f}" for value in row) for row in rows.tolist())
+    path = tmp_path / "test.cube"
+    path.write_text(f"LUT_3D_SIZE 9\n{rows}\n")
+    yield str(path)
+    clear_luts()
+    set_lut_budget(1 << 30)
+
+def test_registry_reuse (cube_path):
+    first = load_lut(cube_path)
+    second = load_lut(cube_path)
+    assert first is second
+    assert load_lut(cube_path, dtype=float16) is not first
+
+@mark.parametrize("dtype", [float16, uint16])
+def test_registry_compact (cube_path, dtype):
+    manual_seed(0)
+    image = rand(2, 3, 16, 16) * 2. - 1.
+    expected = discrete_curve_3d(image, load_lut(cube_path))
+    lut = load_lut(cube_path, dtype=dtype)
+    result = discrete_curve_3d(image, lut)
+    assert lut.dtype == dtype
+    assert (result - expected).abs().max() < 1e-3
+
+@mark.parametrize("dtype", [float16, uint16])
+def test_registry_decode (cube_path, dtype):
+    lut = load_lut(cube_path, dtype=dtype)
+    decoded = decode_lut(lut, float32)
+    assert decoded is decode_lut(lut, float32)
+    assert (decoded - load_lut(cube_path)).abs().max() < 1e-3
+    assert decode_lut(lut.clone(), float32) is not decoded
+
+def test_registry_budget (cube_path):
+    lut = load_lut(cube_path)
+    set_lut_budget(lut.numel() * lut.element_size() - 1)
+    assert load_lut(cube_path) is not lut
+
+@mark.skipif(not exists("/proc/self/maps"), reason="Requires procfs")
+def test_registry_shared (cube_path, tmp_path, monkeypatch):
+    monkeypatch.setenv("TMPDIR", str(tmp_path))
+    monkeypatch.setattr(registry, "SHARED_LUT_DIRECTORY", str(tmp_path / "torchplasma-luts"))
+    lut = load_lut(cube_path, shared=True)
+    shared_paths = list((tmp_path / "torchplasma-luts").glob("*.npy"))
+    assert lut.dtype == float32
+    assert len(shared_paths) == 1
+    with get_context("spawn").Pool(2) as pool:
+        results = pool.map(_map_shared_lut, [cube_path] * 2)
+    for total, mapped_paths in results:
+        assert total == lut.sum().item()
+        assert mapped_paths == [str(shared_paths[0])]
+    assert list((tmp_path / "torchplasma-luts").glob("*.npy")) == shared_paths
+
+def _map_shared_lut (path):
+    lut = load_lut(path, shared=True)
+    with open("/proc/self/maps") as file:
+        mapped_paths = { line.split()[-1] for line in file if line.rstrip().endswith(".npy") }
+    return lut.sum().item(), sorted(mapped_paths)
\ No newline at end of file
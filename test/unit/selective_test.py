@@ -4,9 +4,11 @@
 #
 
 from pytest import fixture, mark
-from torch import cat, linspace, stack, tensor, zeros, zeros_like
+from torch import cat, linspace, manual_seed, rand, stack, tensor, zeros, zeros_like
+from torch.nn.functional import cosine_similarity
 from .common import tensorread, tensorwrite
 
+from torchplasma.conversion import rgb_to_yuv
 from torchplasma.linear import selective_color
 import torchplasma.linear.selective as selective
 
@@ -44,6 +46,23 @@ def lr_bases ():
     ]) / 255.
     return bases
 
+def test_selective_weight_map (lr_bases):
+    manual_seed(0)
+    image = rand(2, 3, 32, 48) * 2. - 1.
+    uv_colors = rgb_to_yuv(image)[:,1:].unsqueeze(dim=2)
+    uv_basis = rgb_to_yuv(2. * lr_bases.t().unsqueeze(dim=0) - 1.)[:,1:].view(1, 2, -1, 1, 1)
+    expected = cosine_similarity(uv_colors, uv_basis, dim=1).clamp(min=0.)
+    weight_map = selective._selective_color_weight_map(image, lr_bases)
+    assert weight_map.shape == (2, 6, 32, 48)
+    assert (weight_map - expected).abs().max() < 1e-5
+
+def test_selective_identity (lr_bases):
+    manual_seed(0)
+    image = rand(1, 3, 32, 48) * 2. - 1.
+    result = selective_color(image, lr_bases, zeros(3, 6, 3))
+    assert result.shape == (3, 3, 32, 48)
+    assert (result - image).abs().max() < 1e-4
+
 @mark.parametrize("path", IMAGE_PATHS)
 def test_selective_weight (path, lr_bases):
     image = tensorread(path)
@@ -5,10 +5,10 @@
 
 from numpy import linspace
 from pytest import fixture, mark
-from torch import float32, tensor
+from torch import float32, linspace as torch_linspace, manual_seed, rand, tensor
 from .common import tensorread, tensorwrite
 
-from torchplasma.curves import natural_cubic_curve
+from torchplasma.curves import natural_cubic_curve, natural_spline_curve, tonal_exposure
 
 IMAGE_PATHS = [
     "test/media/filter/1.jpg",
@@ -56,4 +56,47 @@ def test_natural_cubic_contrast_control (image_path):
         control = tensor([ [-1., i - 0.33, 0.33 - i, 1.] ]).to(float32)
         result = natural_cubic_curve(image, control)
         results.append(result)
-    tensorwrite("tone_contrast.gif", *results)
\ No newline at end of file
+    tensorwrite("tone_contrast.gif", *results)
+
+def test_natural_spline_interpolates_knots ():
+    manual_seed(0)
+    knots = tensor([[-1., -0.6, -0.1, 0.2, 0.7, 1.], [-0.8, -0.5, 0., 0.3, 0.5, 0.9]])
+    values = rand(2, 6) * 2. - 1.
+    result = natural_spline_curve(knots, knots, values)
+    assert (result - values).abs().max() < 1e-5
+
+def test_natural_spline_linear ():
+    input = torch_linspace(-1., 1., 101).view(1, -1)
+    knots = tensor([-0.8, -0.2, 0.5, 0.8])
+    result = natural_spline_curve(input, knots, 0.5 * knots)
+    assert (result - 0.5 * input).abs().max() < 1e-5
+
+def test_tonal_exposure_table ():
+    manual_seed(0)
+    image = rand(2, 3, 32, 32) * 2. - 1.
+    weight = tensor([[0.6], [-0.4]])
+    expected = tonal_exposure(image, weight)
+    result = tonal_exposure(image, weight, table_size=4096)
+    assert (result - expected).abs().max() < 1e-5
+
+def test_tonal_exposure_table_gradient ():
+    manual_seed(0)
+    image = rand(2, 3, 16, 16) * 2. - 1.
+    weight = tensor([[0.6], [-0.4]]).requires_grad_()
+    tonal_exposure(image, weight, table_size=1024).sum().backward()
+    expected = weight.grad.clone()
+    weight.grad = None
+    tonal_exposure(image, weight).sum().backward()
+    assert (weight.grad - expected).abs().max() < 1e-2 * expected.abs().max()
+
+@mark.parametrize("table_size", [None, 1024])
+@mark.parametrize("weights", [2, 20])
+def test_tonal_exposure_broadcast (table_size, weights):
+    manual_seed(0)
+    image = rand(2, 3, 16, 24) * 2. - 1.
+    weight = torch_linspace(-1., 1., weights).view(-1, 1)
+    result = tonal_exposure(image[:1], weight, table_size=table_size)
+    assert result.shape == (weights, 3, 16, 24)
+    for i in range(weights):
+        expected = tonal_exposure(image[:1], weight[i:i+1], table_size=table_size)
+        assert (result[i:i+1] - expected).abs().max() < 1e-6
\ No newline at end of file
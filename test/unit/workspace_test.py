@@ -0,0 +1,76 @@
+# 
+#   Plasma
+#   Copyright (c) 2021 Yusuf Olokoba.
+#
+
+from pytest import mark
+from torch import empty_like, manual_seed, no_grad, rand, tensor
+
+import torchplasma.blending as blending
+import torchplasma.conversion as conversion
+import torchplasma.filters as filters
+import torchplasma.linear as linear
+from torchplasma.workspace import Workspace
+
+manual_seed(0)
+IMAGE = rand(2, 3, 24, 32) * 2. - 1.
+WEIGHT = tensor([[0.4], [-0.6]])
+OPERATIONS = {
+    "srgb_to_linear": lambda x, **kwargs: conversion.srgb_to_linear(x, **kwargs),
+    "xyz_to_lab": lambda x, **kwargs: conversion.xyz_to_lab(x, **kwargs),
+    "convert": lambda x, **kwargs: conversion.convert(x, "srgb", "lab", **kwargs),
+    "xyz_to_xyy": lambda x, **kwargs: conversion.xyz_to_xyy((x + 1.) / 2., **kwargs),
+    "yuv_to_rgb": lambda x, **kwargs: conversion.yuv_to_rgb((x + 1.) / 2., **kwargs),
+    "blend_overlay": lambda x, **kwargs: blending.blend_overlay(x, x.flip(-1), **kwargs),
+    "blend_soft_light": lambda x, **kwargs: blending.blend_soft_light(x, x.flip(-1), **kwargs),
+    "contrast": lambda x, **kwargs: linear.contrast(x, WEIGHT, **kwargs),
+    "exposure": lambda x, **kwargs: linear.exposure(x, WEIGHT, **kwargs),
+    "saturation": lambda x, **kwargs: linear.saturation(x, WEIGHT, **kwargs),
+    "chromatic_adaptation": lambda x, **kwargs: linear.chromatic_adaptation(x, tensor([[0.4, 0.2], [-0.6, 0.3]]), **kwargs),
+    "sharpen": lambda x, **kwargs: linear.sharpen(x, WEIGHT, **kwargs),
+    "guided_filter": lambda x, **kwargs: filters.guided_filter(x, x[:,:1], 4, 0.01, **kwargs),
+    "bilateral_filter": lambda x, **kwargs: filters.bilateral_filter(x, x[:,:1], (3, 5), (8, 16, 16), **kwargs),
+}
+
+@mark.parametrize("name", OPERATIONS.keys())
+def test_output (name):
+    operation = OPERATIONS[name]
+    expected = operation(IMAGE)
+    out = empty_like(expected)
+    result = operation(IMAGE, out=out)
+    assert result.data_ptr() == out.data_ptr()
+    assert (out - expected).abs().max() < 1e-5
+
+@mark.parametrize("name", OPERATIONS.keys())
+def test_output_grad (name):
+    operation = OPERATIONS[name]
+    input = IMAGE.clone().requires_grad_()
+    operation(input).sum().backward()
+    expected = input.grad
+    input = IMAGE.clone().requires_grad_()
+    out = empty_like(IMAGE)
+    result = operation(input, out=out)
+    result.sum().backward()
+    assert result.data_ptr() == out.data_ptr()
+    assert (input.grad - expected).abs().max() < 1e-5
+
+def test_workspace_reuse ():
+    workspace = Workspace()
+    expected = filters.guided_filter(IMAGE, IMAGE[:,:1], 4, 0.01)
+    with no_grad(), workspace:
+        first = filters.guided_filter(IMAGE, IMAGE[:,:1], 4, 0.01)
+        buffers = dict(workspace.buffers)
+        second = filters.guided_filter(IMAGE, IMAGE[:,:1], 4, 0.01)
+    assert buffers and all(buffers[key] is workspace.buffers[key] for key in workspace.buffers)
+    assert (first - expected).abs().max() < 1e-6
+    assert (second - expected).abs().max() < 1e-6
+    assert first.data_ptr() != second.data_ptr()
+
+def test_workspace_grad ():
+    workspace = Workspace()
+    input = IMAGE.clone().requires_grad_()
+    with workspace:
+        result = filters.bilateral_filter(input, input[:,:1], (3, 5), (8, 16, 16))
+    result.sum().backward()
+    assert workspace.nbytes == 0
+    assert input.grad is not None
\ No newline at end of file
@@ -5,7 +5,9 @@
 
 from torch import where, Tensor
 
-def blend_soft_light (base: Tensor, overlay: Tensor) -> Tensor:
+from ..workspace import direct_output, write_output
+
+def blend_soft_light (base: Tensor, overlay: Tensor, out: Tensor=None) -> Tensor:
     """
     Blend two images using soft light blending.
 
@@ -14,18 +16,19 @@ def blend_soft_light (base: Tensor, overlay: Tensor) -> Tensor:
     Parameters:
         base (Tensor): Base image with shape (...) in range [-1., 1.].
         overlay (Tensor): Overlay image with shape (...) in range [-1., 1.].
+        out (Tensor): Output image with shape (...). If `None`, a new tensor is allocated.
 
     Returns:
         Tensor: Blended image with shape (...) in range [-1., 1.].
     """
     # Rescale
     base = (base + 1.) / 2.
-    base = base.clamp(min=1e-4) # Prevent NaN on sqrt::backward
+    base = base.clamp_(min=1e-4) # Prevent NaN on sqrt::backward
     overlay =  (overlay + 1.) / 2.
     # Blend
     result = (1. - 2. * overlay) * base.pow(2.) + 2. * base * overlay
     ps_correct = 2 * base * (1. - overlay) + base.sqrt() * (2. * overlay - 1.)
-    result = where(overlay < 0.5, result, ps_correct)
+    result = where(overlay < 0.5, result, ps_correct, out=direct_output(out, result, ps_correct))
     # Rescale
-    result = 2. * result - 1.
-    return result
\ No newline at end of file
+    result = result.mul_(2.).sub_(1.)
+    return write_output(result, out)
\ No newline at end of file
@@ -5,13 +5,16 @@
 
 from torch import where, Tensor
 
-def blend_overlay (base: Tensor, overlay: Tensor) -> Tensor:
+from ..workspace import direct_output, write_output
+
+def blend_overlay (base: Tensor, overlay: Tensor, out: Tensor=None) -> Tensor:
     """
     Blend two images using overlay blending.
 
     Parameters:
         base (Tensor): Base image with shape (...) in range [-1., 1.].
         overlay (Tensor): Overlay image with shape (...) in range [-1., 1.].
+        out (Tensor): Output image with shape (...). If `None`, a new tensor is allocated.
 
     Returns:
         Tensor: Blended image with shape (...) in range [-1., 1.].
@@ -23,6 +26,6 @@ def blend_overlay (base: Tensor, overlay: Tensor) -> Tensor:
     multiply = 2. * base * overlay
     screen = 1. - 2. * (1. - base) * (1. - overlay)
     # Blend and rescale
-    result = where(base < 0.5, multiply, screen)
-    result = 2. * result - 1.
-    return result
\ No newline at end of file
+    result = where(base < 0.5, multiply, screen, out=direct_output(out, multiply, screen))
+    result = result.mul_(2.).sub_(1.)
+    return write_output(result, out)
\ No newline at end of file
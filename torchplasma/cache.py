@@ -0,0 +1,84 @@
+# 
+#   Plasma
+#   Copyright (c) 2021 Yusuf Olokoba.
+#
+
+from collections import OrderedDict
+from threading import Lock
+from torch import device as Device, dtype as DType, inference_mode, linspace, meshgrid, no_grad, stack, Tensor
+from typing import Callable, Hashable, Tuple, Union
+
+_capacity = 256
+_entries = OrderedDict()
+_lock = Lock()
+
+def constant (key: Hashable, value: Union[Tensor, Callable[[], Tensor]], device: Device, dtype: DType) -> Tensor:
+    """
+    Get a constant tensor on a given device, creating it on first use.
+
+    Constants are cached per key, device, and dtype, with least-recently-used eviction.
+    The returned tensor is shared between callers, so it must never be modified in place.
+
+    Parameters:
+        key (Hashable): Constant key. This must uniquely identify the constant's contents.
+        value (Tensor | callable): Constant tensor, or function which creates the constant tensor.
+        device (torch.device): Device on which the constant should live.
+        dtype (torch.dtype): Data type of the constant.
+
+    Returns:
+        Tensor: Cached constant tensor.
+    """
+    entry_key = (key, Device(device), dtype)
+    with _lock:
+        if entry_key in _entries:
+            _entries.move_to_end(entry_key)
+            return _entries[entry_key]
+    # Create outside of inference mode, so that the constant can be saved for backward by later calls
+    with inference_mode(False), no_grad():
+        result = value() if callable(value) else value
+        result = result.to(device=device, dtype=dtype)
+    with _lock:
+        _entries[entry_key] = result
+        while len(_entries) > _capacity:
+            _entries.popitem(last=False)
+    return result
+
+def coordinate_grid (size: Tuple[int, ...], device: Device, dtype: DType) -> Tuple[Tensor, ...]:
+    """
+    Get a dense coordinate grid spanning [-1., 1.] in each dimension.
+
+    This is equivalent to `meshgrid` over `linspace(-1., 1., s)` for each dimension size `s`,
+    but the grid is cached in the same way as `constant`.
+
+    Parameters:
+        size (tuple): Grid size in each dimension.
+        device (torch.device): Device on which the grid should live.
+        dtype (torch.dtype): Data type of the grid.
+
+    Returns:
+        tuple: Coordinate tensors, each with shape `size`.
+    """
+    size = tuple(size)
+    create_grid = lambda: stack(meshgrid(*[linspace(-1., 1., extent) for extent in size], indexing="ij"), dim=0)
+    grid = constant(("coordinate_grid", size), create_grid, device, dtype)
+    return grid.unbind(dim=0)
+
+def clear () -> None:
+    """
+    Clear all cached constants.
+    """
+    with _lock:
+        _entries.clear()
+
+def set_capacity (capacity: int) -> None:
+    """
+    Set the maximum number of cached constants.
+
+    Parameters:
+        capacity (int): Maximum number of cached constants.
+    """
+    global _capacity
+    with _lock:
+        _capacity = capacity
+        while len(_entries) > _capacity:
+            _entries.popitem(last=False)
\ No newline at end of file
@@ -3,7 +3,10 @@
 #   Copyright (c) 2021 Yusuf Olokoba.
 #
 
+from .convert import convert
+from .integer import float_to_integer, integer_to_float
 from .lab import lab_to_xyz, xyz_to_lab
+from .matrix import color_matrix
 from .srgb import linear_to_srgb, srgb_to_linear
 from .xyy import xyy_to_xyz, xyz_to_xyy
 from .xyz import rgb_to_xyz, xyz_to_rgb
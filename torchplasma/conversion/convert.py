@@ -0,0 +1,181 @@
+# 
+#   Plasma
+#   Copyright (c) 2021 Yusuf Olokoba.
+#
+
+from collections import deque
+from functools import lru_cache
+from torch import diag, eye, float64, full, ones, tensor, zeros, Tensor
+from typing import Callable, List, NamedTuple, Optional, Tuple
+
+from ..cache import constant
+from ..workspace import write_output
+from .lab import D65, _lab_forward, _lab_inverse
+from .matrix import color_matrix
+from .srgb import _srgb_decode, _srgb_encode
+from .xyy import xyy_to_xyz, xyz_to_xyy
+from .xyz import RGB_TO_XYZ, XYZ_TO_RGB
+from .yuv import RGB_TO_YUV, YUV_TO_RGB
+
+class _Stage (NamedTuple):
+    """
+    Single pass of a conversion plan.
+
+    Each pass applies an affine color transform, an optional clamp, then an optional pointwise function.
+    """
+    matrix: Optional[Tensor]        # (3,3), or (3,) when diagonal, or `None` when identity
+    bias: Optional[Tensor]          # (3,)
+    bounds: Optional[Tuple[Tensor, Tensor]]
+    function: Optional[Callable[[Tensor], Tensor]]
+
+def convert (input: Tensor, src: str, dst: str, out: Tensor=None) -> Tensor:
+    """
+    Convert an image between color spaces.
+
+    The conversion path is planned through the individual conversion functions, then
+    adjacent linear steps are multiplied into a single affine transform. As a result,
+    intermediate range rescales and color matrices cost no additional passes over the image.
+    Gamut clamps between two full color matrices are skipped, so out-of-gamut colors
+    might differ slightly from chaining the individual conversion functions.
+
+    Supported color spaces are `srgb`, `rgb` (linear RGB), `xyz`, `xyy`, `lab`, and `yuv`.
+    Note that `yuv` is computed from linear RGB.
+
+    Parameters:
+        input (Tensor): Input image with shape (N,3,...) in the range of the source color space.
+        src (str): Source color space.
+        dst (str): Destination color space.
+        out (Tensor): Output image with shape (N,3,...). If `None`, a new tensor is allocated.
+
+    Returns:
+        Tensor: Converted image with shape (N,3,...) in the range of the destination color space.
+    """
+    result = input
+    shape = (-1,) + (1,) * (input.ndim - 2)
+    for index, stage in enumerate(_conversion_plan(src, dst)):
+        key = ("convert", src, dst, index)
+        if stage.matrix is not None:
+            matrix = constant(key + ("matrix",), stage.matrix, input.device, input.dtype)
+            bias = constant(key + ("bias",), stage.bias, input.device, input.dtype)
+            if matrix.ndim == 1 and result is not input:
+                result = result.mul_(matrix.view(shape)).add_(bias.view(shape))
+            elif matrix.ndim == 1:
+                result = result * matrix.view(shape) + bias.view(shape)
+            else:
+                result = color_matrix(result, matrix, bias)
+        if stage.bounds is not None:
+            lower, upper = (constant(key + ("bounds", i), bound, input.device, input.dtype).view(shape) for i, bound in enumerate(stage.bounds))
+            result = result.clamp_(min=lower, max=upper) if result is not input else result.clamp(min=lower, max=upper)
+        if stage.function is not None:
+            result = stage.function(result)
+    return write_output(result, out)
+
+def _clamp_unit (input: Tensor) -> Tensor:
+    """
+    Clamp to the [-1., 1.] range. This is planned as a clamp rather than applied as a function.
+    """
+    return input.clamp(min=-1., max=1.)
+
+def _conversion_steps () -> dict:
+    """
+    Decompose each conversion function into affine steps and pointwise functions.
+
+    Returns:
+        dict: Steps keyed by `(src, dst)`. Each step is a `(matrix, bias, function)` tuple in float64.
+    """
+    identity = eye(3, dtype=float64)
+    half = full((3,), 0.5, dtype=float64)
+    rgb_to_xyz = RGB_TO_XYZ.to(float64)
+    xyz_to_rgb = XYZ_TO_RGB.to(float64)
+    rgb_to_yuv = RGB_TO_YUV.to(float64)
+    yuv_to_rgb = YUV_TO_RGB.to(float64)
+    d65 = D65.to(float64)
+    # Lab is an affine function of the companded XYZ coordinates
+    f_to_lab = tensor([
+        [0., 116., 0.],
+        [500., -500., 0.],
+        [0., 200., -200.]
+    ], dtype=float64)
+    f_to_lab_bias = tensor([-16., 0., 0.], dtype=float64)
+    lab_to_f = f_to_lab.inverse()
+    lab_to_f_bias = -lab_to_f @ f_to_lab_bias
+    # Steps # Range rescales are affine steps too
+    none = zeros(3, dtype=float64)
+    minus_one = -ones(3, dtype=float64)
+    return {
+        ("srgb", "rgb"): [(0.5 * identity, half, _srgb_decode), (2. * identity, minus_one, None)],
+        ("rgb", "srgb"): [(0.5 * identity, half, _srgb_encode), (2. * identity, minus_one, None)],
+        ("rgb", "xyz"): [(0.5 * rgb_to_xyz, rgb_to_xyz @ half, None)],
+        ("xyz", "rgb"): [(2. * xyz_to_rgb, minus_one, _clamp_unit)],
+        ("rgb", "yuv"): [(0.5 * rgb_to_yuv, rgb_to_yuv @ half, None)],
+        ("yuv", "rgb"): [(2. * yuv_to_rgb, minus_one, _clamp_unit)],
+        ("xyz", "lab"): [(diag(1. / d65), none, _lab_forward), (f_to_lab, f_to_lab_bias, None)],
+        ("lab", "xyz"): [(lab_to_f, lab_to_f_bias, _lab_inverse), (diag(d65), none, None)],
+        ("xyz", "xyy"): [(identity, none, xyz_to_xyy)],
+        ("xyy", "xyz"): [(identity, none, xyy_to_xyz)],
+    }
+
+@lru_cache(maxsize=None)
+def _conversion_plan (src: str, dst: str) -> Tuple[_Stage, ...]:
+    """
+    Plan the passes required to convert between two color spaces.
+
+    Parameters:
+        src (str): Source color space.
+        dst (str): Destination color space.
+
+    Returns:
+        tuple: Conversion passes.
+    """
+    steps = _conversion_steps()
+    spaces = { space for edge in steps for space in edge }
+    if src not in spaces or dst not in spaces:
+        raise ValueError(f"Cannot convert from {src} to {dst}. Supported color spaces are {sorted(spaces)}")
+    # Find shortest path
+    parents = { src: None }
+    queue = deque([src])
+    while queue:
+        space = queue.popleft()
+        for edge_src, edge_dst in steps:
+            if edge_src == space and edge_dst not in parents:
+                parents[edge_dst] = space
+                queue.append(edge_dst)
+    path = [dst]
+    while parents[path[-1]] is not None:
+        path.append(parents[path[-1]])
+    path = path[::-1]
+    # Collapse affine steps
+    plan: List[_Stage] = []
+    matrix, bias, bounds = eye(3, dtype=float64), zeros(3, dtype=float64), None
+    for edge in zip(path[:-1], path[1:]):
+        for step_matrix, step_bias, function in steps[edge]:
+            matrix, bias = step_matrix @ matrix, step_matrix @ bias + step_bias
+            # Carry clamps through positive diagonal steps, drop them through full color matrices
+            if bounds is not None:
+                scale = step_matrix.diagonal()
+                if (step_matrix == diag(scale)).all() and (scale > 0).all():
+                    bounds = tuple(scale * bound + step_bias for bound in bounds)
+                else:
+                    bounds = None
+            if function is _clamp_unit:
+                bounds = (-ones(3, dtype=float64), ones(3, dtype=float64))
+            elif function is not None:
+                plan.append(_conversion_stage(matrix, bias, bounds, function))
+                matrix, bias, bounds = eye(3, dtype=float64), zeros(3, dtype=float64), None
+    if not (matrix == eye(3, dtype=float64)).all() or bias.any() or bounds is not None:
+        plan.append(_conversion_stage(matrix, bias, bounds, None))
+    return tuple(plan)
+
+def _conversion_stage (matrix: Tensor, bias: Tensor, bounds: Optional[Tuple[Tensor, Tensor]], function: Optional[Callable]) -> _Stage:
+    """
+    Create a conversion pass, simplifying its affine transform where possible.
+    """
+    scale = matrix.diagonal()
+    if (matrix == eye(3, dtype=float64)).all() and not bias.any():
+        matrix, bias = None, None
+    elif (matrix == diag(scale)).all():
+        matrix, bias = scale.float(), bias.float()
+    else:
+        matrix, bias = matrix.float(), bias.float()
+    bounds = tuple(bound.float() for bound in bounds) if bounds is not None else None
+    return _Stage(matrix, bias, bounds, function)
\ No newline at end of file
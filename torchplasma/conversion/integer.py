@@ -0,0 +1,73 @@
+# 
+#   Plasma
+#   Copyright (c) 2021 Yusuf Olokoba.
+#
+
+from torch import arange, float32, float64, iinfo, int32, uint8, dtype as DType, Tensor
+
+from ..cache import constant
+from ..workspace import write_output
+from .srgb import _srgb_decode, _srgb_encode
+
+def integer_to_float (input: Tensor, linear: bool=False, channels_last: bool=False, dtype: DType=float32, out: Tensor=None) -> Tensor:
+    """
+    Convert an 8-bit or 16-bit sRGB image to a floating point image.
+
+    When `linear` is set, the sRGB decoding is performed with a table lookup over all integer codes.
+
+    Parameters:
+        input (Tensor): Input image with shape (N,3,H,W), or (N,H,W,3) if `channels_last`, with dtype `uint8` or `uint16`.
+        linear (bool): Whether to decode to linear RGB instead of sRGB.
+        channels_last (bool): Whether the input buffer is laid out as (N,H,W,3).
+        dtype (torch.dtype): Floating point dtype of the result.
+        out (Tensor): Output image with shape (N,3,H,W). If `None`, a new tensor is allocated.
+
+    Returns:
+        Tensor: sRGB or linear RGB image with shape (N,3,H,W) in range [-1., 1.].
+    """
+    maximum = iinfo(input.dtype).max
+    # Decode
+    if linear:
+        table = constant(("integer_to_linear", maximum), lambda: 2. * _srgb_decode(arange(maximum + 1, dtype=float64) / maximum, eps=0.) - 1., input.device, dtype)
+        result = table[input.to(int32)]
+    else:
+        result = input.to(dtype).mul_(2. / maximum).sub_(1.)
+    # Permute
+    result = result.permute(0, 3, 1, 2) if channels_last else result
+    return write_output(result, out)
+
+def float_to_integer (input: Tensor, linear: bool=False, channels_last: bool=False, dtype: DType=uint8, out: Tensor=None) -> Tensor:
+    """
+    Convert a floating point image to an 8-bit or 16-bit sRGB image.
+
+    When `linear` is set, the sRGB encoding is performed with a 65536-entry table lookup.
+    The table is linearly interpolated for 16-bit results.
+
+    Parameters:
+        input (Tensor): sRGB or linear RGB image with shape (N,3,H,W) in range [-1., 1.].
+        linear (bool): Whether the input image is in linear RGB instead of sRGB.
+        channels_last (bool): Whether to lay out the result buffer as (N,H,W,3).
+        dtype (torch.dtype): Integer dtype of the result, either `uint8` or `uint16`.
+        out (Tensor): Output image with shape (N,3,H,W), or (N,H,W,3) if `channels_last`. If `None`, a new tensor is allocated.
+
+    Returns:
+        Tensor: Quantized sRGB image with shape (N,3,H,W), or (N,H,W,3) if `channels_last`.
+    """
+    maximum = iinfo(dtype).max
+    # Encode
+    if linear:
+        size = 65536
+        table = constant(("linear_to_integer", size, maximum), lambda: maximum * _srgb_encode(arange(size, dtype=float64) / (size - 1), eps=0.), input.device, input.dtype)
+        coordinates = input.add(1.).mul_(0.5 * (size - 1)).clamp_(min=0., max=size - 1)
+        if maximum > 255:
+            index = coordinates.to(int32).clamp_(max=size - 2)
+            lower, upper = table[index], table[index + 1]
+            result = lower.lerp_(upper, coordinates.sub_(index))
+        else:
+            result = table[coordinates.round_().to(int32)]
+    else:
+        result = input.add(1.).mul_(0.5 * maximum)
+    # Quantize
+    result = result.round_().clamp_(min=0., max=maximum).to(dtype)
+    result = result.permute(0, 2, 3, 1).contiguous() if channels_last else result
+    return write_output(result, out)
\ No newline at end of file
@@ -0,0 +1,51 @@
+# 
+#   Plasma
+#   Copyright (c) 2021 Yusuf Olokoba.
+#
+
+from torch import channels_last, matmul, Tensor
+
+from ..layout import memory_format
+from ..workspace import direct_output, write_output
+
+def color_matrix (input: Tensor, matrix: Tensor, bias: Tensor=None, out: Tensor=None) -> Tensor:
+    """
+    Apply an affine color transform to an image.
+
+    Channels-last images are transformed as a contiguous (N,H*W,3) pixel array,
+    and the result keeps the memory format of the input image.
+
+    Parameters:
+        input (Tensor): Input image with shape (N,3,...).
+        matrix (Tensor): Color matrix with shape (3,3) or (N,3,3).
+        bias (Tensor): Color offset with shape (3,) or (N,3). If `None`, no offset is applied.
+        out (Tensor): Output image with shape (N,3,...). If `None`, a new tensor is allocated.
+
+    Returns:
+        Tensor: Transformed image with shape (N,3,...).
+    """
+    _, _, *size = input.shape
+    format = memory_format(input)
+    # Broadcast the matrix to per-sample offsets, so that one image can be transformed with N offsets
+    if bias is not None and bias.ndim == 2 and matrix.ndim == 2:
+        matrix = matrix.expand(bias.shape[0], -1, -1)
+    # Check output layout, and whether the output can be written to directly
+    if out is not None and (not out.is_contiguous(memory_format=format) or direct_output(out, input, matrix, bias) is None):
+        return write_output(color_matrix(input, matrix, bias), out)
+    # Channels last
+    if format == channels_last:
+        colors = input.permute(0, 2, 3, 1).flatten(start_dim=1, end_dim=2)     # Nx(H*W)x3
+        target = out.permute(0, 2, 3, 1).flatten(start_dim=1, end_dim=2) if out is not None else None
+        result = matmul(colors, matrix.transpose(-1, -2), out=target)
+        if bias is not None:
+            result = result.add_(bias.unsqueeze(dim=-2))
+        result = result.view(-1, *size, 3).permute(0, 3, 1, 2)
+        return out if out is not None else result
+    # Channels first
+    colors = input.flatten(start_dim=2)                                         # Nx3x(H*W)
+    target = out.flatten(start_dim=2) if out is not None else None
+    result = matmul(matrix, colors, out=target)
+    if bias is not None:
+        result = result.add_(bias.unsqueeze(dim=-1))
+    result = result.view(-1, 3, *size)
+    return out if out is not None else result
\ No newline at end of file
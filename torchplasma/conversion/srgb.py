@@ -5,34 +5,71 @@
 
 from torch import where, Tensor
 
-def srgb_to_linear (input: Tensor) -> Tensor:
+from ..fastmath import fast_linear_to_srgb, fast_srgb_to_linear, is_fast_math_enabled
+from ..workspace import write_output
+
+def srgb_to_linear (input: Tensor, out: Tensor=None) -> Tensor:
     """
     Convert sRGB to linear RGB.
 
     Parameters:
         input (Tensor): Input image with shape (N,3,...) in range [-1., 1.].
-    
+        out (Tensor): Output image with shape (N,3,...). If `None`, a new tensor is allocated.
+
     Returns:
         Tensor: Linear RGB image with shape (N,3,...) in range [-1., 1.].
     """
+    if is_fast_math_enabled(input):
+        return write_output(fast_srgb_to_linear(input), out)
     input = (input + 1.) / 2.
-    input = input.clamp(min=1e-4)
-    linear = where(input > 0.0404482362771082, ((input + 0.055) / 1.055).pow(2.4), input / 12.92)
-    linear = 2. * linear - 1.
-    return linear
+    linear = _srgb_decode(input)
+    linear = linear.mul_(2.).sub_(1.)
+    return write_output(linear, out)
 
-def linear_to_srgb (input: Tensor) -> Tensor:
+def linear_to_srgb (input: Tensor, out: Tensor=None) -> Tensor:
     """
     Convert linear RGB to sRGB.
 
     Parameters:
         input (Tensor): Input image with shape (N,3,...) in range [-1., 1.].
-    
+        out (Tensor): Output image with shape (N,3,...). If `None`, a new tensor is allocated.
+
     Returns:
         Tensor: sRGB image with shape (N,3,...) in range [-1., 1.].
     """
+    if is_fast_math_enabled(input):
+        return write_output(fast_linear_to_srgb(input), out)
     input = (input + 1.) / 2.
-    input = input.clamp(min=1e-4)
+    srgb = _srgb_encode(input)
+    srgb = srgb.mul_(2.).sub_(1.)
+    return write_output(srgb, out)
+
+def _srgb_decode (input: Tensor, eps: float=1e-4) -> Tensor:
+    """
+    Apply the sRGB decoding transfer function.
+
+    Parameters:
+        input (Tensor): sRGB values with shape (...) in range [0., 1.].
+        eps (float): Minimum input value, to prevent NaN gradients.
+
+    Returns:
+        Tensor: Linear values with shape (...) in range [0., 1.].
+    """
+    input = input.clamp(min=eps)
+    linear = where(input > 0.0404482362771082, ((input + 0.055) / 1.055).pow(2.4), input / 12.92)
+    return linear
+
+def _srgb_encode (input: Tensor, eps: float=1e-4) -> Tensor:
+    """
+    Apply the sRGB encoding transfer function.
+
+    Parameters:
+        input (Tensor): Linear values with shape (...) in range [0., 1.].
+        eps (float): Minimum input value, to prevent NaN gradients.
+
+    Returns:
+        Tensor: sRGB values with shape (...) in range [0., 1.].
+    """
+    input = input.clamp(min=eps)
     srgb = where(input > 0.00313066844250063, 1.055 * input.pow(1. / 2.4) - 0.055, input * 12.92)
-    srgb = 2. * srgb - 1.
     return srgb
\ No newline at end of file
@@ -5,12 +5,15 @@
 
 from torch import cat, tensor, Tensor
 
-def xyz_to_xyy (input: Tensor) -> Tensor:
+from ..workspace import direct_output, write_output
+
+def xyz_to_xyy (input: Tensor, out: Tensor=None) -> Tensor:
     """
     Convert XYZ to xyY.
 
     Parameters:
         input (Tensor): Input image with shape (N,3,...) in range [0., 1.].
+        out (Tensor): Output image with shape (N,3,...). If `None`, a new tensor is allocated.
     
     Returns:
         Tensor: xyY image with shape (N,3,...) in range [0., 1.].
@@ -19,15 +22,16 @@ def xyz_to_xyy (input: Tensor) -> Tensor:
     s = (X + Y + Z).clamp(min=1e-4)
     x = X / s
     y = Y / s
-    xyY = cat([x, y, Y], dim=1)
-    return xyY
+    xyY = cat([x, y, Y], dim=1, out=direct_output(out, input))
+    return write_output(xyY, out)
 
-def xyy_to_xyz (input: Tensor) -> Tensor:
+def xyy_to_xyz (input: Tensor, out: Tensor=None) -> Tensor:
     """
     Convert xyY to XYZ.
     
     Parameters:
         input (Tensor): Input image with shape (N,3,...) in range [0., 1.].
+        out (Tensor): Output image with shape (N,3,...). If `None`, a new tensor is allocated.
     
     Returns:
         Tensor: XYZ image with shape (N,3,...) in range [0., 1.].
@@ -35,5 +39,5 @@ def xyy_to_xyz (input: Tensor) -> Tensor:
     x, y, Y = input.split(1, dim=1)
     X = x * Y / y
     Z = (1 - x - y) * Y / y
-    XYZ = cat([X, Y, Z], dim=1)
-    return XYZ
\ No newline at end of file
+    XYZ = cat([X, Y, Z], dim=1, out=direct_output(out, input))
+    return write_output(XYZ, out)
\ No newline at end of file
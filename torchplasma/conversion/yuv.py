@@ -5,7 +5,23 @@
 
 from torch import tensor, Tensor
 
-def rgb_to_yuv (input: Tensor) -> Tensor:
+from ..cache import constant
+from ..workspace import direct_output, write_output
+from .matrix import color_matrix
+
+RGB_TO_YUV = tensor([
+    [0.2126, 0.7152, 0.0722],
+    [-0.09991, -0.33609, 0.436],
+    [0.615, -0.55861, -0.05639]
+])
+
+YUV_TO_RGB = tensor([
+    [1., 0., 1.28033],
+    [1., -0.21482, -0.38059],
+    [1., 2.12798, 0.]
+])
+
+def rgb_to_yuv (input: Tensor, out: Tensor=None) -> Tensor:
     """
     Convert RGB to YUV.
 
@@ -13,20 +29,16 @@ def rgb_to_yuv (input: Tensor) -> Tensor:
 
     Parameters:
         input (Tensor): Input image with shape (N,3,...) in range [-1., 1.].
+        out (Tensor): Output image with shape (N,3,...). If `None`, a new tensor is allocated.
 
     Returns:
         Tensor: YUV image with shape (N,3,...) in range [0., 1.]
     """
-    input = (input + 1.) / 2.
-    RGB_TO_YUV = tensor([
-        [0.2126, 0.7152, 0.0722],
-        [-0.09991, -0.33609, 0.436],
-        [0.615, -0.55861, -0.05639]
-    ]).float().to(input.device)
-    yuv = RGB_TO_YUV.matmul(input.flatten(start_dim=2)).view_as(input)
+    matrix = constant("RGB_TO_YUV", RGB_TO_YUV, input.device, input.dtype)
+    yuv = color_matrix(input, 0.5 * matrix, 0.5 * matrix.sum(dim=1), out=out) # rescale from [-1., 1.]
     return yuv
 
-def yuv_to_rgb (input: Tensor) -> Tensor:
+def yuv_to_rgb (input: Tensor, out: Tensor=None) -> Tensor:
     """
     Convert YUV to RGB.
 
@@ -34,29 +46,27 @@ def yuv_to_rgb (input: Tensor) -> Tensor:
 
     Parameters:
         input (Tensor): Input image with shape (N,3,...) in range [0., 1.].
+        out (Tensor): Output image with shape (N,3,...). If `None`, a new tensor is allocated.
 
     Returns:
         Tensor: RGB image with shape (N,3,...) in range [-1., 1.]
     """
-    YUV_TO_RGB = tensor([
-        [1., 0., 1.28033],
-        [1., -0.21482, -0.38059],
-        [1., 2.12798, 0.]
-    ]).float().to(input.device)
-    rgb = YUV_TO_RGB.matmul(input.flatten(start_dim=2)).view_as(input)
-    rgb = (2.0 * rgb - 1.0).clamp(min=-1., max=1.)
-    return rgb
-
-def rgb_to_luminance (input: Tensor) -> Tensor:
+    matrix = constant("YUV_TO_RGB", YUV_TO_RGB, input.device, input.dtype)
+    rgb = color_matrix(input, 2. * matrix, out=direct_output(out, input)).sub_(1.)
+    rgb = rgb.clamp_(min=-1., max=1.)
+    return write_output(rgb, out)
+
+def rgb_to_luminance (input: Tensor, out: Tensor=None) -> Tensor:
     """
     Convert RGB to luminance.
 
     Parameters:
         input (Tensor): Input image with shape (N,3,...) in range [-1., 1.]
+        out (Tensor): Output image with shape (N,1,...). If `None`, a new tensor is allocated.
 
     Returns:
         Tensor: Luminance image with shape (N,1,...) in range [-1., 1.]
     """
     y, _, _ = rgb_to_yuv(input).split(1, dim=1)
     luminance = y * 2. - 1.
-    return luminance
\ No newline at end of file
+    return write_output(luminance, out)
\ No newline at end of file
@@ -3,6 +3,8 @@
 #   Copyright (c) 2021 Yusuf Olokoba.
 #
 
+from .bake import apply_lut, bake_lut
 from .discrete import discrete_curve_1d, discrete_curve_3d
 from .lut import lutread, cuberead
-from .natural import natural_cubic_curve, tonal_exposure
\ No newline at end of file
+from .natural import natural_cubic_curve, natural_spline_curve, tonal_exposure
+from .registry import clear_luts, decode_lut, encode_lut, load_lut, set_lut_budget
\ No newline at end of file
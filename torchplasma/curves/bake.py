@@ -0,0 +1,90 @@
+# 
+#   Plasma
+#   Copyright (c) 2021 Yusuf Olokoba.
+#
+
+from torch import device as Device, dtype as DType, float32, linspace, stack, Tensor
+from typing import Callable, Sequence
+
+from ..cache import coordinate_grid
+from .discrete import discrete_curve_1d, discrete_curve_3d
+
+def bake_lut (
+    ops: Sequence[Callable[[Tensor], Tensor]],
+    samples: int=1,
+    size: int=33,
+    curve_size: int=1024,
+    device: Device="cpu",
+    dtype: DType=float32
+) -> Tensor:
+    """
+    Bake a chain of per-pixel color operations into a look-up table.
+
+    The chain is evaluated once on an identity lattice for every sample. When no output channel
+    depends on any other input channel, the chain is evaluated again on an identity ramp and
+    per-channel 1D LUTs are returned instead of a 3D LUT.
+    Every operation must act on each pixel independently, so spatial filters cannot be baked.
+
+    Parameters:
+        ops (list): Color operations, each taking and returning an image with shape (N,3,H,W) in range [-1., 1.].
+        samples (int): Batch size expected by the operations.
+        size (int): 3D LUT size in each dimension.
+        curve_size (int): 1D LUT size.
+        device (torch.device): Device on which the LUT should be baked.
+        dtype (torch.dtype): Data type of the LUT.
+
+    Returns:
+        Tensor: 3D LUT with shape (N,L,L,L,3) or 1D LUT with shape (N,3,L) in range [-1., 1.].
+    """
+    # Evaluate lattice
+    b, g, r = coordinate_grid((size, size, size), device, dtype)
+    lattice = stack([r, g, b], dim=0).view(1, 3, size * size, size).repeat(samples, 1, 1, 1)
+    cube = _evaluate(ops, lattice).view(samples, 3, size, size, size)
+    # Check separability
+    red, green, blue = cube.unbind(dim=1)
+    deviation = max(
+        (red - red[:,:1,:1,:]).abs().max(),
+        (green - green[:,:1,:,:1]).abs().max(),
+        (blue - blue[:,:,:1,:1]).abs().max()
+    )
+    if deviation > 1e-5:
+        return cube.permute(0, 2, 3, 4, 1).contiguous()
+    # Evaluate ramp
+    ramp = linspace(-1., 1., curve_size, device=device, dtype=dtype)
+    ramp = ramp.view(1, 1, 1, -1).repeat(samples, 3, 1, 1)
+    lut = _evaluate(ops, ramp).view(samples, 3, curve_size)
+    return lut
+
+def apply_lut (input: Tensor, lut: Tensor, interpolation: str="trilinear", out: Tensor=None) -> Tensor:
+    """
+    Apply a baked look-up table to an image.
+
+    Parameters:
+        input (Tensor): Input image with shape (N,3,H,W) in range [-1., 1.].
+        lut (Tensor): 3D LUT with shape (N,L,L,L,3) or 1D LUT with shape (N,3,L) in range [-1., 1.].
+        interpolation (str): 3D LUT interpolation mode, either `trilinear` or `tetrahedral`.
+        out (Tensor): Output image with shape (N,3,H,W). If `None`, a new tensor is allocated.
+
+    Returns:
+        Tensor: Filtered image with shape (N,3,H,W) in range [-1., 1.].
+    """
+    lut = lut.squeeze(dim=0) if lut.shape[0] == 1 else lut
+    if lut.shape[-1] == 3 and lut.ndim >= 4:
+        return discrete_curve_3d(input, lut, interpolation=interpolation, out=out)
+    return discrete_curve_1d(input, lut, out=out)
+
+def _evaluate (ops: Sequence[Callable[[Tensor], Tensor]], input: Tensor) -> Tensor:
+    """
+    Evaluate a chain of operations.
+
+    Parameters:
+        ops (list): Operations.
+        input (Tensor): Input image with shape (N,3,H,W).
+
+    Returns:
+        Tensor: Result image with shape (N,3,H,W).
+    """
+    result = input
+    for op in ops:
+        result = op(result)
+    return result
\ No newline at end of file
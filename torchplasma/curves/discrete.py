@@ -3,52 +3,145 @@
 #   Copyright (c) 2021 Yusuf Olokoba.
 #
 
-from torch import stack, zeros_like, Tensor
+from torch import arange, channels_last, empty_like, int64, is_grad_enabled, tensor, Tensor
 from torch.nn.functional import grid_sample
 
-def discrete_curve_1d (input: Tensor, lut: Tensor) -> Tensor:
+from ..cache import constant
+from ..layout import memory_format
+from ..workspace import write_output
+from .registry import decode_lut
+
+LUT_BAND_SIZE = 1 << 16
+
+def discrete_curve_1d (input: Tensor, lut: Tensor, out: Tensor=None) -> Tensor:
     """
     Apply a 1D look-up table to an image.
 
+    The LUT nodes span the [-1., 1.] range, and each pixel is linearly interpolated between its two
+    neighbouring nodes. A LUT with shape (3,L) is applied per channel. Per-sample LUTs for a batch of
+    three images must be given with shape (N,1,L) or (N,3,L).
+
     Parameters:
         input (Tensor): Input image with shape (N,3,H,W) in range [-1., 1.].
-        lut (Tensor): Lookup table with shape (L,) in range [-1., 1.].
+        lut (Tensor): Lookup table with shape (L,), (3,L), (N,L), (N,1,L), or (N,3,L) in range [-1., 1.].
+        out (Tensor): Output image with shape (N,3,H,W). If `None`, a new tensor is allocated.
 
     Returns:
         Tensor: Filtered image with shape (N,3,H,W) in range [-1., 1.].
     """
-    # Create volume
-    batch, _, _, _ = input.shape
-    lut = lut.to(input.device)
-    volume = lut.repeat(batch, 1, 1, 1)
-    # Create grid
-    colors = input.permute(0, 2, 3, 1)
-    wg = colors.flatten(2)
-    hg = zeros_like(wg)
-    grid = stack([wg, hg], dim=3)
-    # Sample
-    result = grid_sample(volume, grid, mode="bilinear", padding_mode="border", align_corners=False)
-    result = result.squeeze(dim=1).view_as(colors).permute(0, 3, 1, 2)
-    return result
-
-def discrete_curve_3d (input: Tensor, cube: Tensor) -> Tensor:
+    lut = decode_lut(lut, input.dtype, input.device)
+    if lut.ndim == 1:
+        lut = lut.view(1, 1, -1)
+    elif lut.ndim == 2:
+        lut = lut.unsqueeze(dim=0) if lut.shape[0] == 3 else lut.unsqueeze(dim=1)
+    samples, channels, size = lut.shape
+    # Gather in memory order, so that channels-last images are not copied
+    layout = memory_format(input)
+    colors = input.permute(0, 2, 3, 1) if layout == channels_last else input
+    # Find nodes
+    coordinates = colors.add(1.).mul_(0.5 * (size - 1)).clamp_(min=0., max=size - 1)
+    base = coordinates.detach().floor().clamp_(max=size - 2)
+    index = base.int().contiguous()
+    if samples * channels > 1:
+        offset = size * arange(samples * channels, device=input.device, dtype=index.dtype)
+        offset = offset.view(samples, 1, 1, channels) if layout == channels_last else offset.view(samples, channels, 1, 1)
+        index = index.add_(offset)
+    fraction = coordinates.sub_(base)
+    # Interpolate
+    index = index.view(-1)
+    nodes = lut.flatten()
+    slopes = nodes.diff(append=nodes[-1:])
+    result = nodes.index_select(0, index).view_as(colors)
+    result = result.addcmul_(fraction, slopes.index_select(0, index).view_as(colors))
+    result = result.permute(0, 3, 1, 2) if layout == channels_last else result
+    return write_output(result, out)
+
+def discrete_curve_3d (input: Tensor, cube: Tensor, interpolation: str="trilinear", out: Tensor=None) -> Tensor:
     """
     Apply a 3D look-up table to an image.
 
+    The cube is indexed as `cube[b,g,r]`, and its nodes span the [-1., 1.] range in each dimension.
+    A shared cube is applied to the whole batch at once, so it is never copied per sample.
+    Channels-last images are sampled as contiguous color triples. Tetrahedral interpolation runs over
+    bands of rows, so its intermediates stay small for large images.
+
     Parameters:
         input (Tensor): Input image with shape (N,3,H,W) in range [-1., 1.].
-        cube (Tensor): Lookup table with shape (L,L,L,3) in range [-1., 1.].
+        cube (Tensor): Lookup table with shape (L,L,L,3) or (N,L,L,L,3) in range [-1., 1.].
+        interpolation (str): Interpolation mode, either `trilinear` or `tetrahedral`.
+        out (Tensor): Output image with shape (N,3,H,W). If `None`, a new tensor is allocated.
 
     Returns:
         Tensor: Filtered image with shape (N,3,H,W) in range [-1., 1.].
     """
-    # Create volume
-    batch, _, _, _ = input.shape
-    cube = cube.to(input.device)
-    volume = cube.repeat(batch, 1, 1, 1, 1).permute(0, 4, 1, 2, 3)
-    # Create grid
-    grid = input.permute(0, 2, 3, 1).unsqueeze(dim=1)
-    # Sample
-    result = grid_sample(volume, grid, mode="bilinear", padding_mode="border", align_corners=False)
-    result = result.squeeze(dim=2)
+    samples, _, height, width = input.shape
+    cube = decode_lut(cube, input.dtype, input.device)
+    colors = input.permute(0, 2, 3, 1)                                          # NxHxWx3
+    # Interpolate
+    if interpolation == "trilinear" and cube.ndim == 4:
+        volume = cube.permute(3, 0, 1, 2).unsqueeze(dim=0)                      # 1x3xLxLxL
+        grid = colors.reshape(1, 1, samples * height, width, 3)
+        result = grid_sample(volume, grid, mode="bilinear", padding_mode="border", align_corners=True)
+        result = result.view(3, samples, height, width).transpose(0, 1)
+    elif interpolation == "trilinear":
+        volume = cube.permute(0, 4, 1, 2, 3)                                    # Nx3xLxLxL
+        grid = colors.unsqueeze(dim=1)
+        result = grid_sample(volume, grid, mode="bilinear", padding_mode="border", align_corners=True)
+        result = result.squeeze(dim=2)
+    elif interpolation == "tetrahedral":
+        result = out if out is not None and not is_grad_enabled() else empty_like(input)
+        band_height = max(1, LUT_BAND_SIZE // (samples * width))
+        for top in range(0, height, band_height):
+            rows = slice(top, top + band_height)
+            band = _tetrahedral_lookup(colors[:,rows].reshape(samples, -1, 3), cube)
+            result.permute(0, 2, 3, 1)[:,rows] = band.view(samples, -1, width, 3)
+    else:
+        raise ValueError(f"Unsupported interpolation mode: {interpolation}")
+    # Restore layout
+    result = result.contiguous(memory_format=memory_format(input))
+    return write_output(result, out)
+
+def _tetrahedral_lookup (input: Tensor, cube: Tensor) -> Tensor:
+    """
+    Apply a 3D look-up table with tetrahedral interpolation.
+
+    Each lattice cell is split into six tetrahedra along its main diagonal. A color is interpolated
+    between the lower cell corner, the upper cell corner, and the two corners reached by stepping
+    along the axes with the largest fractions first. Only these four nodes are gathered from the
+    flattened cube.
+
+    Parameters:
+        input (Tensor): Input colors with shape (N,P,3) in range [-1., 1.].
+        cube (Tensor): Lookup table with shape (L,L,L,3) or (N,L,L,L,3) in range [-1., 1.].
+
+    Returns:
+        Tensor: Result colors with shape (N,P,3) in range [-1., 1.].
+    """
+    samples, _, _ = input.shape
+    size = cube.shape[-2]
+    nodes = cube.reshape(-1, 3)                                                 # (L*L*L)x3 or (N*L*L*L)x3
+    # Find cell, with node index `r + Lg + L^2b`
+    coordinates = input.add(1.).mul_(0.5 * (size - 1)).clamp_(min=0., max=size - 1)
+    base = coordinates.detach().floor().clamp_(max=size - 2)
+    fraction = coordinates.sub_(base).reshape(-1, 3)
+    strides = constant(("lut_node_strides", size), lambda: tensor([1., size, size * size]), input.device, input.dtype)
+    index = base.matmul(strides).long()                                         # NxP
+    if cube.ndim == 5:
+        index = index.add_(size ** 3 * arange(samples, device=input.device).unsqueeze(dim=1))
+    index = index.view(-1, 1)
+    diagonal = 1 + size + size * size
+    # Select tetrahedron
+    f_1, major = fraction.max(dim=1, keepdim=True)
+    f_3, minor = fraction.min(dim=1, keepdim=True)
+    f_2 = fraction.sum(dim=1, keepdim=True) - f_1 - f_3
+    offsets = constant(("lut_node_offsets", size), lambda: tensor([1, size, size * size]), input.device, int64)
+    major = offsets.index_select(0, major.view(-1)).view(-1, 1)
+    minor = offsets.index_select(0, minor.view(-1)).view(-1, 1)
+    # Interpolate
+    vertex = lambda offset: nodes.index_select(0, (index + offset).view(-1))
+    result = vertex(0) * (1. - f_1)
+    result = result.addcmul_(vertex(major), f_1 - f_2)
+    result = result.addcmul_(vertex(diagonal - minor), f_2 - f_3)
+    result = result.addcmul_(vertex(diagonal), f_3)
+    result = result.view(samples, -1, 3)
     return result
\ No newline at end of file
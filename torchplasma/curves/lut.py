@@ -3,48 +3,102 @@
 #   Copyright (c) 2021 Yusuf Olokoba.
 #
 
+from glob import escape, glob
+from hashlib import sha1
 from imageio import imread
-from torch import float32, tensor, Tensor
+from numpy import array, ascontiguousarray, float32, fromstring, load, save
+from os import makedirs, remove, replace, stat
+from os.path import abspath, basename, dirname, exists, join
+from re import compile, MULTILINE
+from tempfile import NamedTemporaryFile
+from torch import from_numpy, Tensor
 from torchvision.transforms import ToTensor
 
-def cuberead (path: str) -> Tensor:
+CUBE_KEYWORD = compile(r"^[ \t]*([A-Za-z#][^ \t\r\n]*)(.*)$", MULTILINE)
+
+def cuberead (path: str, cache: bool=False, cache_dir: str=None) -> Tensor:
     """
-    Load a 3D LUT from file.
+    Load a 3D or 1D LUT from a CUBE file.
+
+    The numeric block is parsed in a single vectorized pass. When `cache` is enabled, the parsed LUT
+    is written to a sidecar `.npy` file, keyed by the file size and modification time. Later loads
+    memory-map the sidecar instead of parsing the CUBE file again. If the sidecar cannot be written,
+    for instance because the CUBE file lives on a read-only mount, the parsed LUT is returned without caching.
+
+    Sidecars are written next to the CUBE file, or to `cache_dir` when it is given, so that user assets
+    are left untouched. Writing a new sidecar removes stale sidecars of the same CUBE file. Sidecars
+    can otherwise be deleted at any time, for instance by removing the cache directory.
 
     Parameters:
         path (str): Path to CUBE file.
+        cache (bool): Whether to read and write a binary sidecar cache.
+        cache_dir (str): Directory in which sidecars are written. If set, caching is enabled.
 
     Returns:
-        Tensor: 3D LUT with shape (L,L,L,3) in range [-1., 1.].
+        Tensor: 3D LUT with shape (L,L,L,3) or 1D LUT with shape (3,L) in range [-1., 1.].
     """
-    # Read coeffients
+    # Check cache
+    stats = stat(path)
+    cache = cache or cache_dir is not None
+    cache_prefix = _sidecar_prefix(path, cache_dir)
+    cache_path = f"{cache_prefix}.{stats.st_size}-{stats.st_mtime_ns}.npy"
+    if cache and exists(cache_path):
+        return from_numpy(load(cache_path, mmap_mode="c"))
+    # Read header
     with open(path) as file:
-        domain_min = tensor([ 0., 0., 0. ], dtype=float32)
-        domain_max = tensor([ 1., 1., 1. ], dtype=float32)
-        rows = []
-        for line in file:
-            tokens = line.split()
-            if not tokens:
-                continue
-            elif tokens[0][0] == "#":
-                continue
-            elif tokens[0] == "TITLE":
-                continue
-            elif tokens[0] == "LUT_3D_SIZE":
-                size = int(tokens[1])
-            elif tokens[0] == "DOMAIN_MIN":
-                domain_min = tensor([float(x) for x in tokens[1:]], dtype=float32)
-            elif tokens[0] == "DOMAIN_MAX":
-                domain_max = tensor([float(x) for x in tokens[1:]], dtype=float32)
-            else:
-                rows.append([float(x) for x in tokens])
-    # Create cube
-    cube = tensor(rows, dtype=float32)
-    cube = cube.view(size, size, size, 3)
+        text = file.read()
+    keywords = { match[0]: match[1].split() for match in CUBE_KEYWORD.findall(text) }
+    domain_min = array(keywords.get("DOMAIN_MIN", [0., 0., 0.]), dtype=float32)
+    domain_max = array(keywords.get("DOMAIN_MAX", [1., 1., 1.]), dtype=float32)
+    for range_keyword in ("LUT_3D_INPUT_RANGE", "LUT_1D_INPUT_RANGE"):
+        if range_keyword in keywords:
+            low, high = array(keywords[range_keyword], dtype=float32)
+            domain_min, domain_max = low.repeat(3), high.repeat(3)
+    # Read rows
+    rows = fromstring(CUBE_KEYWORD.sub("", text), dtype=float32, sep=" ").reshape(-1, 3)
     # Rescale
-    cube = (cube - domain_min) / (domain_max - domain_min)
-    cube = 2 * cube - 1.
-    return cube
+    rows = (rows - domain_min) / (domain_max - domain_min)
+    rows = 2. * rows - 1.
+    # Create LUT
+    if "LUT_3D_SIZE" in keywords:
+        size = int(keywords["LUT_3D_SIZE"][0])
+        lut = rows.reshape(size, size, size, 3)
+    elif "LUT_1D_SIZE" in keywords:
+        size = int(keywords["LUT_1D_SIZE"][0])
+        lut = ascontiguousarray(rows.reshape(size, 3).T)
+    else:
+        raise ValueError(f"CUBE file does not specify a LUT size: {path}")
+    # Write cache, skipping it when the directory is read-only
+    if cache:
+        try:
+            makedirs(dirname(cache_path), exist_ok=True)
+            with NamedTemporaryFile(dir=dirname(cache_path), suffix=".npy", delete=False) as file:
+                save(file, lut)
+            replace(file.name, cache_path)
+            for stale_path in glob(f"{escape(cache_prefix)}.*-*.npy"):
+                if stale_path != cache_path:
+                    remove(stale_path)
+        except OSError:
+            pass
+    return from_numpy(lut)
+
+def _sidecar_prefix (path: str, cache_dir: str=None) -> str:
+    """
+    Get the path prefix of the sidecar cache files of a CUBE file.
+
+    Parameters:
+        path (str): Path to CUBE file.
+        cache_dir (str): Cache directory. If `None`, the prefix lies next to the CUBE file.
+
+    Returns:
+        str: Sidecar path prefix.
+    """
+    path = abspath(path)
+    if cache_dir is None:
+        return path
+    # Disambiguate CUBE files with the same name in different directories
+    digest = sha1(path.encode("utf-8")).hexdigest()[:16]
+    return join(abspath(cache_dir), f"{basename(path)}.{digest}")
 
 def lutread (path: str) -> Tensor:
     """
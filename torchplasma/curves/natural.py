@@ -3,9 +3,25 @@
 #   Copyright (c) 2021 Yusuf Olokoba.
 #
 
-from torch import tensor, where, Tensor
+from torch import arange, broadcast_tensors, cat, channels_last, diag_embed, searchsorted, stack, tensor, zeros_like, Tensor
+from torch.linalg import solve
 
-def natural_cubic_curve (input: Tensor, control: Tensor) -> Tensor:
+from ..cache import constant, coordinate_grid
+from ..layout import memory_format
+from ..workspace import write_output
+from .discrete import discrete_curve_1d
+
+ANCHORS = tensor([
+    # x = [-1, 0, 1]
+    [-1., -1., -1.],            # c_0
+    [-0.874, -1. / 3., 0.318],  # c_1
+    [-0.686, 1. / 3., 0.812],   # c_2
+    [-0.254, 1., 1.]            # c_3
+])
+
+NATURAL_CUBIC_KNOTS = tensor([-1., -1. / 3., 1. / 3., 1.])
+
+def natural_cubic_curve (input: Tensor, control: Tensor, table_size: int=None, out: Tensor=None) -> Tensor:
     """
     Apply a natural cubic tone curve to an image.
 
@@ -15,60 +31,124 @@ def natural_cubic_curve (input: Tensor, control: Tensor) -> Tensor:
     Parameters:
         input (Tensor): Input image with shape (N,...) in range [-1., 1.].
         control (Tensor): Control value points with shape (N,4) in range [-1., 1.].
+        table_size (int): If provided, the curve is tabulated with this many nodes and applied as a 1D LUT.
+        out (Tensor): Output image with shape (N,...). If `None`, a new tensor is allocated.
 
     Returns:
         Tensor: Result image with shape (N,...) in range [-1., 1.].
     """
-    _, channels, height, width = input.shape
-    x_0, x_1, x_2, x_3 = -1, -1. / 3., 1. / 3., 1.
-    y_0, y_1, y_2, y_3 = control.split(1, dim=1)
-    x = input.flatten(start_dim=1)
-    # Piecewise linear curve
-    m_1 = (y_1 - y_0) / (x_1 - x_0)
-    m_2 = (y_2 - y_1) / (x_2 - x_1)
-    m_3 = (y_3 - y_2) / (x_3 - x_2)
-    l_1 = m_1 * (x - x_0) + y_0
-    l_2 = m_2 * (x - x_1) + y_1
-    l_3 = m_3 * (x - x_3) + y_3
-    # Cubic corrections
-    z_1 = 6 * (m_3 * x_1 + m_2 * x_2 - m_3 * x_2 + 2 * m_2 * x_3 + 2 * m_1 * x_1 - 2 * m_1 * x_3 - 3 * m_2 * x_1) / (4 * (x_0 * x_1 + x_2 * x_3 - x_0 * x_3) - (x_1 + x_2) ** 2)
-    z_2 = 6 * (m_2 * x_1 + m_1 * x_2 - m_1 * x_1 + 2 * m_2 * x_0 + 2 * m_3 * x_2 - 2 * m_3 * x_0 - 3 * m_2 * x_2) / (4 * (x_0 * x_1 + x_2 * x_3 - x_0 * x_3) - (x_1 + x_2) ** 2)
-    a_1 = z_1 / (6 * (x_0 - x_1))
-    b_1 = 2 * z_1 / (6 * (x_1 - x_0))
-    a_2 = (2 * z_1 + z_2) / (6 * (x_1 - x_2))
-    b_2 = (2 * z_2 + z_1) / (6 * (x_2 - x_1))
-    a_3 = z_2 / (3 * (x_2 - x_3))
-    b_3 = z_2 / (6 * (x_3 - x_2))
-    c_1 = a_1 * (x - x_1) ** 2 * (x - x_0) + b_1 * (x - x_1) * (x - x_0) ** 2
-    c_2 = a_2 * (x - x_2) ** 2 * (x - x_1) + b_2 * (x - x_2) * (x - x_1) ** 2
-    c_3 = a_3 * (x - x_3) ** 2 * (x - x_2) + b_3 * (x - x_3) * (x - x_2) ** 2
-    # Final curve
-    y = where(x > x_1, l_2 + c_2, l_1 + c_1)
-    y = where(x > x_2, l_3 + c_3, y)
-    result = y.view(-1, channels, height, width)
+    knots = constant("NATURAL_CUBIC_KNOTS", NATURAL_CUBIC_KNOTS, input.device, input.dtype)
+    result = natural_spline_curve(input, knots, control, table_size=table_size, out=out)
     return result
 
-def tonal_exposure (input: Tensor, weight: Tensor) -> Tensor:
+def natural_spline_curve (input: Tensor, knots: Tensor, values: Tensor, table_size: int=None, out: Tensor=None) -> Tensor:
+    """
+    Apply a natural cubic spline tone curve with arbitrary knots to an image.
+
+    The spline system is solved once per sample. Each pixel then finds its segment with a binary search
+    and evaluates a single cubic, so the cost per pixel does not depend on the number of knots.
+    The curve is extended linearly beyond the first and last knots.
+    Note that this function does not clamp the output tensor to any range.
+
+    When `table_size` is provided, the curve is instead evaluated once per sample on a table spanning
+    [-1., 1.] and applied with `discrete_curve_1d`. Gradients still flow to the knots and values through
+    the table. Input values outside [-1., 1.] are clamped in this mode, and the input must have shape (N,C,H,W).
+
+    A single image is broadcast against per-sample knots and values.
+
+    Parameters:
+        input (Tensor): Input image with shape (N,...) in range [-1., 1.].
+        knots (Tensor): Strictly increasing knot positions with shape (K,) or (N,K) in range [-1., 1.].
+        values (Tensor): Knot values with shape (K,) or (N,K) in range [-1., 1.].
+        table_size (int): If provided, the curve is tabulated with this many nodes and applied as a 1D LUT.
+        out (Tensor): Output image with shape (N,...). If `None`, a new tensor is allocated.
+
+    Returns:
+        Tensor: Result image with shape (N,...) in range [-1., 1.].
+    """
+    knots, values = broadcast_tensors(knots.to(input.device).view(-1, knots.shape[-1]), values.to(input.device).view(-1, values.shape[-1]))
+    samples, size = knots.shape
+    # Broadcast a single image against per-sample curves
+    if samples > input.shape[0]:
+        input = input.expand(samples, *input.shape[1:])
+    # Tabulate
+    if table_size is not None:
+        ramp, = coordinate_grid((table_size,), input.device, input.dtype)
+        table = natural_spline_curve(ramp.repeat(samples, 1), knots, values)
+        return discrete_curve_1d(input, table.view(samples, 1, table_size), out=out)
+    # Compute segments
+    coefficients = _spline_coefficients(knots, values).to(input.dtype)        # 4xSx(K+1)
+    # Gather in memory order, so that channels-last images are not copied
+    layout = memory_format(input)
+    x = input.permute(0, 2, 3, 1) if layout == channels_last else input
+    # Find segments
+    boundaries = knots.detach().to(input.dtype).contiguous()
+    index = searchsorted(boundaries, x.reshape(samples, -1).contiguous(), right=True, out_int32=True)
+    if samples > 1:
+        index = index.add_((size + 1) * arange(samples, device=input.device, dtype=index.dtype).unsqueeze(dim=1))
+    index = index.view(-1)
+    p_0, p_1, p_2, p_3 = [coefficient.flatten().index_select(0, index).view_as(x) for coefficient in coefficients]
+    # Evaluate
+    result = p_2.addcmul_(p_3, x)
+    result = p_1.addcmul_(result, x)
+    result = p_0.addcmul_(result, x)
+    result = result.permute(0, 3, 1, 2) if layout == channels_last else result
+    return write_output(result, out)
+
+def _spline_coefficients (knots: Tensor, values: Tensor) -> Tensor:
+    """
+    Compute power basis coefficients of a natural cubic spline with linear extension.
+
+    Parameters:
+        knots (Tensor): Strictly increasing knot positions with shape (S,K).
+        values (Tensor): Knot values with shape (S,K).
+
+    Returns:
+        Tensor: Coefficients `p_0..p_3` with shape (4,S,K+1), where segment `i` spans knots `i - 1` to `i`.
+    """
+    x, y = knots.double(), values.double()
+    h = x.diff(dim=1)
+    slopes = y.diff(dim=1) / h
+    # Solve for interior second derivatives
+    m = zeros_like(x)
+    if x.shape[1] > 2:
+        system = diag_embed(2. * (h[:,:-1] + h[:,1:])) + diag_embed(h[:,1:-1], offset=1) + diag_embed(h[:,1:-1], offset=-1)
+        rhs = 6. * slopes.diff(dim=1)
+        m = cat([m[:,:1], solve(system, rhs), m[:,:1]], dim=1)
+    # Local coefficients of `y_i + b t + c t^2 + d t^3` with `t = x - x_i`
+    x_i, m_i = x[:,:-1], m[:,:-1]
+    b = slopes - h * (2. * m_i + m[:,1:]) / 6.
+    c = m_i / 2.
+    d = m.diff(dim=1) / (6. * h)
+    # Expand around zero
+    p_0 = y[:,:-1] - b * x_i + c * x_i ** 2 - d * x_i ** 3
+    p_1 = b - 2. * c * x_i + 3. * d * x_i ** 2
+    p_2 = c - 3. * d * x_i
+    p_3 = d
+    # Linear extension
+    first_slope = b[:,:1]
+    last_slope = slopes[:,-1:] + h[:,-1:] * m[:,-2:-1] / 6.
+    zeros = zeros_like(first_slope)
+    lower = stack([y[:,:1] - first_slope * x[:,:1], first_slope, zeros, zeros])
+    upper = stack([y[:,-1:] - last_slope * x[:,-1:], last_slope, zeros, zeros])
+    coefficients = cat([lower, stack([p_0, p_1, p_2, p_3]), upper], dim=2)
+    return coefficients
+
+def tonal_exposure (input: Tensor, weight: Tensor, table_size: int=None, out: Tensor=None) -> Tensor:
     """
     Apply tonal exposure adjustment to an image.
 
     Parameters:
         input (Tensor): Input image with shape (N,3,H,W) in range [-1., 1.].
         weight (Tensor | float): Scalar weight with shape (N,1) in range [-1., 1.].
+        table_size (int): If provided, the tone curve is tabulated with this many nodes and applied as a 1D LUT.
+        out (Tensor): Output image with shape (N,3,H,W). If `None`, a new tensor is allocated.
 
     Returns:
         Tensor: Filtered image with shape (N,3,H,W) in range [-1., 1.].
     """
-    samples, _, _, _ = input.shape
-    ANCHORS = tensor([
-        # x = [-1, 0, 1]
-        [-1., -1., -1.],            # c_0
-        [-0.874, -1. / 3., 0.318],  # c_1
-        [-0.686, 1. / 3., 0.812],   # c_2
-        [-0.254, 1., 1.]            # c_3
-    ])
-    ANCHORS = ANCHORS.repeat(samples, 1, 1).to(input.device)
-    control = 0.5 * ANCHORS[:,:,0] * weight * (weight - 1.) - ANCHORS[:,:,1] * (weight + 1) * (weight - 1) + 0.5 * ANCHORS[:,:,2] * weight * (weight + 1)
-    result = natural_cubic_curve(input, control)
-    result = result.clamp(min=-1., max=1.)
+    anchors = constant("ANCHORS", ANCHORS, input.device, input.dtype).unsqueeze(dim=0)
+    control = 0.5 * anchors[:,:,0] * weight * (weight - 1.) - anchors[:,:,1] * (weight + 1) * (weight - 1) + 0.5 * anchors[:,:,2] * weight * (weight + 1)
+    result = natural_cubic_curve(input, control, table_size=table_size, out=out)
+    result = result.clamp_(min=-1., max=1.)
     return result
\ No newline at end of file
@@ -0,0 +1,159 @@
+# 
+#   Plasma
+#   Copyright (c) 2021 Yusuf Olokoba.
+#
+
+from collections import OrderedDict
+from hashlib import sha1
+from numpy import load, save
+from os import makedirs, replace, stat
+from os.path import abspath, exists, join
+from tempfile import gettempdir, NamedTemporaryFile
+from threading import Lock
+from torch import device as Device, dtype as DType, float16, float32, from_numpy, uint16, Tensor
+
+from ..cache import constant
+from .lut import cuberead, lutread
+
+SHARED_LUT_DIRECTORY = join(gettempdir(), "torchplasma-luts")
+
+_budget = 1 << 30
+_entries = OrderedDict()
+_lock = Lock()
+
+def load_lut (path: str, device: Device="cpu", dtype: DType=float32, shared: bool=False) -> Tensor:
+    """
+    Load a LUT through the process-wide LUT registry.
+
+    LUTs are cached per path, file modification time, device, and storage dtype, with least-recently-used
+    eviction once the registry exceeds its byte budget. Compact `float16` and `uint16` LUTs are expanded
+    on the fly by `discrete_curve_1d` and `discrete_curve_3d`.
+    Shared LUTs are encoded once into a `.npy` file in `SHARED_LUT_DIRECTORY`, which every process memory-maps,
+    so that worker processes created with `multiprocessing` or a `DataLoader` read a single resident copy
+    instead of parsing and holding one each.
+    The returned tensor is shared between callers, so it must never be modified in place.
+
+    Parameters:
+        path (str): Path to CUBE or 16-bit TIFF LUT file.
+        device (torch.device): Device on which the LUT should live.
+        dtype (torch.dtype): Storage dtype, one of `float32`, `float16`, or `uint16`.
+        shared (bool): Whether to memory-map the LUT from a file shared between processes. Shared LUTs must live on the CPU.
+
+    Returns:
+        Tensor: 3D LUT with shape (L,L,L,3), or 1D LUT with shape (3,L) or (L,).
+    """
+    if dtype not in (float32, float16, uint16):
+        raise ValueError(f"Unsupported LUT storage dtype: {dtype}")
+    if shared and Device(device).type != "cpu":
+        raise ValueError(f"Shared LUTs must live on the CPU, but got device: {device}")
+    path = abspath(path)
+    stats = stat(path)
+    entry_key = (path, stats.st_size, stats.st_mtime_ns, Device(device), dtype, shared)
+    with _lock:
+        if entry_key in _entries:
+            _entries.move_to_end(entry_key)
+            return _entries[entry_key]
+    lut = _map_shared_lut(path, entry_key) if shared else encode_lut(_read_lut(path), dtype).to(device)
+    with _lock:
+        _entries[entry_key] = lut
+        _evict()
+    return lut
+
+def encode_lut (input: Tensor, dtype: DType) -> Tensor:
+    """
+    Encode a LUT for compact storage.
+
+    Parameters:
+        input (Tensor): LUT with shape (...) in range [-1., 1.].
+        dtype (torch.dtype): Storage dtype, one of `float32`, `float16`, or `uint16`.
+
+    Returns:
+        Tensor: Encoded LUT with shape (...).
+    """
+    if dtype == uint16:
+        return input.add(1.).mul_(65535. / 2.).round_().clamp_(min=0., max=65535.).to(uint16)
+    return input.to(dtype)
+
+def decode_lut (input: Tensor, dtype: DType=float32, device: Device=None) -> Tensor:
+    """
+    Decode a compactly stored LUT.
+
+    LUTs held by the registry are decoded once per device and dtype, and the decoded LUT is cached
+    so that it is shared between calls. The decoded LUT must never be modified in place.
+
+    Parameters:
+        input (Tensor): Encoded LUT with shape (...).
+        dtype (torch.dtype): Floating point dtype of the decoded LUT.
+        device (torch.device): Device of the decoded LUT. If `None`, the LUT stays on its device.
+
+    Returns:
+        Tensor: LUT with shape (...) in range [-1., 1.].
+    """
+    device = Device(device) if device is not None else input.device
+    if input.dtype == dtype and input.device == device:
+        return input
+    # Check registry
+    with _lock:
+        entry_key = next((key for key, lut in _entries.items() if lut is input), None)
+    if entry_key is not None:
+        return constant(("decode_lut", entry_key), lambda: _decode_lut(input.to(device), dtype), device, dtype)
+    return _decode_lut(input.to(device), dtype)
+
+def clear_luts () -> None:
+    """
+    Clear all LUTs from the registry.
+    """
+    with _lock:
+        _entries.clear()
+
+def set_lut_budget (nbytes: int) -> None:
+    """
+    Set the maximum total size of LUTs held by the registry.
+
+    Parameters:
+        nbytes (int): Maximum total size in bytes.
+    """
+    global _budget
+    with _lock:
+        _budget = nbytes
+        _evict()
+
+def _decode_lut (input: Tensor, dtype: DType) -> Tensor:
+    """
+    Decode a compactly stored LUT on its device.
+    """
+    if input.dtype == uint16:
+        return input.to(dtype).mul_(2. / 65535.).sub_(1.)
+    return input.to(dtype)
+
+def _read_lut (path: str) -> Tensor:
+    """
+    Read a LUT file.
+    """
+    return cuberead(path) if path.lower().endswith(".cube") else lutread(path)
+
+def _map_shared_lut (path: str, entry_key: tuple) -> Tensor:
+    """
+    Memory-map a LUT from its shared `.npy` file, encoding the LUT file on first use.
+    The file name is derived from the path, size, modification time, and storage dtype of the LUT.
+    """
+    _, size, mtime, _, dtype, _ = entry_key
+    name = sha1(f"{path}:{size}:{mtime}:{dtype}".encode()).hexdigest()
+    shared_path = join(SHARED_LUT_DIRECTORY, f"{name}.npy")
+    if not exists(shared_path):
+        lut = encode_lut(_read_lut(path), dtype)
+        makedirs(SHARED_LUT_DIRECTORY, exist_ok=True)
+        with NamedTemporaryFile(dir=SHARED_LUT_DIRECTORY, suffix=".npy", delete=False) as file:
+            save(file, lut.numpy())
+        replace(file.name, shared_path)
+    return from_numpy(load(shared_path, mmap_mode="c"))
+
+def _evict () -> None:
+    """
+    Evict least-recently-used LUTs until the registry fits its budget.
+    The registry lock must be held by the caller.
+    """
+    nbytes = sum(lut.numel() * lut.element_size() for lut in _entries.values())
+    while _entries and nbytes > _budget:
+        _, lut = _entries.popitem(last=False)
+        nbytes -= lut.numel() * lut.element_size()
\ No newline at end of file
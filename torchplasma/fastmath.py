@@ -0,0 +1,125 @@
+# 
+#   Plasma
+#   Copyright (c) 2021 Yusuf Olokoba.
+#
+
+from contextlib import contextmanager
+from threading import local
+from torch import addcmul, float64, is_grad_enabled, tensor, where, Tensor
+from typing import Iterator
+
+from .cache import constant
+
+_state = local()
+
+# Coefficients in increasing order, fitted on Chebyshev nodes in the [-1., 1.] range
+SRGB_TO_LINEAR_COEFFICIENTS = tensor([-0.5719555371, 0.9255935045, 0.584420867, 0.06987368246, -0.01141660901, 0.003515144429])
+LINEAR_TO_SRGB_COEFFICIENTS = tensor([-1.12968741, 0.3960804798, 2.234696697, -0.6587465612, 0.1577126584])
+
+def set_fast_math (enabled: bool) -> None:
+    """
+    Enable or disable fast math on the current thread.
+
+    In fast math mode, `srgb_to_linear` and `linear_to_srgb` replace the sRGB transfer function
+    powers with polynomial approximations, which are evaluated with fused multiply-adds in the
+    [-1., 1.] range. Inputs are clamped to this range, and the maximum absolute error of either
+    conversion is below 1/4096. Approximations remain differentiable. Double precision tensors are
+    always computed exactly. Other threads are not affected.
+
+    Parameters:
+        enabled (bool): Whether fast math is enabled.
+    """
+    _state.enabled = enabled
+
+@contextmanager
+def fast_math (enabled: bool=True) -> Iterator[None]:
+    """
+    Enable or disable fast math within a context on the current thread.
+    See `set_fast_math` for details.
+
+    Parameters:
+        enabled (bool): Whether fast math is enabled within the context.
+    """
+    previous = is_fast_math_enabled()
+    set_fast_math(enabled)
+    try:
+        yield
+    finally:
+        set_fast_math(previous)
+
+def is_fast_math_enabled (input: Tensor=None) -> bool:
+    """
+    Check whether fast math is enabled on the current thread.
+
+    Parameters:
+        input (Tensor): Tensor to be computed. If provided, fast math is never used for double precision tensors.
+
+    Returns:
+        bool: Whether fast math is enabled.
+    """
+    return getattr(_state, "enabled", False) and (input is None or input.dtype != float64)
+
+def fast_srgb_to_linear (input: Tensor) -> Tensor:
+    """
+    Approximate the conversion from sRGB to linear RGB.
+
+    Parameters:
+        input (Tensor): Input image with shape (...) in range [-1., 1.].
+
+    Returns:
+        Tensor: Linear RGB image with shape (...) in range [-1., 1.], with maximum absolute error 6e-5.
+    """
+    coefficients = constant("SRGB_TO_LINEAR_COEFFICIENTS", SRGB_TO_LINEAR_COEFFICIENTS, input.device, input.dtype)
+    input = input.clamp(min=-1., max=1.)
+    power = _polynomial(input, coefficients)
+    linear = (input + 1.) / 12.92 - 1.
+    result = where(input > 2. * 0.0404482362771082 - 1., power, linear, out=_inplace(power))
+    return result
+
+def fast_linear_to_srgb (input: Tensor) -> Tensor:
+    """
+    Approximate the conversion from linear RGB to sRGB.
+
+    The polynomial is evaluated on the fourth root of the linear values, which is computed with two square roots.
+
+    Parameters:
+        input (Tensor): Input image with shape (...) in range [-1., 1.].
+
+    Returns:
+        Tensor: sRGB image with shape (...) in range [-1., 1.], with maximum absolute error 9e-5.
+    """
+    coefficients = constant("LINEAR_TO_SRGB_COEFFICIENTS", LINEAR_TO_SRGB_COEFFICIENTS, input.device, input.dtype)
+    root = ((input + 1.) / 2.).clamp_(min=1e-4, max=1.) # Prevent NaN on sqrt::backward
+    linear = 25.84 * root - 1.
+    root = root.sqrt_().sqrt_() if not is_grad_enabled() else root.sqrt().sqrt()
+    power = _polynomial(root, coefficients)
+    result = where(input > 2. * 0.00313066844250063 - 1., power, linear, out=_inplace(power))
+    return result
+
+def _polynomial (input: Tensor, coefficients: Tensor) -> Tensor:
+    """
+    Evaluate a polynomial with Horner's method.
+
+    Parameters:
+        input (Tensor): Input values with shape (...).
+        coefficients (Tensor): Polynomial coefficients in increasing order with shape (K,).
+
+    Returns:
+        Tensor: Polynomial values with shape (...).
+    """
+    result = addcmul(coefficients[-2], input, coefficients[-1])
+    for coefficient in coefficients[:-2].flip(0):
+        result = addcmul(coefficient, result, input, out=_inplace(result))
+    return result
+
+def _inplace (input: Tensor) -> Tensor:
+    """
+    Get the output tensor for an elementwise operation which may overwrite its input.
+
+    Parameters:
+        input (Tensor): Intermediate tensor owned by the caller.
+
+    Returns:
+        Tensor: The input tensor, or `None` if gradients are enabled.
+    """
+    return input if not is_grad_enabled() else None
\ No newline at end of file
@@ -3,8 +3,10 @@
 #   Copyright (c) 2021 Yusuf Olokoba.
 #
 
-from .bilateral import bilateral_filter, splat_bilateral_grid, slice_bilateral_grid
+from .bilateral import bilateral_filter, fit_bilateral_affine_grid, splat_bilateral_grid, slice_bilateral_affine_grid, slice_bilateral_grid, BilateralGrid
 from .box import box_filter
+from .fft import fft_filter
 from .gaussian import gaussian_kernel, gaussian_filter, gaussian_filter_3d
 from .guided import guided_filter
-from .log import laplacian_of_gaussian_filter
\ No newline at end of file
+from .log import laplacian_of_gaussian_filter
+from .pyramid import collapse_laplacian_pyramid, gaussian_pyramid, laplacian_pyramid, local_laplacian_filter, pyramid_downsample, pyramid_levels, pyramid_upsample
\ No newline at end of file
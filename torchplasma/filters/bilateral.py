@@ -3,74 +3,257 @@
 #   Copyright (c) 2021 Yusuf Olokoba.
 #
 
-from torch import cat, linspace, meshgrid, ones, ones_like, stack, where, Tensor
-from torch.nn.functional import grid_sample, interpolate, pad
+from torch import add, cat, device as Device, dtype as DType, eye, is_grad_enabled, mul, ones, ones_like, where, zeros, Tensor
+from torch.linalg import solve
+from torch.nn.functional import grid_sample
 from typing import Optional, Tuple
 
+from ..cache import coordinate_grid
 from ..conversion import rgb_to_luminance
+from ..layout import memory_format
+from ..workspace import write_output
 from .gaussian import gaussian_filter_3d
 
-def bilateral_filter (input: Tensor, guide: Tensor, kernel_size: Tuple[int, int], grid_size: Optional[Tuple[int, int, int]]=None) -> Tensor:
+SPLAT_BAND_SIZE = 1 << 18
+AFFINE_MOMENT_INDICES = ([0, 0, 0, 1, 1, 2], [0, 1, 2, 1, 2, 2])
+
+class BilateralGrid:
+    """
+    Bilateral grid geometry for a fixed guide.
+
+    The guide-dependent splatting and slicing geometry is computed on first use and reused by every later
+    `splat` and `slice` call, so several edge-aware operations on the same guide share it. A guide with a
+    single sample can be used with inputs of any batch size.
+
+    Example:
+        bilateral_grid = BilateralGrid(luminance, (16, 256, 256))
+        grid = bilateral_grid.blur(bilateral_grid.splat(image), (5, 5))
+        base = bilateral_grid.slice(grid, homogenous=True)
+    """
+
+    def __init__ (self, guide: Tensor, grid_size: Tuple[int, int, int]):
+        """
+        Create a bilateral grid.
+
+        Parameters:
+            guide (Tensor): Guide map with shape (N,1,H,W) in range [-1., 1.].
+            grid_size (tuple): Grid size in each dimension (I,Sy,Sx), each at least 2.
+        """
+        self.guide = guide
+        self.grid_size = tuple(grid_size)
+        self._splat_geometry = None
+        self._slice_grid = None
+
+    def splat (self, input: Tensor, out: Tensor=None) -> Tensor:
+        """
+        Splat an image into a homogenous bilateral grid.
+
+        Every pixel is scattered into its eight neighbouring grid cells with trilinear weights, so the cost scales
+        with the number of pixels and the grid only holds accumulators. Cells are placed so that slicing is the
+        adjoint of splatting. Accumulators are normalized by the number of pixels per spatial cell, so the
+        homogenous coordinate is close to one for a uniform guide.
+
+        Parameters:
+            input (Tensor): Input image with shape (N,C,H,W).
+            out (Tensor): Output bilateral grid with shape (N,D,I,Sy,Sx). If `None`, a new tensor is allocated.
+
+        Returns:
+            Tensor: Bilateral grid with shape (N,D,I,Sy,Sx), where D = C + 1.
+        """
+        samples, channels, height, width = input.shape
+        intensity_bins, spatial_bins_y, spatial_bins_x = self.grid_size
+        geometry = self._get_splat_geometry()
+        density = spatial_bins_y * spatial_bins_x / (height * width)
+        # Create grid
+        grid_shape = (samples, channels + 1, intensity_bins * spatial_bins_y * spatial_bins_x)
+        grid = zeros(grid_shape, device=input.device, dtype=input.dtype)
+        # Splat in bands of rows to bound the size of intermediates
+        corner_index, corner_values = None, None
+        for n in range(samples):
+            for rows, index, i_fraction, y_fraction, x_fraction in geometry[n if len(geometry) > 1 else 0]:
+                band = input[n,:,rows]
+                weight = ones(1, *band.shape[1:], device=input.device, dtype=input.dtype)
+                values = cat([band, weight], dim=0).view(channels + 1, -1)       # Dx(B*W)
+                for di, i_weight in ((0, 1. - i_fraction), (1, i_fraction)):
+                    for dy, y_weight in ((0, 1. - y_fraction), (1, y_fraction)):
+                        for dx, x_weight in ((0, 1. - x_fraction), (1, x_fraction)):
+                            offset = (di * spatial_bins_y + dy) * spatial_bins_x + dx
+                            corner_weight = i_weight * (density * y_weight * x_weight)
+                            corner_index = add(index, offset, out=_reuse(corner_index, index))
+                            corner_values = mul(values, corner_weight.view(1, -1), out=_reuse(corner_values, values))
+                            grid[n].index_add_(1, corner_index.view(-1), corner_values)
+        # Reshape
+        grid = grid.view(samples, channels + 1, intensity_bins, spatial_bins_y, spatial_bins_x)
+        return write_output(grid, out)
+
+    def blur (self, input: Tensor, kernel_size: Tuple[int, int], out: Tensor=None) -> Tensor:
+        """
+        Blur a bilateral grid.
+
+        Grids are blurred by direct convolution, since grid kernels are small and the grid is usually the
+        largest tensor in a pipeline, which makes frequency domain buffers costly.
+
+        Parameters:
+            input (Tensor): Input bilateral grid with shape (N,C,I,Sy,Sx).
+            kernel_size (tuple): Kernel size in intensity and spatial dimensions (Ki,Ks).
+            out (Tensor): Output bilateral grid with shape (N,C,I,Sy,Sx). If `None`, a new tensor is allocated.
+
+        Returns:
+            Tensor: Blurred bilateral grid with shape (N,C,I,Sy,Sx).
+        """
+        intensity_kernel_size, spatial_kernel_size = kernel_size
+        kernel_size = (intensity_kernel_size, spatial_kernel_size, spatial_kernel_size)
+        return gaussian_filter_3d(input, kernel_size, method="direct", out=out)
+
+    def slice (self, input: Tensor, homogenous: bool=False, out: Tensor=None) -> Tensor:
+        """
+        Slice a bilateral grid to an image.
+
+        Parameters:
+            input (Tensor): Input bilateral grid with shape (N,C,I,Sy,Sx).
+            homogenous (bool): Whether a homogenous divide is to be performed. The last channel is assumed to be the homogenous coordinate.
+            out (Tensor): Output image with shape (N,D,H,W). If `None`, a new tensor is allocated.
+
+        Returns:
+            Tensor: Sliced image with shape (N,D,H,W), where D = C-1 if homogenous else C.
+        """
+        samples, channels, _, _, _ = input.shape
+        slice_grid = self._get_slice_grid(input.device, input.dtype)
+        slice_grid = slice_grid.expand(samples, -1, -1, -1, -1)
+        # Sample
+        result = grid_sample(input, slice_grid, mode="bilinear", padding_mode="reflection", align_corners=False)
+        result = result.squeeze(dim=2)  # NxDxHxW
+        result = result.contiguous(memory_format=memory_format(self.guide))
+        # Check for homogenous divide
+        if not homogenous:
+            return write_output(result, out)
+        # Perform homogenous divide
+        result, weight = result.split(channels-1, dim=1)
+        weight = where(weight <= 0, ones_like(weight), weight) # Prevent divide by zero
+        result = result / weight
+        return write_output(result, out)
+
+    def slice_affine (self, input: Tensor, grid: Tensor, out: Tensor=None) -> Tensor:
+        """
+        Slice a bilateral grid of affine color transforms and apply them to an image.
+
+        Coefficients are sliced and applied in bands of rows, so the full resolution coefficient map is never
+        materialized.
+
+        Parameters:
+            input (Tensor): Input image with shape (N,3,H,W).
+            grid (Tensor): Bilateral grid of row-major 3x4 affine transforms with shape (N,12,I,Sy,Sx).
+            out (Tensor): Output image with shape (N,3,H,W). If `None`, a new tensor is allocated.
+
+        Returns:
+            Tensor: Result image with shape (N,3,H,W).
+        """
+        samples, _, height, width = input.shape
+        slice_grid = self._get_slice_grid(grid.device, grid.dtype)
+        slice_grid = slice_grid.expand(samples, -1, -1, -1, -1)
+        result = out if out is not None and not is_grad_enabled() else input.new_empty(input.shape)
+        band_height = max(1, SPLAT_BAND_SIZE // width)
+        for top in range(0, height, band_height):
+            rows = slice(top, top + band_height)
+            coefficients = grid_sample(grid, slice_grid[:,:,rows], mode="bilinear", padding_mode="reflection", align_corners=False)
+            coefficients = coefficients.view(samples, 3, 4, -1, width)          # Nx3x4xBxW
+            band = input[:,:,rows].unsqueeze(dim=1)                             # Nx1x3xBxW
+            result[:,:,rows] = (coefficients[:,:,:3] * band).sum(dim=2) + coefficients[:,:,3]
+        return write_output(result, out)
+
+    def _get_splat_geometry (self) -> list:
+        """
+        Get the splatting geometry, computing it on first use.
+
+        Returns:
+            list: Bands of each guide sample, each with the row slice, lower cell index, and intensity, row, and column fractions.
+        """
+        if self._splat_geometry is not None:
+            return self._splat_geometry
+        samples, _, height, width = self.guide.shape
+        intensity_bins, spatial_bins_y, spatial_bins_x = self.grid_size
+        hg, = coordinate_grid((height,), self.guide.device, self.guide.dtype)
+        wg, = coordinate_grid((width,), self.guide.device, self.guide.dtype)
+        y, y_fraction = _grid_cell(hg.view(-1, 1), spatial_bins_y)                # Hx1
+        x, x_fraction = _grid_cell(wg.view(1, -1), spatial_bins_x)                # 1xW
+        spatial_index = y * spatial_bins_x + x
+        band_height = max(1, SPLAT_BAND_SIZE // width)
+        self._splat_geometry = []
+        for n in range(samples):
+            bands = []
+            for top in range(0, height, band_height):
+                rows = slice(top, top + band_height)
+                i, i_fraction = _grid_cell(self.guide[n,0,rows], intensity_bins)  # BxW
+                index = i.mul_(spatial_bins_y * spatial_bins_x).add_(spatial_index[rows])
+                bands.append((rows, index, i_fraction, y_fraction[rows], x_fraction))
+            self._splat_geometry.append(bands)
+        return self._splat_geometry
+
+    def _get_slice_grid (self, device: Device, dtype: DType) -> Tensor:
+        """
+        Get the slicing grid, computing it on first use.
+
+        Parameters:
+            device (torch.device): Device of the bilateral grid.
+            dtype (torch.dtype): Data type of the bilateral grid.
+
+        Returns:
+            Tensor: Slice grid with shape (N,1,H,W,3).
+        """
+        if self._slice_grid is not None and self._slice_grid.device == device and self._slice_grid.dtype == dtype:
+            return self._slice_grid
+        samples, _, height, width = self.guide.shape
+        hg, wg = coordinate_grid((height, width), device, dtype)
+        hg = hg.expand(samples, -1, -1).unsqueeze(dim=3)
+        wg = wg.expand(samples, -1, -1).unsqueeze(dim=3)
+        slice_grid = self.guide.to(device=device, dtype=dtype).permute(0, 2, 3, 1)    # NxHxWx1
+        slice_grid = cat([wg, hg, slice_grid], dim=3)                               # NxHxWx3
+        self._slice_grid = slice_grid.unsqueeze(dim=1)                              # Nx1xHxWx3
+        return self._slice_grid
+
+def bilateral_filter (input: Tensor, guide: Tensor, kernel_size: Tuple[int, int], grid_size: Optional[Tuple[int, int, int]]=None, out: Tensor=None) -> Tensor:
     """
     Apply the joint bilateral filter to an image.
 
     We utilize the Bilateral Grid as described by Chen et al.
     https://people.csail.mit.edu/sparis/publi/2007/siggraph/Chen_07_Bilateral_Grid.pdf
+    All channels share a single grid with one homogenous weight, so the grid is splatted, blurred, and sliced once.
 
     Parameters:
         input (Tensor): Input image with shape (N,C,H,W).
         guide (Tensor): Guide image with shape (N,1,H,W).
         kernel_size (tuple): Kernel size in intensity and spatial dimensions (Ki,Ks).
         grid_size (tuple): Bilateral grid size. If `None`, a suitable default will be used.
+        out (Tensor): Output image with shape (N,C,H,W). If `None`, a new tensor is allocated.
 
     Returns:
         Tensor: Filtered image with shape (N,C,H,W).
     """
-    kernel_size = (kernel_size[0], kernel_size[1], kernel_size[1])
     grid_size = grid_size if grid_size is not None else (16, 512, 512)
-    channels = input.split(1, dim=1)
-    result = []
-    for channel in channels:
-        grid = splat_bilateral_grid(channel, guide, grid_size)
-        grid = gaussian_filter_3d(grid, kernel_size)
-        channel = slice_bilateral_grid(grid, guide, homogenous=True)
-        result.append(channel)
-    result = cat(result, dim=1)
+    bilateral_grid = BilateralGrid(guide, grid_size)
+    grid = bilateral_grid.splat(input)
+    grid = bilateral_grid.blur(grid, kernel_size)
+    result = bilateral_grid.slice(grid, homogenous=True, out=out)
+    result = result.contiguous(memory_format=memory_format(input)) if out is None else result
     return result
 
-def splat_bilateral_grid (input: Tensor, guide: Tensor, grid_size: Tuple[int, int, int]) -> Tensor:
+def splat_bilateral_grid (input: Tensor, guide: Tensor, grid_size: Tuple[int, int, int], out: Tensor=None) -> Tensor:
     """
     Splat an image into a homogenous bilateral grid.
+    See `BilateralGrid.splat` for details.
 
     Parameters:
         input (Tensor): Input image with shape (N,C,H,W).
         guide (Tensor): Splatting guide map with shape (N,1,H,W) in range [-1., 1.].
-        grid_size (tuple): Grid size in each dimension (I,Sy,Sx).
+        grid_size (tuple): Grid size in each dimension (I,Sy,Sx), each at least 2.
+        out (Tensor): Output bilateral grid with shape (N,D,I,Sy,Sx). If `None`, a new tensor is allocated.
 
     Returns:
         tuple: Bilateral grid with shape (N,D,I,Sy,Sx), where D = C + 1.
     """
-    samples, _,_,_ = input.shape
-    intensity_bins, spatial_bins_y, spatial_bins_x = grid_size
-    # Downsample
-    downsampled_input = interpolate(input, size=(spatial_bins_y, spatial_bins_x), mode="bilinear", align_corners=False) # NxCxSxS
-    downsampled_guide = interpolate(guide, size=(spatial_bins_y, spatial_bins_x), mode="bilinear", align_corners=False) # Nx1xSxS
-    # Create volume
-    input_grid = downsampled_input.unsqueeze(dim=2) # NxCx1xSxS
-    weight_grid = ones(samples, 1, 1, spatial_bins_y, spatial_bins_x).to(input.device) # Nx1x1xSxS
-    input_grid = cat([input_grid, weight_grid], dim=1) # NxDx1xSxS
-    input_volume = pad(input_grid, (0, 0, 0, 0, 0, intensity_bins - 1, 0, 0), "constant", 0.) # NxCxIxSxS
-    # Create sample grid
-    ig, hg, wg = meshgrid(linspace(-1., 1., intensity_bins), linspace(-1., 1., spatial_bins_y), linspace(-1., 1., spatial_bins_x))
-    ig = ig.repeat(samples, 1, 1, 1).to(input.device) - (downsampled_guide + 1.)
-    hg = hg.repeat(samples, 1, 1, 1).to(input.device)
-    wg = wg.repeat(samples, 1, 1, 1).to(input.device)
-    sample_grid = stack([wg, hg, ig], dim=4)
-    # Sample
-    intensity_grid = grid_sample(input_volume, sample_grid, mode="bilinear", padding_mode="reflection", align_corners=False)
-    return intensity_grid
-
-def slice_bilateral_grid (input: Tensor, guide: Tensor, homogenous: bool=False) -> Tensor:
+    return BilateralGrid(guide, grid_size).splat(input, out=out)
+
+def slice_bilateral_grid (input: Tensor, guide: Tensor, homogenous: bool=False, out: Tensor=None) -> Tensor:
     """
     Slice a bilateral grid to an image.
 
@@ -78,27 +261,111 @@ def slice_bilateral_grid (input: Tensor, guide: Tensor, homogenous: bool=False)
         input (Tensor): Input bilateral grid with shape (N,C,I,Sy,Sx).
         guide (Tensor): Slicing guide map with shape (N,1,H,W) in range [-1., 1.].
         homogenous (bool): Whether a homogenous divide is to be performed. The last channel is assumed to be the homogenous coordinate.
+        out (Tensor): Output image with shape (N,D,H,W). If `None`, a new tensor is allocated.
 
     Returns:
         Tensor: Sliced image with shape (N,D,H,W), where D = C-1 if homogenous else C.
     """
-    _, channels, _, _, _ = input.shape
-    samples, _, height, width = guide.shape
-    # Create slice grid
-    hg, wg = meshgrid(linspace(-1., 1., height), linspace(-1., 1., width))
-    hg = hg.repeat(samples, 1, 1).unsqueeze(dim=3).to(input.device)
-    wg = wg.repeat(samples, 1, 1).unsqueeze(dim=3).to(input.device)
-    slice_grid = guide.permute(0, 2, 3, 1).contiguous()     # NxHxWx1
-    slice_grid = cat([wg, hg, slice_grid], dim=3)           # NxHxWx3
-    slice_grid = slice_grid.unsqueeze(dim=1)                # Nx1xHxWx3
-    # Sample
-    result = grid_sample(input, slice_grid, mode="bilinear", padding_mode="reflection", align_corners=False)
-    result = result.squeeze(dim=2)  # NxDxHxW
-    # Check for homogenous divide
-    if not homogenous:
-        return result
-    # Perform homogenous divide
-    result, weight = result.split(channels-1, dim=1)
-    weight = where(weight <= 0, ones_like(weight), weight) # Prevent divide by zero
-    result = result / weight
-    return result
\ No newline at end of file
+    _, _, intensity_bins, spatial_bins_y, spatial_bins_x = input.shape
+    return BilateralGrid(guide, (intensity_bins, spatial_bins_y, spatial_bins_x)).slice(input, homogenous=homogenous, out=out)
+
+def slice_bilateral_affine_grid (input: Tensor, grid: Tensor, guide: Tensor, out: Tensor=None) -> Tensor:
+    """
+    Apply a bilateral grid of local affine color transforms to an image.
+
+    This transfers an edit computed at low resolution to a full resolution image, as described by Chen et al.
+    https://groups.csail.mit.edu/graphics/bgu/
+    See `BilateralGrid.slice_affine` for details.
+
+    Parameters:
+        input (Tensor): Input image with shape (N,3,H,W).
+        grid (Tensor): Bilateral grid of row-major 3x4 affine transforms with shape (N,12,I,Sy,Sx).
+        guide (Tensor): Slicing guide map with shape (N,1,H,W) in range [-1., 1.].
+        out (Tensor): Output image with shape (N,3,H,W). If `None`, a new tensor is allocated.
+
+    Returns:
+        Tensor: Result image with shape (N,3,H,W).
+    """
+    _, _, intensity_bins, spatial_bins_y, spatial_bins_x = grid.shape
+    return BilateralGrid(guide, (intensity_bins, spatial_bins_y, spatial_bins_x)).slice_affine(input, grid, out=out)
+
+def fit_bilateral_affine_grid (
+    input: Tensor,
+    target: Tensor,
+    guide: Tensor,
+    grid_size: Tuple[int, int, int],
+    kernel_size: Tuple[int, int]=(3, 3),
+    eps: float=1e-3
+) -> Tensor:
+    """
+    Fit a bilateral grid of local affine color transforms which maps an image to an edited target.
+
+    The least squares moments of each grid cell are splatted into a bilateral grid and blurred, and every cell
+    is then solved for the affine transform which best maps input colors to target colors. The fit is
+    regularized towards the identity transform, so empty cells leave colors unchanged.
+
+    Parameters:
+        input (Tensor): Input image with shape (N,3,h,w).
+        target (Tensor): Edited image with shape (N,3,h,w).
+        guide (Tensor): Splatting guide map with shape (N,1,h,w) in range [-1., 1.].
+        grid_size (tuple): Grid size in each dimension (I,Sy,Sx).
+        kernel_size (tuple): Blur kernel size in intensity and spatial dimensions (Ki,Ks).
+        eps (float): Regularization weight towards the identity transform.
+
+    Returns:
+        Tensor: Bilateral grid of row-major 3x4 affine transforms with shape (N,12,I,Sy,Sx).
+    """
+    samples, _, _, _ = input.shape
+    intensity_bins, spatial_bins_y, spatial_bins_x = grid_size
+    # Splat moments
+    rows, columns = AFFINE_MOMENT_INDICES
+    moments = cat([input[:,rows] * input[:,columns], input, (target.unsqueeze(dim=2) * input.unsqueeze(dim=1)).flatten(1, 2), target], dim=1)
+    bilateral_grid = BilateralGrid(guide, grid_size)
+    grid = bilateral_grid.splat(moments)
+    grid = bilateral_grid.blur(grid, kernel_size)
+    grid = grid.permute(0, 2, 3, 4, 1).reshape(-1, grid.shape[1])             # (N*I*Sy*Sx)x22
+    # Assemble normal equations
+    covariance = grid.new_empty(grid.shape[0], 4, 4)
+    covariance[:,rows,columns] = grid[:,:6]
+    covariance[:,columns,rows] = grid[:,:6]
+    covariance[:,:3,3] = grid[:,6:9]
+    covariance[:,3,:3] = grid[:,6:9]
+    covariance[:,3,3] = grid[:,21]
+    correlation = cat([grid[:,9:18].view(-1, 3, 3), grid[:,18:21].view(-1, 3, 1)], dim=2) # (N*I*Sy*Sx)x3x4
+    # Solve
+    identity = eye(3, 4, device=input.device, dtype=input.dtype)
+    regularization = eps * eye(4, device=input.device, dtype=input.dtype)
+    affine = solve(covariance + regularization, (correlation + eps * identity).transpose(1, 2)).transpose(1, 2)
+    affine = affine.reshape(samples, intensity_bins, spatial_bins_y, spatial_bins_x, 12).permute(0, 4, 1, 2, 3)
+    return affine.contiguous()
+
+def _grid_cell (input: Tensor, size: int) -> Tuple[Tensor, Tensor]:
+    """
+    Find the lower grid cell and fractional offset of normalized coordinates.
+
+    Parameters:
+        input (Tensor): Coordinates with shape (...) in range [-1., 1.].
+        size (int): Number of grid cells along the axis.
+
+    Returns:
+        tuple: Lower cell index and fraction, each with shape (...).
+    """
+    coordinates = input.add(1.).mul_(0.5 * size).sub_(0.5).clamp_(min=0., max=size - 1)
+    cell = coordinates.detach().floor().clamp_(max=size - 2)
+    fraction = coordinates - cell
+    return cell.long(), fraction
+
+def _reuse (temporary: Optional[Tensor], input: Tensor) -> Optional[Tensor]:
+    """
+    Get a temporary from a previous loop iteration, if it can be overwritten.
+
+    Parameters:
+        temporary (Tensor): Temporary from the previous iteration.
+        input (Tensor): Tensor which the temporary must match in shape.
+
+    Returns:
+        Tensor: The temporary, or `None` if gradients are enabled or its shape does not match.
+    """
+    if temporary is None or is_grad_enabled() or temporary.shape != input.shape:
+        return None
+    return temporary
\ No newline at end of file
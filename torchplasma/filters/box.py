@@ -3,25 +3,80 @@
 #   Copyright (c) 2021 Yusuf Olokoba.
 #
 
-from torch import ones, Tensor
+from torch import float64, ones, zeros_like, Tensor
 from torch.nn.functional import conv2d, pad
 
-def box_filter (input: Tensor, radius: int) -> Tensor: # TEST
+from ..cache import constant
+from ..workspace import write_output
+
+RUNNING_SUM_RADIUS = 6
+
+def box_filter (input: Tensor, radius: int, out: Tensor=None) -> Tensor: # TEST
     """
     Apply a box filter to a 2D image.
 
+    For radii of at least `RUNNING_SUM_RADIUS`, the filter is computed with running sums along each axis,
+    so its cost does not depend on the radius. Smaller radii use a direct convolution.
+    Borders are handled by replicating edge pixels.
+
     Parameters:
         input (Tensor): Input image with shape (N,C,H,W).
         radius (int): Filter window radius.
+        out (Tensor): Output image with shape (N,C,H,W). If `None`, a new tensor is allocated.
 
     Returns:
         Tensor: Filtered image with shape (N,C,H,W).
     """
     _,channels,_,_ = input.shape
-    # Build kernels
     kernel_size = 2 * radius + 1
-    kernel = ones(channels, 1, kernel_size, kernel_size).to(input.device) / (kernel_size ** 2)
+    # Running sums
+    if radius >= RUNNING_SUM_RADIUS:
+        sums = _running_sum(input, radius, dim=3)
+        sums = _running_sum(sums, radius, dim=2)
+        result = sums.div_(kernel_size ** 2).to(input.dtype)
+        return write_output(result, out)
+    # Build kernels
+    kernel = constant(("box_kernel", kernel_size), lambda: ones(1, 1, kernel_size, kernel_size) / (kernel_size ** 2), input.device, input.dtype)
+    kernel = kernel.expand(channels, 1, kernel_size, kernel_size)
     # Filter
     padded_input = pad(input, (radius, radius, radius, radius), mode="replicate")
     result = conv2d(padded_input, kernel, groups=channels)
-    return result
\ No newline at end of file
+    return write_output(result, out)
+
+def _running_sum (input: Tensor, radius: int, dim: int) -> Tensor:
+    """
+    Compute the sum over a sliding window along one spatial dimension.
+
+    Every window sum is the difference of two prefix sums, so prefix sums must be accurate on large images.
+    On the CPU they are accumulated in double precision. Other devices, where double precision is slow or
+    unsupported, accumulate in single precision and add a second prefix sum of the rounding error of each step.
+
+    Parameters:
+        input (Tensor): Input image with shape (N,C,H,W).
+        radius (int): Window radius.
+        dim (int): Spatial dimension, either 2 or 3.
+
+    Returns:
+        Tensor: Window sums with shape (N,C,H,W) in double precision on the CPU, and single precision otherwise.
+    """
+    length = input.shape[dim]
+    window = lambda prefix: prefix.narrow(dim, 2 * radius + 1, length) - prefix.narrow(dim, 0, length)
+    # Pad, with one leading sample so that the first window has a prefix sum to subtract
+    padding = (radius + 1, radius, 0, 0) if dim == 3 else (0, 0, radius + 1, radius)
+    padded_input = pad(input, padding, mode="replicate")
+    # Accumulate
+    if _accumulates_in_double(input):
+        prefix = padded_input.cumsum(dim=dim, dtype=float64)
+        return window(prefix)
+    padded_input = padded_input.float()
+    prefix = padded_input.cumsum(dim=dim)
+    steps = prefix.diff(dim=dim, prepend=zeros_like(prefix.narrow(dim, 0, 1)))
+    error = padded_input.sub_(steps).cumsum(dim=dim)
+    result = window(prefix).add_(window(error))
+    return result
+
+def _accumulates_in_double (input: Tensor) -> bool:
+    """
+    Check whether running sums over an image are accumulated in double precision.
+    """
+    return input.device.type == "cpu" or input.dtype == float64
\ No newline at end of file
@@ -0,0 +1,90 @@
+# 
+#   Plasma
+#   Copyright (c) 2021 Yusuf Olokoba.
+#
+
+from collections import OrderedDict
+from threading import Lock
+from time import perf_counter
+from torch import no_grad, Tensor
+from torch.cuda import synchronize
+from torch.fft import irfftn, rfftn
+from torch.nn.functional import pad
+from typing import Callable, Hashable
+
+from ..workspace import write_output
+
+_capacity = 256
+_decisions = OrderedDict()
+_lock = Lock()
+
+def fft_filter (input: Tensor, kernel: Tensor, padding_mode: str="zeros", out: Tensor=None) -> Tensor:
+    """
+    Filter an image or volume with a kernel, by multiplication in the frequency domain.
+
+    The result matches a depthwise `conv2d` or `conv3d` with the same kernel for every channel, where the
+    input is padded by half the kernel size with the padding mode. All samples and channels are
+    transformed at once.
+
+    Parameters:
+        input (Tensor): Input image with shape (N,C,H,W) or volume with shape (N,C,D,H,W).
+        kernel (Tensor): Kernel with shape (Ky,Kx) or (Kz,Ky,Kx).
+        padding_mode (str): Border handling, one of `zeros`, `replicate`, or `reflect`.
+        out (Tensor): Output tensor with the same shape as the convolution result. If `None`, a new tensor is allocated.
+
+    Returns:
+        Tensor: Filtered image or volume.
+    """
+    dims = tuple(range(-kernel.ndim, 0))
+    # Pad
+    padding = [size // 2 for size in reversed(kernel.shape) for _ in range(2)]
+    padded_input = pad(input, padding, mode="constant" if padding_mode == "zeros" else padding_mode)
+    size = padded_input.shape[-kernel.ndim:]
+    # Multiply spectra, flipping the kernel since convolution layers compute correlations
+    input_spectrum = rfftn(padded_input, s=size, dim=dims)
+    kernel_spectrum = rfftn(kernel.flip(dims), s=size, dim=dims)
+    result = irfftn(input_spectrum.mul_(kernel_spectrum), s=size, dim=dims)
+    # Keep samples which did not wrap around
+    for dim, kernel_size in zip(dims, kernel.shape):
+        result = result.narrow(dim, kernel_size - 1, result.shape[dim] - kernel_size + 1)
+    return write_output(result, out)
+
+def is_fft_faster (key: Hashable, direct: Callable[[], Tensor], fft: Callable[[], Tensor]) -> bool:
+    """
+    Check whether a filter runs faster in the frequency domain than by direct convolution.
+
+    Both implementations are timed on first use, and the decision is cached per key, with
+    least-recently-used eviction.
+
+    Parameters:
+        key (Hashable): Decision key. This should identify the filter, input size class, kernel size, device, and dtype.
+        direct (callable): Function which runs the direct convolution.
+        fft (callable): Function which runs the FFT convolution.
+
+    Returns:
+        bool: Whether the FFT convolution is faster.
+    """
+    with _lock:
+        if key in _decisions:
+            _decisions.move_to_end(key)
+            return _decisions[key]
+    with no_grad():
+        direct_time, fft_time = _measure(direct), _measure(fft)
+    with _lock:
+        _decisions[key] = fft_time < direct_time
+        while len(_decisions) > _capacity:
+            _decisions.popitem(last=False)
+    return fft_time < direct_time
+
+def _measure (function: Callable[[], Tensor]) -> float:
+    """
+    Measure the run time of a function, after one warm-up run.
+    """
+    result = function()
+    if result.is_cuda:
+        synchronize(result.device)
+    start = perf_counter()
+    result = function()
+    if result.is_cuda:
+        synchronize(result.device)
+    return perf_counter() - start
\ No newline at end of file
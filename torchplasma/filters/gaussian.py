@@ -3,10 +3,19 @@
 #   Copyright (c) 2021 Yusuf Olokoba.
 #
 
-from torch import arange, exp, tensor, Tensor
+from math import ceil, prod, sqrt
+from torch import arange, cat, exp, float64, stack, tensor, zeros, Tensor
 from torch.nn.functional import conv2d, conv3d, pad
 from typing import Tuple
 
+from ..cache import constant
+from ..workspace import write_output
+from .fft import fft_filter, is_fft_faster
+
+FFT_KERNEL_FOOTPRINT = 49
+RECURSIVE_KERNEL_SIZE = 31
+RECURSIVE_BLOCK_SIZE = 32
+
 def gaussian_kernel (kernel_size: int, sigma: float = -1.) -> Tensor:
     """
     Normalized 1D Gaussian kernel.
@@ -19,59 +28,288 @@ def gaussian_kernel (kernel_size: int, sigma: float = -1.) -> Tensor:
     Returns:
         Tensor: Normalized Gaussian kernel with shape (K,).
     """
-    sigma = 0.3 * ((kernel_size - 1) * 0.5 - 1) + 0.8 if sigma < 0 else sigma # From OpenCV ::getGaussianKernel
+    sigma = _kernel_sigma(kernel_size) if sigma < 0 else sigma
     x = arange(kernel_size).float() - kernel_size // 2
     x = x + 0.5 if kernel_size % 2 == 0 else x
     kernel = exp((-x.pow(2.) / (2. * sigma ** 2)))
     return kernel / kernel.sum()
 
-def gaussian_filter (input: Tensor, kernel_size: Tuple[int, int]) -> Tensor:
+def gaussian_filter (input: Tensor, kernel_size: Tuple[int, int], method: str="auto", padding_mode: str="zeros", out: Tensor=None) -> Tensor:
     """
     Apply a Gaussian filter to an image.
 
+    The `direct` method convolves with separable Gaussian kernels, so its cost grows with the kernel size.
+    The `fft` method computes the same convolution in the frequency domain.
+    The `recursive` method uses the recursive Gaussian approximation of Young and van Vliet along each axis,
+    so its cost per pixel does not depend on the kernel size. The `auto` method uses the recursive filter
+    for kernel sizes of at least `RECURSIVE_KERNEL_SIZE`. For kernels of at least `FFT_KERNEL_FOOTPRINT`
+    elements below that size, it uses whichever of the direct and FFT methods is measured to be faster
+    on the first call with a given shape and device.
+    https://doi.org/10.1016/0165-1684(95)00020-E
+
     Parameters:
         input (Tensor): Input image with shape (N,C,H,W).
         kernel_size (tuple): Kernel size in each dimension (Ky,Kx).
+        method (str): Filtering method, one of `auto`, `direct`, `fft`, or `recursive`.
+        padding_mode (str): Border handling, one of `zeros`, `replicate`, or `reflect`.
+        out (Tensor): Output image with shape (N,C,H,W). If `None`, a new tensor is allocated.
 
     Returns:
         Tensor: Filtered image with shape (N,C,H,W).
     """
-    _,channels,_,_ = input.shape
-    kernel_size_y, kernel_size_x = kernel_size
-    # Compute kernels
-    kernel_x = gaussian_kernel(kernel_size_x).to(input.device)
-    kernel_y = gaussian_kernel(kernel_size_y).to(input.device)
-    # Reshape
-    kernel_x = kernel_x.expand(channels, 1, 1, -1)
-    kernel_y = kernel_y.expand(channels, 1, 1, -1).permute(0, 1, 3, 2).contiguous()
-    # Seperable convolution
-    result = conv2d(input, kernel_x, padding=(0, kernel_size_x // 2), groups=channels)
-    result = conv2d(result, kernel_y, padding=(kernel_size_y // 2, 0), groups=channels)
-    return result
+    method = _gaussian_method(method, input, kernel_size, padding_mode)
+    result = GAUSSIAN_METHODS[method](input, kernel_size, padding_mode)
+    return write_output(result, out)
 
-def gaussian_filter_3d (input: Tensor, kernel_size: Tuple[int, int, int]) -> Tensor:
+def gaussian_filter_3d (input: Tensor, kernel_size: Tuple[int, int, int], method: str="auto", padding_mode: str="zeros", out: Tensor=None) -> Tensor:
     """
     Apply a Gaussian filter to a volume.
+    See `gaussian_filter` for the available methods.
 
     Parameters:
         input (Tensor): Input volume with shape (N,C,D,H,W).
         kernel_size (tuple): Kernel size in each dimension (Kz,Ky,Kx).
+        method (str): Filtering method, one of `auto`, `direct`, `fft`, or `recursive`.
+        padding_mode (str): Border handling, one of `zeros`, `replicate`, or `reflect`.
+        out (Tensor): Output volume with shape (N,C,D,H,W). If `None`, a new tensor is allocated.
 
     Returns:
         Tensor: Filtered volume with shape (N,C,D,H,W).
     """
-    _,channels,_,_,_ = input.shape
-    kernel_size_z, kernel_size_y, kernel_size_x = kernel_size
-    # Compute kernels
-    kernel_x = gaussian_kernel(kernel_size_x).to(input.device)
-    kernel_y = gaussian_kernel(kernel_size_y).to(input.device)
-    kernel_z = gaussian_kernel(kernel_size_z).to(input.device)
-    # Reshape
-    kernel_x = kernel_x.expand(channels, 1, 1, 1, -1)
-    kernel_y = kernel_y.expand(channels, 1, 1, 1, -1).permute(0, 1, 2, 4, 3).contiguous()
-    kernel_z = kernel_z.expand(channels, 1, 1, 1, -1).permute(0, 1, 4, 2, 3).contiguous()
-    # Seperable convolution
-    result = conv3d(input, kernel_x, padding=(0, 0, kernel_size_x // 2), groups=channels)
-    result = conv3d(result, kernel_y, padding=(0, kernel_size_y // 2, 0), groups=channels)
-    result = conv3d(result, kernel_z, padding=(kernel_size_z // 2, 0, 0), groups=channels)
-    return result
\ No newline at end of file
+    method = _gaussian_method(method, input, kernel_size, padding_mode)
+    result = GAUSSIAN_METHODS[method](input, kernel_size, padding_mode)
+    return write_output(result, out)
+
+def _direct_gaussian (input: Tensor, kernel_size: Tuple[int, ...], padding_mode: str) -> Tensor:
+    """
+    Apply a Gaussian filter by separable direct convolution.
+
+    On the CPU, each pass is a weighted sum of shifted slices, which avoids the large column buffers that
+    depthwise convolutions allocate there. Other devices use depthwise convolutions.
+
+    Parameters:
+        input (Tensor): Input image with shape (N,C,H,W) or volume with shape (N,C,D,H,W).
+        kernel_size (tuple): Kernel size in each spatial dimension.
+        padding_mode (str): Border handling, one of `zeros`, `replicate`, or `reflect`.
+
+    Returns:
+        Tensor: Filtered image or volume.
+    """
+    if input.device.type == "cpu":
+        return _shifted_gaussian(input, kernel_size, padding_mode)
+    channels = input.shape[1]
+    convolution = conv2d if len(kernel_size) == 2 else conv3d
+    paddings = [size // 2 for size in kernel_size]
+    # Pad
+    if padding_mode != "zeros":
+        input = pad(input, [padding for padding in reversed(paddings) for _ in range(2)], mode=padding_mode)
+        paddings = [0] * len(paddings)
+    # Seperable convolution, starting with the last dimension
+    result = input
+    for axis in reversed(range(len(kernel_size))):
+        size = kernel_size[axis]
+        kernel = constant(("gaussian_kernel", size), lambda: gaussian_kernel(size), input.device, input.dtype)
+        shape = [1] * len(kernel_size)
+        shape[axis] = size
+        padding = [0] * len(kernel_size)
+        padding[axis] = paddings[axis]
+        kernel = kernel.view(1, 1, *shape).expand(channels, -1, *shape)
+        result = convolution(result, kernel, padding=tuple(padding), groups=channels)
+    return result
+
+def _shifted_gaussian (input: Tensor, kernel_size: Tuple[int, ...], padding_mode: str) -> Tensor:
+    """
+    Apply a Gaussian filter by separable weighted sums of shifted slices.
+
+    Parameters:
+        input (Tensor): Input image with shape (N,C,H,W) or volume with shape (N,C,D,H,W).
+        kernel_size (tuple): Kernel size in each spatial dimension.
+        padding_mode (str): Border handling, one of `zeros`, `replicate`, or `reflect`.
+
+    Returns:
+        Tensor: Filtered image or volume.
+    """
+    result = input
+    for axis in reversed(range(len(kernel_size))):
+        size, dim = kernel_size[axis], axis + 2
+        weights = gaussian_kernel(size).tolist()
+        # Pad this dimension only
+        padding = [0] * (2 * len(kernel_size))
+        padding[2 * (len(kernel_size) - 1 - axis):2 * (len(kernel_size) - axis)] = [size // 2, size // 2]
+        padded_input = pad(result, padding, mode="constant" if padding_mode == "zeros" else padding_mode)
+        # Accumulate
+        length = padded_input.shape[dim] - size + 1
+        result = padded_input.narrow(dim, 0, length) * weights[0]
+        for offset in range(1, size):
+            result = result.add_(padded_input.narrow(dim, offset, length), alpha=weights[offset])
+    return result
+
+def _fft_gaussian (input: Tensor, kernel_size: Tuple[int, ...], padding_mode: str) -> Tensor:
+    """
+    Apply a Gaussian filter by convolution in the frequency domain.
+
+    Parameters:
+        input (Tensor): Input image with shape (N,C,H,W) or volume with shape (N,C,D,H,W).
+        kernel_size (tuple): Kernel size in each spatial dimension.
+        padding_mode (str): Border handling, one of `zeros`, `replicate`, or `reflect`.
+
+    Returns:
+        Tensor: Filtered image or volume.
+    """
+    kernel = constant(("gaussian_kernel_nd", tuple(kernel_size)), lambda: _outer_kernel(kernel_size), input.device, input.dtype)
+    return fft_filter(input, kernel, padding_mode=padding_mode)
+
+def _recursive_gaussian_nd (input: Tensor, kernel_size: Tuple[int, ...], padding_mode: str) -> Tensor:
+    """
+    Apply a recursive Gaussian filter along every spatial dimension.
+
+    Parameters:
+        input (Tensor): Input image with shape (N,C,H,W) or volume with shape (N,C,D,H,W).
+        kernel_size (tuple): Kernel size in each spatial dimension.
+        padding_mode (str): Border handling, one of `zeros`, `replicate`, or `reflect`.
+
+    Returns:
+        Tensor: Filtered image or volume.
+    """
+    result = input
+    for axis in reversed(range(len(kernel_size))):
+        result = _recursive_gaussian(result, _kernel_sigma(kernel_size[axis]), axis + 2, padding_mode)
+    return result
+
+def _outer_kernel (kernel_size: Tuple[int, ...]) -> Tensor:
+    """
+    Compute a dense Gaussian kernel as the outer product of 1D kernels.
+    """
+    kernel = gaussian_kernel(kernel_size[0])
+    for size in kernel_size[1:]:
+        kernel = kernel.unsqueeze(dim=-1) * gaussian_kernel(size)
+    return kernel
+
+def _kernel_sigma (kernel_size: int) -> float:
+    """
+    Compute the Gaussian standard deviation for a kernel size, following OpenCV ::getGaussianKernel.
+    """
+    return 0.3 * ((kernel_size - 1) * 0.5 - 1) + 0.8
+
+def _gaussian_method (method: str, input: Tensor, kernel_size: Tuple[int, ...], padding_mode: str) -> str:
+    """
+    Resolve the Gaussian filtering method for an input and kernel size.
+    """
+    if method not in ("auto", *GAUSSIAN_METHODS):
+        raise ValueError(f"Unsupported Gaussian filter method: {method}")
+    if method != "auto":
+        return method
+    if max(kernel_size) >= RECURSIVE_KERNEL_SIZE:
+        return "recursive"
+    if prod(kernel_size) < FFT_KERNEL_FOOTPRINT:
+        return "direct"
+    size_class = tuple(1 << (size - 1).bit_length() for size in input.shape)
+    key = ("gaussian_filter", size_class, tuple(kernel_size), padding_mode, input.device, input.dtype)
+    direct = lambda: _direct_gaussian(input, kernel_size, padding_mode)
+    fft = lambda: _fft_gaussian(input, kernel_size, padding_mode)
+    return "fft" if is_fft_faster(key, direct, fft) else "direct"
+
+def _recursive_gaussian (input: Tensor, sigma: float, dim: int, padding_mode: str) -> Tensor:
+    """
+    Apply a recursive Gaussian filter along one dimension.
+
+    The line is extended by four standard deviations with the padding mode, then filtered with a causal
+    and an anti-causal pass. Each pass starts as if its first sample extended infinitely outwards.
+
+    Parameters:
+        input (Tensor): Input tensor.
+        sigma (float): Gaussian standard deviation.
+        dim (int): Dimension along which to filter.
+        padding_mode (str): Border handling, one of `zeros`, `replicate`, or `reflect`.
+
+    Returns:
+        Tensor: Filtered tensor with the same shape as the input.
+    """
+    lines = input.movedim(dim, -1)
+    shape = lines.shape
+    length = shape[-1]
+    lines = lines.reshape(-1, 1, length)
+    # Pad, so that the causal response decays within the margin before the anti-causal pass starts
+    margin = ceil(4. * sigma)
+    margin = min(margin, length - 1) if padding_mode == "reflect" else margin
+    if margin > 0:
+        lines = pad(lines, (margin, margin), mode="constant" if padding_mode == "zeros" else padding_mode)
+    lines = lines.squeeze(dim=1)
+    # Filter, starting each pass in the steady state of its first sample
+    steady = padding_mode != "zeros"
+    lines = _recursive_pass(lines, sigma, steady)
+    lines = _recursive_pass(lines.flip(-1), sigma, steady).flip(-1)
+    lines = lines[:,margin:margin + length]
+    result = lines.reshape(shape).movedim(-1, dim)
+    return result
+
+def _recursive_pass (input: Tensor, sigma: float, steady: bool) -> Tensor:
+    """
+    Apply the causal pass of the recursive Gaussian filter along the last dimension.
+
+    The line is processed in blocks. Each block's response to its own inputs is a single matrix product,
+    and only the three-sample recursion state is carried from block to block.
+
+    Parameters:
+        input (Tensor): Input lines with shape (M,L).
+        sigma (float): Gaussian standard deviation.
+        steady (bool): Whether the recursion starts in the steady state of the first sample, instead of at zero.
+
+    Returns:
+        Tensor: Filtered lines with shape (M,L).
+    """
+    lines, length = input.shape
+    block_size = RECURSIVE_BLOCK_SIZE
+    matrices = constant(("recursive_gaussian", sigma, block_size), lambda: _recursive_matrices(sigma, block_size), input.device, input.dtype)
+    response, carry = matrices.split([block_size, 3], dim=1)                   # TxT, Tx3
+    # Respond to block inputs
+    blocks = pad(input, (0, -length % block_size)).view(lines, -1, block_size)  # MxBxT
+    result = blocks.matmul(response.t())
+    # Carry state across blocks
+    state = input[:,:1].expand(-1, 3) if steady else zeros(lines, 3, device=input.device, dtype=input.dtype)
+    states = []
+    for block in result.unbind(dim=1):
+        states.append(state)
+        state = block[:,-3:].flip(-1) + state.matmul(carry[-3:].flip(0).t())
+    result = result + stack(states, dim=1).matmul(carry.t())
+    result = result.view(lines, -1)[:,:length]
+    return result
+
+def _recursive_matrices (sigma: float, block_size: int) -> Tensor:
+    """
+    Compute the block matrices of the causal recursive Gaussian filter of Young and van Vliet.
+
+    Parameters:
+        sigma (float): Gaussian standard deviation.
+        block_size (int): Block size.
+
+    Returns:
+        Tensor: Block input response with shape (T,T) and recursion state response with shape (T,3), concatenated to shape (T,T+3).
+    """
+    # Coefficients
+    sigma = max(sigma, 0.5)
+    q = 0.98711 * sigma - 0.96330 if sigma >= 2.5 else 3.97156 - 4.14554 * sqrt(1. - 0.26891 * sigma)
+    b_0 = 1.57825 + 2.44413 * q + 1.4281 * q ** 2 + 0.422205 * q ** 3
+    b_1 = 2.44413 * q + 2.85619 * q ** 2 + 1.26661 * q ** 3
+    b_2 = -(1.4281 * q ** 2 + 1.26661 * q ** 3)
+    b_3 = 0.422205 * q ** 3
+    feedback = [b_1 / b_0, b_2 / b_0, b_3 / b_0]
+    gain = 1. - sum(feedback)
+    # Impulse response and state responses
+    def run (history, impulse):
+        history = list(history)
+        for t in range(block_size):
+            value = (gain if t == 0 and impulse else 0.) + sum(a * y for a, y in zip(feedback, history[-1:-4:-1]))
+            history.append(value)
+        return history[3:]
+    impulse = run([0., 0., 0.], True)
+    states = [run([1. if k == j else 0. for k in (2, 1, 0)], False) for j in range(3)]
+    response = tensor([[impulse[t - s] if t >= s else 0. for s in range(block_size)] for t in range(block_size)], dtype=float64)
+    carry = tensor(states, dtype=float64).t()
+    return cat([response, carry], dim=1)
+
+GAUSSIAN_METHODS = {
+    "direct": _direct_gaussian,
+    "fft": _fft_gaussian,
+    "recursive": _recursive_gaussian_nd,
+}
\ No newline at end of file
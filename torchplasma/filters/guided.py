@@ -3,41 +3,90 @@
 #   Copyright (c) 2021 Yusuf Olokoba.
 #
 
-from torch import Tensor
-from torch.nn.functional import conv2d, interpolate
+from torch import addcmul, cat, div, mul, Tensor
+from torch.nn.functional import interpolate
+from typing import Tuple
 
+from ..workspace import buffer, direct_output, write_output
 from .box import box_filter
 
-def guided_filter (input: Tensor, guide: Tensor, radius: int, eps: float) -> Tensor:
+def guided_filter (input: Tensor, guide: Tensor, radius: int, eps: float, scale: int=1, out: Tensor=None) -> Tensor:
     """
     Apply the guided image filter to a 2D image.
 
+    When `scale` is greater than one, the fast guided filter is used: the linear model is computed on a
+    guide and input which are downsampled by the scale factor, and only the averaged model coefficients
+    are upsampled and applied to the full resolution guide.
+
     http://kaiminghe.com/publications/pami12guidedfilter.pdf
+    https://arxiv.org/abs/1505.00996
 
     Parameters:
         input (Tensor): Input image with shape (N,C,Sx,Sy).
         guide (Tensor): Guide image with shape (N,1,H,W).
         radius (int): Filter window radius.
         eps (float): Ridge regularization coefficient.
+        scale (int): Subsampling factor of the fast guided filter.
+        out (Tensor): Output image with shape (N,C,H,W). If `None`, a new tensor is allocated.
 
     Returns:
         Tensor: Filtered image with shape (N,C,H,W).
     """
-    # Upsample input
+    if scale < 1:
+        raise ValueError(f"Guided filter scale must be at least 1, but got {scale}")
+    samples, channels, _, _ = input.shape
     _, _, height, width = guide.shape
-    input = interpolate(input, size=(height, width), mode="bilinear", align_corners=False)
+    temporary = lambda name, shape, like: buffer(("guided_filter", name), shape, like.device, like.dtype)
+    # Resample
+    size = (max(height // scale, 1), max(width // scale, 1))
+    radius = max(round(radius / scale), 1) if scale > 1 else radius
+    input = _resample(input, size)
+    guide_low = _resample(guide, size).expand(samples, -1, -1, -1)
+    # Compute statistics in one pass
+    statistics_shape = (samples, 2 * channels + 2, *size)
+    statistics = cat([
+        guide_low,
+        input,
+        mul(guide_low, guide_low, out=temporary("guide_2", guide_low.shape, guide_low)),
+        mul(input, guide_low, out=temporary("input_guide", input.shape, input))
+    ], dim=1, out=temporary("statistics", statistics_shape, input))
+    statistics = box_filter(statistics, radius, out=temporary("statistics_mean", statistics_shape, input))
+    guide_mean, input_mean, guide_mean_2, input_guide_mean = statistics.split([1, channels, 1, channels], dim=1)
     # Guide variance
-    guide_mean = box_filter(guide, radius)
-    guide_mean_2 = box_filter(guide.pow(2.), radius)
-    guide_variance = guide_mean_2 - guide_mean.pow(2.)
+    guide_variance = addcmul(guide_mean_2, guide_mean, guide_mean, value=-1., out=temporary("guide_variance", guide_mean.shape, input))
+    guide_variance = guide_variance.add_(eps)
     # Input covariance
-    input_mean = box_filter(input, radius)
-    input_guide_mean = box_filter(input * guide, radius)
-    input_guide_covariance = input_guide_mean - guide_mean * input_mean
+    input_guide_covariance = addcmul(input_guide_mean, guide_mean, input_mean, value=-1., out=temporary("input_guide_covariance", input.shape, input))
     # Compute linear model
-    a = input_guide_covariance / (guide_variance + eps)
-    b = input_mean - a * guide_mean
+    coefficients_shape = (samples, 2 * channels, *size)
+    coefficients = temporary("coefficients", coefficients_shape, input)
+    a, b = coefficients.split(channels, dim=1) if coefficients is not None else (None, None)
+    a = div(input_guide_covariance, guide_variance, out=a)
+    b = addcmul(input_mean, a, guide_mean, value=-1., out=b)
+    coefficients = cat([a, b], dim=1) if coefficients is None else coefficients
     # Apply model
-    a_mean = box_filter(a, radius)
-    b_mean = box_filter(b, radius)
-    return a_mean * guide + b_mean
\ No newline at end of file
+    coefficients = box_filter(coefficients, radius, out=temporary("coefficients_mean", coefficients_shape, input))
+    coefficients = _resample(coefficients, (height, width))
+    a_mean, b_mean = coefficients.split(channels, dim=1)
+    result = addcmul(b_mean, a_mean, guide, out=direct_output(out, a_mean, b_mean, guide))
+    return write_output(result, out)
+
+def _resample (input: Tensor, size: Tuple[int, int]) -> Tensor:
+    """
+    Resample an image to a given size.
+
+    Images are downsampled by area averaging, and upsampled with bilinear interpolation.
+
+    Parameters:
+        input (Tensor): Input image with shape (N,C,H,W).
+        size (tuple): Output size (H',W').
+
+    Returns:
+        Tensor: Resampled image with shape (N,C,H',W').
+    """
+    _, _, height, width = input.shape
+    if (height, width) == tuple(size):
+        return input
+    if height >= size[0] and width >= size[1]:
+        return interpolate(input, size=size, mode="area")
+    return interpolate(input, size=size, mode="bilinear", align_corners=False)
\ No newline at end of file
@@ -0,0 +1,181 @@
+# 
+#   Plasma
+#   Copyright (c) 2021 Yusuf Olokoba.
+#
+
+from math import log2
+from torch import exp, tensor, Tensor
+from torch.nn.functional import conv2d, interpolate, pad
+from typing import List, Tuple, Union
+
+from ..cache import constant
+from ..layout import sample_weight
+from ..workspace import write_output
+
+def pyramid_downsample (input: Tensor) -> Tensor:
+    """
+    Blur and downsample an image by a factor of two.
+
+    The image is blurred with a separable 5-tap binomial kernel with replicate padding,
+    and every other pixel is kept.
+
+    Parameters:
+        input (Tensor): Input image with shape (N,C,H,W).
+
+    Returns:
+        Tensor: Downsampled image with shape (N,C,ceil(H/2),ceil(W/2)).
+    """
+    _,channels,_,_ = input.shape
+    kernel = constant("pyramid_kernel", lambda: tensor([1., 4., 6., 4., 1.]) / 16., input.device, input.dtype)
+    kernel_x = kernel.expand(channels, 1, 1, -1)
+    kernel_y = kernel.view(-1, 1).expand(channels, 1, -1, 1)
+    padded_input = pad(input, (2, 2, 2, 2), mode="replicate")
+    result = conv2d(padded_input, kernel_x, stride=(1, 2), groups=channels)
+    result = conv2d(result, kernel_y, stride=(2, 1), groups=channels)
+    return result
+
+def pyramid_upsample (input: Tensor, size: Tuple[int, int]) -> Tensor:
+    """
+    Upsample a pyramid level to the size of the next finer level.
+
+    Parameters:
+        input (Tensor): Input image with shape (N,C,h,w).
+        size (tuple): Output size (H,W).
+
+    Returns:
+        Tensor: Upsampled image with shape (N,C,H,W).
+    """
+    return interpolate(input, size=size, mode="bilinear", align_corners=False)
+
+def gaussian_pyramid (input: Tensor, levels: int) -> List[Tensor]:
+    """
+    Build a Gaussian pyramid.
+
+    Parameters:
+        input (Tensor): Input image with shape (N,C,H,W).
+        levels (int): Number of pyramid levels, including the input.
+
+    Returns:
+        list: Pyramid levels from finest to coarsest, where level `l` has shape (N,C,H/2^l,W/2^l).
+    """
+    pyramid = [input]
+    for _ in range(levels - 1):
+        pyramid.append(pyramid_downsample(pyramid[-1]))
+    return pyramid
+
+def laplacian_pyramid (input: Tensor, levels: int) -> List[Tensor]:
+    """
+    Build a Laplacian pyramid.
+
+    Parameters:
+        input (Tensor): Input image with shape (N,C,H,W).
+        levels (int): Number of pyramid levels, including the low-pass residual.
+
+    Returns:
+        list: Band-pass levels from finest to coarsest, followed by the low-pass residual.
+    """
+    pyramid = gaussian_pyramid(input, levels)
+    for level in range(levels - 1):
+        fine, coarse = pyramid[level], pyramid[level + 1]
+        pyramid[level] = fine - pyramid_upsample(coarse, fine.shape[2:])
+    return pyramid
+
+def collapse_laplacian_pyramid (pyramid: List[Tensor], out: Tensor=None) -> Tensor:
+    """
+    Reconstruct an image from its Laplacian pyramid.
+
+    Levels are broadcast against each other, so levels can be edited per sample.
+
+    Parameters:
+        pyramid (list): Band-pass levels from finest to coarsest, followed by the low-pass residual.
+        out (Tensor): Output image with shape (N,C,H,W). If `None`, a new tensor is allocated.
+
+    Returns:
+        Tensor: Reconstructed image with shape (N,C,H,W).
+    """
+    result = pyramid[-1]
+    for level in reversed(pyramid[:-1]):
+        result = pyramid_upsample(result, level.shape[2:]) + level
+    return write_output(result, out)
+
+def pyramid_levels (input: Tensor, size: int=8) -> int:
+    """
+    Compute the number of pyramid levels needed to reduce an image to a given size.
+
+    Parameters:
+        input (Tensor): Input image with shape (N,C,H,W).
+        size (int): Maximum size of the shorter side of the coarsest level.
+
+    Returns:
+        int: Number of pyramid levels.
+    """
+    _,_,height,width = input.shape
+    return max(int(log2(max(min(height, width) / size, 1.))) + 1, 1)
+
+def local_laplacian_filter (
+    input: Tensor,
+    detail: Union[Tensor, float],
+    sigma: float,
+    levels: int=None,
+    min_level: int=0,
+    samples: int=8,
+    out: Tensor=None
+) -> Tensor:
+    """
+    Apply the fast local Laplacian filter to an image.
+
+    Each band-pass level of the result is interpolated from the Laplacian pyramids of a few
+    remapped copies of the image, where each copy boosts or attenuates details of amplitude
+    below `sigma` around a sampled intensity. Levels finer than `min_level` are passed through, and
+    the remapped copies are built from the Gaussian pyramid level `min_level`, so coarse-scale edits
+    only run on small images.
+
+    https://people.csail.mit.edu/sparis/publi/2011/siggraph/
+    https://people.csail.mit.edu/hasinoff/pubs/AubryEtAl14-FastLocalLaplacian.pdf
+
+    Parameters:
+        input (Tensor): Input image with shape (N,C,H,W) in range [-1., 1.].
+        detail (Tensor | float): Detail weight with shape (N,1) in range [-1., 1.]. Positive weights enhance details, and negative weights smooth them.
+        sigma (float): Detail amplitude threshold in range (0., 2.].
+        levels (int): Number of pyramid levels. If `None`, levels are added until the coarsest level is at most 8 pixels across.
+        min_level (int): Finest pyramid level which is filtered.
+        samples (int): Number of intensity samples.
+        out (Tensor): Output image with shape (N,C,H,W). If `None`, a new tensor is allocated.
+
+    Returns:
+        Tensor: Filtered image with shape (N,C,H,W).
+    """
+    levels = levels or pyramid_levels(input)
+    if not 0 <= min_level < levels:
+        raise ValueError(f"Local Laplacian filter minimum level must be in range [0, {levels}), but got {min_level}")
+    if samples < 2:
+        raise ValueError(f"Local Laplacian filter requires at least 2 intensity samples, but got {samples}")
+    detail = sample_weight(detail, input)
+    # Remap coarse levels
+    gaussian = gaussian_pyramid(input, levels)[min_level:]
+    step = 2. / (samples - 1)
+    filtered = [None] * (len(gaussian) - 1)
+    for sample in range(samples):
+        intensity = sample * step - 1.
+        difference = gaussian[0] - intensity
+        remapped = difference * exp(difference.square().div_(-2. * sigma ** 2)) * detail + gaussian[0]
+        pyramid = laplacian_pyramid(remapped, len(gaussian))
+        # Accumulate bands, weighted by the distance of each pixel's intensity to the sample
+        for level, band in enumerate(pyramid[:-1]):
+            weight = gaussian[level].clamp(min=-1., max=1.).sub_(intensity).abs_().div_(-step).add_(1.).clamp_(min=0.)
+            filtered[level] = weight * band if filtered[level] is None else filtered[level] + weight * band
+    # Collapse, where passing fine levels through is the same as upsampling the coarse edit onto the input
+    result = collapse_laplacian_pyramid(filtered + gaussian[-1:]) - gaussian[0]
+    for level in reversed(range(min_level)):
+        result = pyramid_upsample(result, _level_size(input, level))
+    result = result + input
+    return write_output(result, out)
+
+def _level_size (input: Tensor, level: int) -> Tuple[int, int]:
+    """
+    Compute the size of a pyramid level.
+    """
+    _,_,height,width = input.shape
+    for _ in range(level):
+        height, width = (height + 1) // 2, (width + 1) // 2
+    return height, width
\ No newline at end of file
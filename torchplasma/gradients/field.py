@@ -0,0 +1,47 @@
+# 
+#   Plasma
+#   Copyright (c) 2021 Yusuf Olokoba.
+#
+
+from torch import Tensor
+
+from ..layout import sample_weight
+
+def write_mask (mask: Tensor, input: Tensor, broadcast: bool, out: Tensor=None) -> Tensor:
+    """
+    Write a broadcastable gradient mask to its output.
+
+    Parameters:
+        mask (Tensor): Gradient mask with shape (N,1,H,W), (N,1,1,W), or (N,1,H,1), where N may be 1.
+        input (Tensor): Input image with shape (N,C,H,W).
+        broadcast (bool): Whether to return the mask in its broadcastable shape.
+        out (Tensor): Output mask with shape (N,1,H,W). If `None`, a new tensor is allocated.
+
+    Returns:
+        Tensor: Gradient mask, with shape (N,1,H,W) unless `broadcast` is set and `out` is `None`.
+    """
+    if out is not None:
+        return out.copy_(mask)
+    if broadcast:
+        return mask
+    samples, _, height, width = input.shape
+    mask = mask.expand(max(samples, mask.shape[0]), 1, height, width).contiguous()
+    return mask
+
+def linear_mask (field: Tensor, input: Tensor, length: Tensor, broadcast: bool, out: Tensor) -> Tensor:
+    """
+    Create a linear gradient mask from a normalized distance field.
+
+    Parameters:
+        field (Tensor): Distance field with shape (1,1,1,W) or (1,1,H,1) in range [0., 1.].
+        input (Tensor): Input image with shape (N,C,H,W).
+        length (Tensor | float): Normalized length with shape (N,1) in range [0., 1.].
+        broadcast (bool): Whether to return the mask in its broadcastable shape.
+        out (Tensor): Output mask with shape (N,1,H,W). If `None`, a new tensor is allocated.
+
+    Returns:
+        Tensor: Gradient mask with the broadcastable shape of the field, or shape (N,1,H,W).
+    """
+    field = field / sample_weight(length, field)
+    mask = 1. - field.clamp_(max=1.)
+    return write_mask(mask, input, broadcast, out)
\ No newline at end of file
@@ -3,9 +3,12 @@
 #   Copyright (c) 2021 Yusuf Olokoba.
 #
 
-from torch import linspace, Tensor
+from torch import Tensor
 
-def left_right_gradient (input: Tensor, length: Tensor) -> Tensor:
+from ..cache import coordinate_grid
+from .field import linear_mask
+
+def left_right_gradient (input: Tensor, length: Tensor, broadcast: bool=False, out: Tensor=None) -> Tensor:
     """
     Create a horizontal gradient which starts from the left of the given image.
 
@@ -14,19 +17,18 @@ def left_right_gradient (input: Tensor, length: Tensor) -> Tensor:
     Parameters:
         input (Tensor): Input image with shape (N,C,H,W) in range [-1., 1.].
         length (Tensor | float): Normalized length with shape (N,1) in range [0., 1.].
+        broadcast (bool): Return the mask with shape (N,1,1,W), which broadcasts against the image.
+        out (Tensor): Output mask with shape (N,1,H,W). If `None`, a new tensor is allocated.
 
     Returns:
         Tensor: Gradient mask with shape (N,1,H,W) in range [0., 1.].
     """
-    samples, _, height, width = input.shape
-    field = linspace(0., 1., width).to(input.device)
-    field = field.repeat(samples, 1, height, 1)
-    field = field.flatten(start_dim=1) / length
-    field = field.view(-1, 1, height, width).clamp(max=1.)
-    field = 1. - field
-    return field
-
-def right_left_gradient (input: Tensor, length: Tensor) -> Tensor:
+    _, _, _, width = input.shape
+    field, = coordinate_grid((width,), input.device, input.dtype)
+    field = (field.view(1, 1, 1, width) + 1.) / 2.
+    return linear_mask(field, input, length, broadcast, out)
+
+def right_left_gradient (input: Tensor, length: Tensor, broadcast: bool=False, out: Tensor=None) -> Tensor:
     """
     Create a horizontal gradient which starts from the right of the given image.
 
@@ -35,14 +37,13 @@ def right_left_gradient (input: Tensor, length: Tensor) -> Tensor:
     Parameters:
         input (Tensor): Input image with shape (N,C,H,W) in range [-1., 1.].
         length (Tensor | float): Normalized length in range [0., 1.].
+        broadcast (bool): Return the mask with shape (N,1,1,W), which broadcasts against the image.
+        out (Tensor): Output mask with shape (N,1,H,W). If `None`, a new tensor is allocated.
 
     Returns:
         Tensor: Gradient mask with shape (N,1,H,W) in range [0., 1.].
     """
-    samples, _, height, width = input.shape
-    field = linspace(1., 0., width).to(input.device)
-    field = field.repeat(samples, 1, height, 1)
-    field = field.flatten(start_dim=1) / length
-    field = field.view(-1, 1, height, width).clamp(max=1.)
-    field = 1. - field
-    return field
\ No newline at end of file
+    _, _, _, width = input.shape
+    field, = coordinate_grid((width,), input.device, input.dtype)
+    field = (1. - field.view(1, 1, 1, width)) / 2.
+    return linear_mask(field, input, length, broadcast, out)
\ No newline at end of file
@@ -3,32 +3,47 @@
 #   Copyright (c) 2021 Yusuf Olokoba.
 #
 
-from torch import cat, linspace, meshgrid, Tensor
-from torch.nn.functional import interpolate
+from torch import Tensor
 
-def radial_gradient (input: Tensor, radius: Tensor) -> Tensor:
+from ..cache import coordinate_grid
+from .field import write_mask
+
+def radial_gradient (input: Tensor, radius: Tensor, center: Tensor=None, broadcast: bool=False, out: Tensor=None) -> Tensor:
     """
-    Create a radial gradient which starts from the center of the given image.
+    Create a radial gradient which starts from a point in the given image.
 
     We use the equation: f(x) = 2|cx|^3 - 3|cx|^2 + 1 where c = 1 / radius.
-    This operation is differentiable w.r.t the radius.
+    Distances are measured in normalized image coordinates, which span [-1., 1.] along each axis,
+    so a single radius gives an ellipse with the aspect ratio of the image.
+    The mask is evaluated analytically at full resolution.
+    This operation is differentiable w.r.t the radius and center.
 
     Parameters:
         input (Tensor): Input image with shape (N,C,H,W) in range [-1., 1.].
-        radius (Tensor | float): Normalized radius with shape (N,1) in range [0., 1.].
+        radius (Tensor | float): Normalized radius with shape (N,1), or horizontal and vertical radii with shape (N,2), in range [0., 1.].
+        center (Tensor): Normalized center point (x,y) with shape (N,2) in range [-1., 1.]. If `None`, the image center is used.
+        broadcast (bool): Return the mask with shape (1,1,H,W) when neither the radius nor the center vary per sample.
+        out (Tensor): Output mask with shape (N,1,H,W). If `None`, a new tensor is allocated.
 
     Returns:
         Tensor: Gradient mask with shape (N,1,H,W) in range [0., 1.].
     """
-    samples, _, height, width = input.shape
-    extent = min(width, height)
-    hg, wg = meshgrid(linspace(-1., 1., extent), linspace(-1., 1., extent))
-    hg = hg.repeat(samples, 1, 1, 1).to(input.device)
-    wg = wg.repeat(samples, 1, 1, 1).to(input.device)
-    field = cat([hg, wg], dim=1)
-    field = field.norm(dim=1, p=2, keepdim=True)
-    field = field.flatten(start_dim=1) / radius
-    field = field.view(-1, 1, extent, extent).clamp(max=1.)
-    mask = 2 * field.abs().pow(3) - 3 * field.abs().pow(2) + 1
-    mask = interpolate(mask, size=(height, width), mode="bilinear", align_corners=False)
-    return mask
\ No newline at end of file
+    _, _, height, width = input.shape
+    y, = coordinate_grid((height,), input.device, input.dtype)
+    x, = coordinate_grid((width,), input.device, input.dtype)
+    x, y = x.view(1, 1, 1, width), y.view(1, 1, height, 1)
+    # Offset
+    if center is not None:
+        center_x, center_y = center.view(-1, 2, 1, 1).split(1, dim=1)
+        x, y = x - center_x, y - center_y
+    # Scale
+    if isinstance(radius, Tensor):
+        radius = radius.reshape(-1, radius.shape[-1] if radius.ndim else 1, 1, 1)
+        radius_x, radius_y = radius.expand(-1, 2, -1, -1).split(1, dim=1)
+        x, y = x / radius_x, y / radius_y
+    else:
+        x, y = x / radius, y / radius
+    # Evaluate on the squared distance, so the gradient is finite at the center
+    field = (x.square() + y.square()).clamp_(max=1.)
+    mask = field.pow(1.5).mul_(2.).sub_(field, alpha=3.).add_(1.)
+    return write_mask(mask, input, broadcast, out)
\ No newline at end of file
@@ -0,0 +1,36 @@
+# 
+#   Plasma
+#   Copyright (c) 2021 Yusuf Olokoba.
+#
+
+from torch import channels_last, contiguous_format, memory_format as MemoryFormat, Tensor
+from typing import Union
+
+def memory_format (input: Tensor) -> MemoryFormat:
+    """
+    Get the memory format of an image.
+
+    Parameters:
+        input (Tensor): Input image with shape (N,C,H,W).
+
+    Returns:
+        torch.memory_format: Either `torch.channels_last` or `torch.contiguous_format`.
+    """
+    if input.ndim == 4 and not input.is_contiguous() and input.is_contiguous(memory_format=channels_last):
+        return channels_last
+    return contiguous_format
+
+def sample_weight (weight: Union[Tensor, float], input: Tensor) -> Union[Tensor, float]:
+    """
+    Reshape a per-sample weight so that it broadcasts against an image.
+
+    Parameters:
+        weight (Tensor | float): Per-sample weight with shape (N,K).
+        input (Tensor): Image with shape (N,K,...) or (N,1,...).
+
+    Returns:
+        Tensor | float: Weight with shape (N,K,1,...).
+    """
+    if not isinstance(weight, Tensor):
+        return weight
+    return weight.view(*weight.shape, *[1] * (input.ndim - weight.ndim))
\ No newline at end of file
@@ -3,7 +3,7 @@
 #   Copyright (c) 2021 Yusuf Olokoba.
 #
 
-from .chromaticity import chromatic_adaptation
+from .chromaticity import chromatic_adaptation, chromatic_adaptation_matrix
 from .pointwise import contrast, exposure, saturation, color_balance
 from .selective import selective_color
 from .spectral import clarity, highlights, shadows, sharpen, texture
\ No newline at end of file
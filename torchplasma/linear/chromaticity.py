@@ -3,51 +3,77 @@
 #   Copyright (c) 2021 Yusuf Olokoba.
 #
 
-from torch import cat, diag_embed, ones_like, tensor, where, Tensor
+from torch import cat, ones_like, tensor, where, Tensor
 
-from ..conversion import linear_to_srgb, rgb_to_xyz, srgb_to_linear, xyy_to_xyz, xyz_to_rgb, xyz_to_xyy
+from ..cache import constant
+from ..conversion import color_matrix, linear_to_srgb, srgb_to_linear, xyy_to_xyz
+from ..conversion.xyz import RGB_TO_XYZ, XYZ_TO_RGB
 
-def chromatic_adaptation (input: Tensor, weight: Tensor) -> Tensor:
+D65_WHITE = tensor([ 0.95047, 1.0, 1.08883 ]) # for 2 degree observer
+
+BRADFORD = tensor([
+    [0.8951000, 0.2664000, -0.1614000],
+    [-0.7502000, 1.7135000, 0.0367000],
+    [0.0389000, -0.0685000, 1.0296000]
+])
+
+BRADFORD_INV = tensor([
+    [0.9869929, -0.1470543, 0.1599627],
+    [0.4323053, 0.5183603, 0.0492912],
+    [-0.0085287, 0.0400428, 0.9684867]
+])
+
+def chromatic_adaptation (input: Tensor, weight: Tensor, out: Tensor=None) -> Tensor:
     """
     Apply chromatic adaptation on an image.
 
-    We use the Bradford LMS cone response transform.
+    We use the Bradford LMS cone response transform. The conversion to XYZ, the adaptation, and the
+    conversion back to linear RGB are composed into one matrix per sample, which is applied in a single pass.
 
     Parameters:
         input (Tensor): Input image with shape (N,3,H,W) in range [-1., 1.].
         weight (Tensor): Scalar temperature and tint weights with shape (N,2) in range [-1., 1.].
+        out (Tensor): Output image with shape (N,3,H,W). If `None`, a new tensor is allocated.
 
     Returns:
         Tensor: Filtered image with shape (N,3,H,W) in range [-1., 1.].
     """
-    # Convert to XYZ
-    _, _, height, width = input.shape
-    input = srgb_to_linear(input)
-    xyz = rgb_to_xyz(input)
-    # Apply Bradford transformation # Used by ACR
-    d65_white = tensor([[ 0.95047, 1.0, 1.08883 ]]).float().to(input.device).unsqueeze(dim=2) # for 2 degree observer
-    dst_white = temperature_tint_to_xyz(weight).unsqueeze(dim=2)
-    BRADFORD = tensor([
-        [0.8951000, 0.2664000, -0.1614000],
-        [-0.7502000, 1.7135000, 0.0367000],
-        [0.0389000, -0.0685000, 1.0296000]
-    ]).float().to(input.device)
-    BRADFORD_INV = tensor([
-        [0.9869929, -0.1470543, 0.1599627],
-        [0.4323053, 0.5183603, 0.0492912],
-        [-0.0085287, 0.0400428, 0.9684867]
-    ]).float().to(input.device)
-    d65_cone = BRADFORD @ d65_white
-    dst_cone = BRADFORD @ dst_white
-    scale = diag_embed((d65_cone / dst_cone).squeeze(dim=2))
-    adaptation = BRADFORD_INV @ scale @ BRADFORD
-    xyz = adaptation @ xyz.flatten(start_dim=2)
-    xyz = xyz.view(-1, 3, height, width)
-    # Convert to sRGB
-    result = xyz_to_rgb(xyz)
-    result = linear_to_srgb(result)
+    matrix = chromatic_adaptation_matrix(weight.to(input.dtype))
+    # Apply in linear RGB, where the bias maps the [-1., 1.] range through the [0., 1.] range of the matrix
+    result = srgb_to_linear(input)
+    result = color_matrix(result, matrix, matrix.sum(dim=2) - 1.)
+    result = result.clamp_(min=-1., max=1.)
+    result = linear_to_srgb(result, out=out)
     return result
 
+def chromatic_adaptation_matrix (weight: Tensor) -> Tensor:
+    """
+    Compute the chromatic adaptation matrix for a given temperature and tint.
+
+    The matrix is `XYZ_TO_RGB @ BRADFORD_INV @ scale @ BRADFORD @ RGB_TO_XYZ`, where `scale` adapts
+    the D65 white point to the white point of the temperature and tint.
+    This operation is differentiable w.r.t the weight.
+
+    Parameters:
+        weight (Tensor): Scalar temperature and tint weights with shape (N,2) in range [-1., 1.].
+
+    Returns:
+        Tensor: Adaptation matrix with shape (N,3,3), which acts on linear RGB colors in range [0., 1.].
+    """
+    # Compute cone responses
+    d65_white = constant("D65_WHITE", D65_WHITE, weight.device, weight.dtype).view(1, 3, 1)
+    dst_white = temperature_tint_to_xyz(weight).unsqueeze(dim=2)
+    bradford = constant("BRADFORD", BRADFORD, weight.device, weight.dtype)
+    bradford_inv = constant("BRADFORD_INV", BRADFORD_INV, weight.device, weight.dtype)
+    d65_cone = bradford @ d65_white
+    dst_cone = bradford @ dst_white
+    # Compose
+    rgb_to_xyz = constant("RGB_TO_XYZ", RGB_TO_XYZ, weight.device, weight.dtype)
+    xyz_to_rgb = constant("XYZ_TO_RGB", XYZ_TO_RGB, weight.device, weight.dtype)
+    scale = d65_cone / dst_cone                                     # Nx3x1
+    matrix = xyz_to_rgb @ bradford_inv @ (scale * (bradford @ rgb_to_xyz))
+    return matrix
+
 def temperature_tint_to_xyz (input: Tensor) -> Tensor:
     """
     Compute the XYZ coordinate for a given temperature-tint vector.
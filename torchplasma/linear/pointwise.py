@@ -3,89 +3,110 @@
 #   Copyright (c) 2021 Yusuf Olokoba.
 #
 
-from torch import cat, clamp, tensor, Tensor
+from torch import as_tensor, cat, diag_embed, mul, ones_like, zeros_like, Tensor
 
-from ..conversion import rgb_to_yuv, yuv_to_rgb
+from ..cache import constant
+from ..conversion import color_matrix
+from ..conversion.yuv import RGB_TO_YUV, YUV_TO_RGB
+from ..layout import sample_weight
+from ..workspace import direct_output, write_output
 
-def contrast (input: Tensor, weight: Tensor) -> Tensor:
+def contrast (input: Tensor, weight: Tensor, out: Tensor=None) -> Tensor:
     """
     Apply contrast adjustment to an image.
 
     Parameters:
         input (Tensor): Input image with shape (N,3,H,W) in range [-1., 1.].
         weight (Tensor | float): Scalar weight with shape (N,1) in range [-1., 1.].
+        out (Tensor): Output image with shape (N,3,H,W). If `None`, a new tensor is allocated.
 
     Returns:
         Tensor: Filtered image with shape (N,3,H,W) in range [-1., 1.].
     """
-    _, channels, width, height = input.shape
-    result = (weight + 1.) * input.flatten(start_dim=1)
-    result = result.view(-1, channels, width, height)
-    result = result.clamp(min=-1., max=1.)
-    return result
+    weight = sample_weight(weight, input)
+    result = mul(input, weight + 1., out=direct_output(out, input, weight))
+    result = result.clamp_(min=-1., max=1.)
+    return write_output(result, out)
 
-def exposure (input: Tensor, weight: Tensor) -> Tensor:
+def exposure (input: Tensor, weight: Tensor, out: Tensor=None) -> Tensor:
     """
     Apply exposure adjustment to an image.
 
     Parameters:
         input (Tensor): Input image with shape (N,3,H,W) in range [-1., 1.].
         weight (Tensor | float): Scalar weight with shape (N,1) in range [-1., 1.].
+        out (Tensor): Output image with shape (N,3,H,W). If `None`, a new tensor is allocated.
 
     Returns:
         Tensor: Filtered image with shape (N,3,H,W) in range [-1., 1.].
     """
-    _, channels, width, height = input.shape
-    input = (input + 1.) / 2.
-    result = (weight + 1.) * input.flatten(start_dim=1)
-    result = result.view(-1, channels, width, height)
-    result =  2. * result - 1.
-    result = result.clamp(min=-1., max=1.)
-    return result
-
-def saturation (input: Tensor, weight: Tensor) -> Tensor:
+    weight = sample_weight(weight, input)
+    result = mul(input + 1., weight + 1., out=direct_output(out, input, weight))
+    result = result.sub_(1.)
+    result = result.clamp_(min=-1., max=1.)
+    return write_output(result, out)
+
+def saturation (input: Tensor, weight: Tensor, out: Tensor=None) -> Tensor:
     """
     Apply saturation adjustment to an image.
 
     Parameters:
         input (Tensor): Input image with shape (N,3,H,W) in range [-1., 1.].
         weight (Tensor | float): Scalar weight with shape (N,1) in range [-1., 1.].
+        out (Tensor): Output image with shape (N,3,H,W). If `None`, a new tensor is allocated.
 
     Returns:
         Tensor: Filtered image with shape (N,3,H,W) in range [-1., 1.].
     """
-    _, _, height, width = input.shape
-    yuv = rgb_to_yuv(input)
-    y, u, v = yuv.split(1, dim=1)
-    u = (weight + 1.) * u.flatten(start_dim=1)
-    v = (weight + 1.) * v.flatten(start_dim=1)
-    u = u.view(-1, 1, height, width)
-    v = v.view(-1, 1, height, width)
-    y = y.expand_as(u)
-    yuv = cat([y, u, v], dim=1)
-    result = yuv_to_rgb(yuv)
-    return result
-
-def color_balance (input: Tensor, weight: Tensor) -> Tensor:
+    # Scale chroma in YUV space
+    weight = as_tensor(weight, device=input.device, dtype=input.dtype).view(-1, 1)
+    scale = cat([ones_like(weight), weight + 1., weight + 1.], dim=1)
+    matrix = _yuv_matrix(input, diag_embed(scale))
+    # Apply
+    bias = matrix.sum(dim=-1) - 1.
+    result = color_matrix(input, matrix, bias, out=direct_output(out, input, matrix))
+    result = result.clamp_(min=-1., max=1.)
+    return write_output(result, out)
+
+def color_balance (input: Tensor, weight: Tensor, out: Tensor=None) -> Tensor:
     """
     Apply color balance adjustment on an image.
 
     Parameters:
         input (Tensor): Input image with shape (N,3,H,W) in range [-1., 1.].
         weight (Tensor): Scalar temperature and tint weights with shape (N,2) in range [-1., 1.].
+        out (Tensor): Output image with shape (N,3,H,W). If `None`, a new tensor is allocated.
 
     Returns:
         Tensor: Filtered image with shape (N,3,H,W) in range [-1., 1.].
     """
-    _, _, height, width = input.shape
-    yuv = rgb_to_yuv(input)
-    y, u, v = yuv.split(1, dim=1)
+    # Offset chroma in YUV space
     temp, tint = weight.split(1, dim=1)
-    u = 0.1 * (tint - temp) + u.flatten(start_dim=1)
-    v = 0.1 * (tint + temp) + v.flatten(start_dim=1)
-    u = u.view(-1, 1, height, width)
-    v = v.view(-1, 1, height, width)
-    y = y.expand_as(u)
-    yuv = cat([y, u, v], dim=1)
-    result = yuv_to_rgb(yuv)
-    return result
\ No newline at end of file
+    offset = cat([zeros_like(temp), 0.1 * (tint - temp), 0.1 * (tint + temp)], dim=1)
+    yuv_to_rgb = constant("YUV_TO_RGB", YUV_TO_RGB, input.device, input.dtype)
+    matrix = _yuv_matrix(input)
+    # Apply
+    bias = matrix.sum(dim=-1) - 1. + 2. * offset.matmul(yuv_to_rgb.transpose(0, 1))
+    result = color_matrix(input, matrix, bias, out=direct_output(out, input, bias))
+    result = result.clamp_(min=-1., max=1.)
+    return write_output(result, out)
+
+def _yuv_matrix (input: Tensor, chroma: Tensor=None) -> Tensor:
+    """
+    Compose the RGB to RGB color matrix which applies a linear transform in YUV space.
+
+    Since `rgb_to_yuv` and `yuv_to_rgb` rescale from and to [-1., 1.], applying the matrix `A`
+    to an image `x` in place of the round trip requires computing `A @ x + A @ 1 - 1`.
+
+    Parameters:
+        input (Tensor): Input image, used for its device and dtype.
+        chroma (Tensor): Linear transform in YUV space with shape (N,3,3). If `None`, the identity is used.
+
+    Returns:
+        Tensor: Color matrix with shape (3,3) or (N,3,3).
+    """
+    rgb_to_yuv = constant("RGB_TO_YUV", RGB_TO_YUV, input.device, input.dtype)
+    yuv_to_rgb = constant("YUV_TO_RGB", YUV_TO_RGB, input.device, input.dtype)
+    rgb_to_yuv = chroma @ rgb_to_yuv if chroma is not None else rgb_to_yuv
+    matrix = yuv_to_rgb @ rgb_to_yuv
+    return matrix
\ No newline at end of file
@@ -3,55 +3,52 @@
 #   Copyright (c) 2021 Yusuf Olokoba.
 #
 
-from torch import cat, split, stack, Tensor
-from torch.nn.functional import cosine_similarity
+from torch import addcmul, cat, Tensor
 
 from ..conversion import rgb_to_yuv, yuv_to_rgb
+from ..layout import memory_format
+from ..workspace import write_output
 
-def selective_color (input: Tensor, basis: Tensor, weight: Tensor) -> Tensor:
+def selective_color (input: Tensor, basis: Tensor, weight: Tensor, out: Tensor=None) -> Tensor:
     """
     Apply selective color adjustment on a given image.
 
-    All `M` filters are applied simultaneously.
+    All `M` filters are applied simultaneously. Since hue rotations commute, the per-basis rotations
+    are applied as a single rotation by their summed angle, and the per-basis hue, saturation, and
+    luminance adjustments are all summed with one matrix product.
 
     Parameters:
         input (Tensor): Input image with shape (N,3,H,W) in range [-1., 1.].
         basis (Tensor): Basis colors with shape (M,3) in range [0., 1.].
         weight (Tensor): Per-basis hue, saturation, and luminance adjustments with shape (N,M,3) in range [-1., 1.].
+        out (Tensor): Output image with shape (N,3,H,W). If `None`, a new tensor is allocated.
     
     Returns:
         Tensor: Filtered image with shape (N,3,H,W) in range [-1., 1.].
     """
-    _, _, height, width  = input.shape
-    bases, _ = basis.shape
+    samples, _, height, width  = input.shape
     # Convert to YUV
-    yuv = rgb_to_yuv(input)
-    y = yuv[:,:1,...]                                               # Nx1xHxW
-    uv = yuv[:,1:,...]                                              # Nx2xHxW
-    # Compute weight maps
-    relevance = _selective_color_weight_map(input, basis)           # NxMxHxW
-    relevance = relevance.flatten(start_dim=2)                      # NxMx(H*W)
-    hue_weight, sat_weight, lum_weight = weight.split(1, dim=2)     # NxMx1
-    hue = (relevance * hue_weight).view(-1, bases, height, width)   # NxMxHxW
-    sat = (relevance * sat_weight).view(-1, bases, height, width)   # NxMxHxW
-    lum = (relevance * lum_weight).view(-1, bases, height, width)   # NxMxHxW
+    yuv = rgb_to_yuv(input).permute(0, 2, 3, 1).reshape(samples, -1, 3)   # Nx(H*W)x3
+    y, u, v = yuv.split(1, dim=2)                                           # Nx(H*W)x1
+    # Sum adjustments over bases
+    relevance = _selective_color_relevance(yuv[...,1:], basis)              # Nx(H*W)xM
+    adjustments = relevance.matmul(weight.to(relevance.dtype))              # Nx(H*W)x3
+    hue, sat, lum = adjustments.split(1, dim=2)                             # Nx(H*W)x1
     # Adjust hues
-    rotations = stack([ hue.cos(), -hue.sin(), hue.sin(), hue.cos() ], dim=4)   # NxMxHxWx4
-    rotations = rotations.view(-1, bases, height, width, 2, 2)      # NxMxHxWx2x2
-    uv = uv.permute(0, 2, 3, 1).contiguous().unsqueeze(dim=4)       # NxHxWx2x1
-    for rotation in rotations.split(1, dim=1):
-        uv = rotation.squeeze(dim=1) @ uv                           # NxHxWx2x1
-    uv = uv.squeeze(dim=4).permute(0, 3, 1, 2).contiguous()         # Nx2xHxW
+    cos, sin = hue.cos(), hue.sin()
+    u, v = addcmul(u * cos, v, sin, value=-1.), addcmul(v * cos, u, sin)
     # Adjust saturation
-    sat = sat.sum(dim=1, keepdim=True).clamp(min=-1., max=1.)       # Nx1xHxW
-    uv = uv * (sat + 1.)                                            # Nx2xHxW
+    sat = sat.clamp(min=-1., max=1.) + 1.
+    u, v = u * sat, v * sat
     # Adjust luminance
-    lum = lum.sum(dim=1, keepdim=True).clamp(min=-1., max=1.)       # Nx1xHxW
+    lum = lum.clamp(min=-1., max=1.)
     y = y * (0.5 * lum + 1.)
     # Convert to RGB
-    yuv = cat([y, uv], dim=1)
+    yuv = cat([y.expand_as(u), u, v], dim=2)
+    yuv = yuv.view(-1, height, width, 3).permute(0, 3, 1, 2)
     result = yuv_to_rgb(yuv)
-    return result
+    result = result.contiguous(memory_format=memory_format(input))
+    return write_output(result, out)
 
 def _selective_color_weight_map (input: Tensor, basis: Tensor) -> Tensor:
     """
@@ -65,16 +62,27 @@ def _selective_color_weight_map (input: Tensor, basis: Tensor) -> Tensor:
         Tensor: Color weight map with shape (N,M,H,W) in range [0., 1.].
     """
     samples, _, height, width = input.shape
-    bases, _ = basis.shape
+    uv_colors = rgb_to_yuv(input)[:,1:].permute(0, 2, 3, 1).reshape(samples, -1, 2)
+    weight_map = _selective_color_relevance(uv_colors, basis)
+    weight_map = weight_map.transpose(1, 2).reshape(samples, -1, height, width)
+    return weight_map
+
+def _selective_color_relevance (input: Tensor, basis: Tensor) -> Tensor:
+    """
+    Compute the cosine similarity between pixel chroma and basis chroma, clamped to be non-negative.
+
+    Parameters:
+        input (Tensor): Pixel UV chroma with shape (N,P,2).
+        basis (Tensor): Basis colors with shape (M,3) in range [0., 1.].
+
+    Returns:
+        Tensor: Relevance of each basis to each pixel, with shape (N,P,M) in range [0., 1.].
+    """
     # Convert basis
-    basis = (2.0 * basis - 1.0).transpose(0, 1).unsqueeze(dim=0)    # 1x3xM
-    uv_basis = rgb_to_yuv(basis)[:,1:,...]                          # 1x2xM
-    uv_basis = uv_basis.view(1, 2, -1, 1, 1)                        # 1x2xMx1x1
-    uv_basis = uv_basis.repeat(samples, 1, 1, height, width)        # Nx2xMxHxW
-    # Convert all to YUV
-    uv_colors = rgb_to_yuv(input)[:,1:,...].unsqueeze(dim=2)        # Nx2x1xHxW
-    uv_colors = uv_colors.repeat(1, 1, bases, 1, 1)                 # Nx2xMxHxW
-    # Compare
-    weight_map = cosine_similarity(uv_colors, uv_basis, dim=1)
-    weight_map = weight_map.clamp(min=0.)
-    return weight_map
\ No newline at end of file
+    basis = (2.0 * basis.to(input) - 1.0).transpose(0, 1).unsqueeze(dim=0)  # 1x3xM
+    uv_basis = rgb_to_yuv(basis)[0,1:]                                      # 2xM
+    # Compare, with the same epsilon as `cosine_similarity`
+    similarity = input.matmul(uv_basis)                                     # NxPxM
+    norms = input.norm(dim=2, keepdim=True) * uv_basis.norm(dim=0)          # NxPxM
+    similarity = similarity.div_(norms.clamp_(min=1e-8)).clamp_(min=0.)
+    return similarity
\ No newline at end of file
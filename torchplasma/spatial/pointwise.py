@@ -3,49 +3,52 @@
 #   Copyright (c) 2021 Yusuf Olokoba.
 #
 
-from torch import cat, clamp, tensor, Tensor
+from torch import cat, mul, Tensor
 
 from ..conversion import rgb_to_yuv, yuv_to_rgb
+from ..workspace import direct_output, write_output
 
-def contrast (input: Tensor, weight: Tensor) -> Tensor:
+def contrast (input: Tensor, weight: Tensor, out: Tensor=None) -> Tensor:
     """
     Apply contrast adjustment to an image.
 
     Parameters:
         input (Tensor): Input image with shape (N,3,H,W) in range [-1., 1.].
-        weight (Tensor | float): Weight map with shape (N,1,H,W) in range [-1., 1.].
+        weight (Tensor | float): Weight map with shape (N,1,H,W), or a shape which broadcasts to it, in range [-1., 1.].
+        out (Tensor): Output image with shape (N,3,H,W). If `None`, a new tensor is allocated.
 
     Returns:
         Tensor: Filtered image with shape (N,3,H,W) in range [-1., 1.].
     """
-    result = (weight + 1.) * input
-    result = result.clamp(min=-1., max=1.)
-    return result
+    result = mul(input, weight + 1., out=direct_output(out, input, weight))
+    result = result.clamp_(min=-1., max=1.)
+    return write_output(result, out)
 
-def exposure (input: Tensor, weight: Tensor) -> Tensor:
+def exposure (input: Tensor, weight: Tensor, out: Tensor=None) -> Tensor:
     """
     Apply exposure adjustment to an image.
 
     Parameters:
         input (Tensor): Input image with shape (N,3,H,W) in [-1., 1.].
-        weight (float | Tensor): Weight map with shape (N,1,H,W) in [-1., 1.].
+        weight (float | Tensor): Weight map with shape (N,1,H,W), or a shape which broadcasts to it, in [-1., 1.].
+        out (Tensor): Output image with shape (N,3,H,W). If `None`, a new tensor is allocated.
     
     Returns:
         Tensor: Filtered image with shape (N,3,H,W) in [-1., 1.].
     """
-    input = (input + 1.) / 2.
-    result = (weight + 1.) * input
-    result =  2. * result - 1.
-    result = result.clamp(min=-1., max=1.)
-    return result
+    result = mul(input + 1., weight + 1., out=direct_output(out, input, weight))
+    result = result.sub_(1.)
+    result = result.clamp_(min=-1., max=1.)
+    return write_output(result, out)
 
-def saturation (input: Tensor, weight: Tensor) -> Tensor:
+def saturation (input: Tensor, weight: Tensor, out: Tensor=None) -> Tensor:
     """
     Apply saturation adjustment to an image.
 
     Parameters:
         input (Tensor): Input image with shape (N,3,H,W) in range [-1., 1.].
-        weight (Tensor | float): Weight map with shape (N,1,H,W) in range [-1., 1.].
+        weight (Tensor | float): Weight map with shape (N,1,H,W), or a shape which broadcasts to it, in range [-1., 1.].
+        out (Tensor): Output image with shape (N,3,H,W). If `None`, a new tensor is allocated.
 
     Returns:
         Tensor: Filtered image with shape (N,3,H,W) in range [-1., 1.].
@@ -56,16 +59,17 @@ def saturation (input: Tensor, weight: Tensor) -> Tensor:
     v = (weight + 1.) * v
     y = y.expand_as(u)
     yuv = cat([y, u, v], dim=1)
-    result = yuv_to_rgb(yuv)
+    result = yuv_to_rgb(yuv, out=out)
     return result
 
-def color_balance (input: Tensor, weight: Tensor) -> Tensor:
+def color_balance (input: Tensor, weight: Tensor, out: Tensor=None) -> Tensor:
     """
     Apply color balance adjustment on an image.
 
     Parameters:
         input (Tensor): Input image with shape (N,3,H,W) in range [-1., 1.].
-        weight (Tensor): Temperature and tint weight map with shape (N,2,H,W) in range [-1., 1.].
+        weight (Tensor): Temperature and tint weight map with shape (N,2,H,W), or a shape which broadcasts to it, in range [-1., 1.].
+        out (Tensor): Output image with shape (N,3,H,W). If `None`, a new tensor is allocated.
 
     Returns:
         Tensor: Filtered image with shape (N,3,H,W) in range [-1., 1.].
@@ -77,5 +81,5 @@ def color_balance (input: Tensor, weight: Tensor) -> Tensor:
     v = 0.1 * (tint + temp) + v
     y = y.expand_as(u)
     yuv = cat([y, u, v], dim=1)
-    result = yuv_to_rgb(yuv)
+    result = yuv_to_rgb(yuv, out=out)
     return result
\ No newline at end of file
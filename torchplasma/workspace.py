@@ -0,0 +1,122 @@
+# 
+#   Plasma
+#   Copyright (c) 2021 Yusuf Olokoba.
+#
+
+from threading import local
+from torch import device as Device, dtype as DType, empty, is_grad_enabled, zeros, Tensor
+from typing import Hashable, Optional, Tuple
+
+_state = local()
+
+class Workspace:
+    """
+    Arena of intermediate buffers which are reused across calls.
+
+    While a workspace is active on the current thread and gradients are disabled, operations draw
+    their large intermediate tensors from the workspace instead of allocating them on every call.
+    Buffers are keyed by call site, shape, device, and dtype, so fixed-shape workloads reach a
+    steady state where no intermediates are allocated.
+
+    Results returned by operations never alias workspace buffers. A workspace must not be shared
+    between threads which run operations concurrently.
+
+    Example:
+        workspace = Workspace()
+        with torch.no_grad(), workspace:
+            result = guided_filter(input, guide, 8, 0.01, out=result)
+    """
+
+    def __init__ (self):
+        self.buffers = {}
+
+    def __enter__ (self) -> "Workspace":
+        _stack().append(self)
+        return self
+
+    def __exit__ (self, *args) -> None:
+        _stack().pop()
+
+    @property
+    def nbytes (self) -> int:
+        """
+        Total size of all buffers in the workspace, in bytes.
+        """
+        return sum(buffer.numel() * buffer.element_size() for buffer in self.buffers.values())
+
+    def clear (self) -> None:
+        """
+        Release all buffers in the workspace.
+        """
+        self.buffers.clear()
+
+def buffer (key: Hashable, shape: Tuple[int, ...], device: Device, dtype: DType, zero: bool=False) -> Optional[Tensor]:
+    """
+    Get an intermediate buffer from the active workspace.
+
+    The contents of a reused buffer are whatever the previous call at the same call site left in it.
+    Since `out=` arguments do not support automatic differentiation, no buffer is returned while
+    gradients are enabled, so callers can pass the result straight to the `out=` argument of an op.
+
+    Parameters:
+        key (Hashable): Buffer key. This must uniquely identify the call site within an operation.
+        shape (tuple): Buffer shape.
+        device (torch.device): Device on which the buffer should live.
+        dtype (torch.dtype): Data type of the buffer.
+        zero (bool): Whether the buffer is zero-filled when it is created.
+
+    Returns:
+        Tensor: Intermediate buffer, or `None` if no workspace is active or gradients are enabled.
+    """
+    stack = _stack()
+    if not stack or is_grad_enabled():
+        return None
+    workspace = stack[-1]
+    entry_key = (key, tuple(shape), Device(device), dtype)
+    if entry_key not in workspace.buffers:
+        create = zeros if zero else empty
+        workspace.buffers[entry_key] = create(shape, device=device, dtype=dtype)
+    return workspace.buffers[entry_key]
+
+def direct_output (out: Optional[Tensor], *inputs) -> Optional[Tensor]:
+    """
+    Get the output tensor which an operation can pass straight to the `out=` argument of an op.
+
+    Since `out=` arguments do not support automatic differentiation, no output is returned while
+    gradients are enabled and any input requires gradients. The operation then allocates its result,
+    and `write_output` copies it to the output.
+
+    Parameters:
+        out (Tensor): Output tensor.
+        inputs (Tensor | float): Operation inputs.
+
+    Returns:
+        Tensor: Output tensor, or `None` if the output cannot be written to directly.
+    """
+    if out is None or not is_grad_enabled():
+        return out
+    requires_grad = any(isinstance(input, Tensor) and input.requires_grad for input in inputs)
+    return None if requires_grad else out
+
+def write_output (result: Tensor, out: Optional[Tensor]) -> Tensor:
+    """
+    Write the result of an operation to its output tensor.
+
+    Parameters:
+        result (Tensor): Operation result.
+        out (Tensor): Output tensor. If `None`, the result is returned as is.
+
+    Returns:
+        Tensor: Output tensor.
+    """
+    if out is None or out is result:
+        return result
+    return out.copy_(result)
+
+def _stack () -> list:
+    """
+    Get the stack of active workspaces on the current thread.
+    """
+    if not hasattr(_state, "stack"):
+        _state.stack = []
+    return _state.stack
\ No newline at end of file